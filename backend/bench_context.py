@@ -0,0 +1,50 @@
+"""
+Prompt size versus turn count, with the full history and with ConversationContext.
+
+    python bench_context.py
+
+Uses the extractive summarizer so it runs offline; the model summary is shorter.
+"""
+import asyncio
+import json
+from src.services.ai.contextManager import ConversationContext, count_message_tokens, extractive_summary
+
+TURNS = 60
+CHECKPOINTS = [1, 5, 10, 20, 30, 40, 50, 60]
+
+QUESTION = "Can you walk me through how you would design this, and what trade-offs you would consider around consistency and latency?"
+ANSWER = ("I would start by clarifying the requirements, then sketch the main components. "
+          "For storage I'd pick a key-value store with replication, and put a cache in front for hot reads. ") * 3
+CODE = "I have submitted the following code:\n```python\n" + "\n".join(
+    f"def step_{i}(items):\n    return [x * {i} for x in items if x % {i + 1} == 0]" for i in range(15)
+) + "\n```"
+
+async def offline_summarizer(previous_summary, turns):
+    return extractive_summary(previous_summary, turns)
+
+async def main():
+    context = ConversationContext(summarizer=offline_summarizer)
+    rows = []
+
+    for turn in range(1, TURNS + 1):
+        context.append("user", CODE if turn % 5 == 0 else ANSWER)
+        context.append("assistant", QUESTION)
+        # Let the background fold finish before measuring, as it would between real turns
+        context.schedule_fold()
+        await context.wait_for_fold()
+
+        if turn in CHECKPOINTS:
+            rows.append({
+                "turns": turn,
+                "full_history_tokens": count_message_tokens(context.history),
+                "managed_tokens": context.prompt_tokens(),
+                "folds": context.folds,
+            })
+
+    print(f"{'turns':>6} {'full history':>13} {'managed':>8} {'folds':>6}")
+    for row in rows:
+        print(f"{row['turns']:>6} {row['full_history_tokens']:>13} {row['managed_tokens']:>8} {row['folds']:>6}")
+    print(json.dumps(rows))
+
+if __name__ == "__main__":
+    asyncio.run(main())
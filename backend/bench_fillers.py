@@ -0,0 +1,59 @@
+"""
+Microbenchmark: the old split/re.sub filler counter versus FillerDetector.
+
+    python bench_fillers.py
+"""
+import random
+import re
+import time
+from src.services.ai.fillerDetector import FillerDetector, DEFAULT_FILLERS
+
+SIZES = [10_000, 100_000, 1_000_000]  # Words per transcript
+REPEATS = 5
+
+VOCABULARY = ("so I think the main idea is to use a hash map for lookups and then "
+              "iterate over the array once which gives linear time overall").split()
+FILLERS = ["um", "uh", "like", "you know", "basically", "actually", "literally"]
+
+def legacy_count(text):
+    # The previous count_filler_words, kept here as the baseline
+    fillers = ["um", "uh", "like", "you know", "basically", "actually", "literally"]
+    count = 0
+    found = {}
+    text = text.lower()
+    for word in text.split():
+        clean_word = re.sub(r'[^\w\s]', '', word)
+        if clean_word in fillers:
+            count += 1
+            found[clean_word] = found.get(clean_word, 0) + 1
+    return count, found
+
+def make_transcript(words):
+    rng = random.Random(42)
+    out = []
+    for _ in range(words):
+        out.append(rng.choice(FILLERS) + "," if rng.random() < 0.05 else rng.choice(VOCABULARY))
+    return " ".join(out)
+
+def best_of(fn, text):
+    best = float("inf")
+    result = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    detector = FillerDetector(DEFAULT_FILLERS)
+    print(f"{'words':>10} {'legacy ms':>10} {'detector ms':>12} {'speedup':>8} {'legacy n':>9} {'detector n':>11}")
+    for size in SIZES:
+        text = make_transcript(size)
+        legacy_time, (legacy_n, _) = best_of(legacy_count, text)
+        detector_time, (detector_n, _) = best_of(detector.count, text)
+        print(f"{size:>10} {legacy_time * 1000:>10.1f} {detector_time * 1000:>12.1f} "
+              f"{legacy_time / detector_time:>7.1f}x {legacy_n:>9} {detector_n:>11}")
+    # detector_n is higher because the legacy counter never matches "you know"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""
+Load test: N simulated candidates against a running server.
+
+Each candidate registers, runs an interview over /ws/interview (greeting plus
+TURNS answers), asks /grade for a report and fetches /reports, as the
+frontend does. Start the fake LLM and a server pointed at it first:
+
+    FAKE_LLM_PROFILE=groq uvicorn fake_llm_server:app --port 9911
+    GROQ_API_KEY=test LLM_BASE_URL=http://localhost:9911 uvicorn src.main:app --port 8000
+    CANDIDATES=200 TURNS=3 python bench_load.py > run.json
+
+Prints one JSON document with per-operation latency percentiles (ms), error
+counts, throughput, and event loop lag of both the driver and the server
+(from the server's /metrics). If the driver's own loop lags, it is the
+bottleneck and the numbers are not the server's.
+
+BENCH_BASELINE=previous.json compares against an earlier run: p95 latencies
+or throughput worse than BENCH_TOLERANCE, or a higher error rate, are listed
+under "regressions" and the script exits with status 1.
+
+Interview sockets authenticate with the candidate's token. Without MongoDB
+on the server, registration fails and only the interview socket is
+measured; start the server with WS_ALLOW_ANONYMOUS=true for that.
+"""
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+import uuid
+from collections import defaultdict
+import httpx
+import websockets
+from prometheus_client.parser import text_string_to_metric_families
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8000")
+WS_BASE_URL = BASE_URL.replace("http", "ws", 1)
+FAKE_LLM_URL = os.environ.get("FAKE_LLM_URL")  # Optional, adds the provider's /stats to the output
+CANDIDATES = int(os.environ.get("CANDIDATES", "50"))
+CONCURRENCY = int(os.environ.get("CONCURRENCY", str(CANDIDATES)))
+TURNS = int(os.environ.get("TURNS", "3"))
+STREAM = os.environ.get("STREAM", "true").lower() in ("1", "true", "yes")
+GRADE = os.environ.get("GRADE", "true").lower() in ("1", "true", "yes")
+GRADE_ASYNC = os.environ.get("GRADE_ASYNC", "false").lower() in ("1", "true", "yes")
+# Candidates start spread over this many seconds instead of all at once
+RAMP_SECONDS = float(os.environ.get("RAMP_SECONDS", "5"))
+THINK_SECONDS = float(os.environ.get("THINK_SECONDS", "0.5"))
+TIMEOUT_SECONDS = float(os.environ.get("TIMEOUT_SECONDS", "60"))
+BENCH_OUTPUT = os.environ.get("BENCH_OUTPUT")
+BENCH_BASELINE = os.environ.get("BENCH_BASELINE")
+BENCH_TOLERANCE = float(os.environ.get("BENCH_TOLERANCE", "0.25"))
+LAG_INTERVAL_SECONDS = 0.05
+
+# {n} makes each candidate's answers differ, as real ones do, so replies don't come from the response cache
+ANSWERS = [
+    "I would use a hash map from value to index, so each lookup is constant time. I used that in project {n}.",
+    "At my last job I moved our report generation to a background queue, which cut API latency by {n} ms.",
+    "I'd add an index on the user and timestamp fields, then page with a cursor of {n} rows instead of an offset.",
+    "Threads share memory, so they're cheaper to switch, but one crash can take down all {n} of them.",
+]
+# Server-side histograms summarized from /metrics, all label sets
+SERVER_HISTOGRAMS = [
+    "event_loop_lag_seconds",
+    "ws_accept_seconds",
+    "llm_first_token_seconds",
+    "llm_request_seconds",
+    "queue_wait_seconds",
+    "grading_seconds",
+    "mongo_command_seconds",
+    "bcrypt_seconds",
+]
+
+samples = defaultdict(list)  # operation -> latencies in ms
+errors = defaultdict(lambda: defaultdict(int))  # operation -> error kind -> count
+counts = defaultdict(int)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    # Nearest rank
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 0.50), 2) if values else None,
+        "p95": round(percentile(values, 0.95), 2) if values else None,
+        "p99": round(percentile(values, 0.99), 2) if values else None,
+        "max": round(values[-1], 2) if values else None,
+        "mean": round(sum(values) / len(values), 2) if values else None,
+    }
+
+
+class Timer:
+    """
+    Records the block's latency under operation, or its exception as an error.
+    The exception still propagates: the candidate gives up on the rest of its run.
+    """
+
+    def __init__(self, operation):
+        self.operation = operation
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            samples[self.operation].append((time.perf_counter() - self.started_at) * 1000)
+        else:
+            errors[self.operation][error_kind(exc)] += 1
+        return False
+
+
+def error_kind(exc):
+    if isinstance(exc, httpx.HTTPStatusError):
+        return f"http_{exc.response.status_code}"
+    if isinstance(exc, websockets.exceptions.ConnectionClosed):
+        return f"ws_closed_{exc.rcvd.code if exc.rcvd else 'abnormal'}"
+    if isinstance(exc, asyncio.TimeoutError):
+        return "timeout"
+    return type(exc).__name__
+
+
+async def next_frame(websocket, types):
+    """Skips frames until one of types arrives; binary TTS frames are ignored."""
+    while True:
+        message = await asyncio.wait_for(websocket.recv(), TIMEOUT_SECONDS)
+        if isinstance(message, str):
+            frame = json.loads(message)
+            if frame.get("type") in types:
+                return frame
+
+
+async def register(http, run_id, index):
+    email = f"bench_{run_id}_{index}@example.com"
+    with Timer("register"):
+        response = await http.post("/auth/register", json={
+            "username": f"bench_{run_id}_{index}", "email": email, "password": "bench-password",
+        })
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+
+async def interview(session_id, index, token):
+    """Runs one interview; returns its session id, which the server may have replaced, and its transcript."""
+    history = []
+    uri = f"{WS_BASE_URL}/ws/interview/{session_id}?type=technical&retry_frames=true&stream={'true' if STREAM else 'false'}"
+    subprotocols = ["bearer", token] if token else None
+    started_at = time.perf_counter()
+    with Timer("ws_connect"):
+        websocket = await asyncio.wait_for(websockets.connect(uri, max_size=None, subprotocols=subprotocols), TIMEOUT_SECONDS)
+    try:
+        with Timer("ws_greeting"):
+            greeting = await next_frame(websocket, ("ai_response", "session_started"))
+            if greeting["type"] == "session_started":
+                session_id = greeting["session_id"]
+                greeting = await next_frame(websocket, ("ai_response",))
+        samples["ws_ready"].append((time.perf_counter() - started_at) * 1000)
+        history.append({"role": "assistant", "content": greeting["text"]})
+
+        for turn in range(TURNS):
+            await asyncio.sleep(THINK_SECONDS)
+            answer = ANSWERS[turn % len(ANSWERS)].format(n=index + 1)
+            history.append({"role": "user", "content": answer})
+            sent_at = time.perf_counter()
+            await websocket.send(json.dumps({"type": "submit_answer", "text": answer}))
+            with Timer("turn_first_token"):
+                frame = await next_frame(websocket, ("ai_response", "ai_response_delta", "turn_failed"))
+                while frame["type"] == "turn_failed":
+                    # Shed by the server's LLM admission control: wait as told and ask again
+                    counts["turns_shed"] += 1
+                    await asyncio.sleep(frame["retry_after"])
+                    await websocket.send(json.dumps({"type": "retry_turn"}))
+                    frame = await next_frame(websocket, ("ai_response", "ai_response_delta", "turn_failed"))
+            if frame["type"] == "ai_response_delta":
+                with Timer("turn_stream_rest"):
+                    frame = await next_frame(websocket, ("ai_response_done",))
+            samples["turn_complete"].append((time.perf_counter() - sent_at) * 1000)
+            history.append({"role": "assistant", "content": frame["text"]})
+            counts["turns"] += 1
+    finally:
+        await websocket.close()
+    return session_id, history
+
+
+async def grade(http, token, session_id, history):
+    headers = {"Authorization": f"Bearer {token}"}
+    body = {"history": history, "type": "technical", "session_id": session_id}
+    with Timer("grade"):
+        if not GRADE_ASYNC:
+            response = await http.post("/grade", json=body, headers=headers)
+            response.raise_for_status()
+            return
+        response = await http.post("/grade", json={**body, "async": True}, headers=headers)
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+        deadline = time.monotonic() + TIMEOUT_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.25)
+            job = (await http.get(f"/grade/jobs/{job_id}", headers=headers)).json()
+            if job["status"] == "done":
+                return
+            if job["status"] == "failed":
+                raise RuntimeError("grading job failed")
+        raise asyncio.TimeoutError()
+
+
+async def candidate(http, run_id, index, token, limit):
+    await asyncio.sleep(RAMP_SECONDS * index / max(CANDIDATES, 1))
+    async with limit:
+        session_id = f"bench-{run_id}-{index}"
+        try:
+            session_id, history = await interview(session_id, index, token)
+            if token and GRADE:
+                await grade(http, token, session_id, history)
+            if token:
+                with Timer("reports"):
+                    response = await http.get("/reports", headers={"Authorization": f"Bearer {token}"})
+                    response.raise_for_status()
+            counts["completed"] += 1
+        except Exception:
+            # Already recorded by the Timer of the step that failed
+            counts["failed"] += 1
+
+
+async def measure_lag(lags, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        due = loop.time() + LAG_INTERVAL_SECONDS
+        await asyncio.sleep(LAG_INTERVAL_SECONDS)
+        lags.append(max(0.0, loop.time() - due) * 1000)
+
+
+async def scrape(http):
+    """Cumulative bucket counts per histogram series on the server's /metrics."""
+    response = await http.get("/metrics")
+    response.raise_for_status()
+    histograms = {}
+    for family in text_string_to_metric_families(response.text):
+        if family.name not in SERVER_HISTOGRAMS:
+            continue
+        for sample in family.samples:
+            if not sample.name.endswith("_bucket"):
+                continue
+            labels = {k: v for k, v in sample.labels.items() if k != "le"}
+            series = family.name + (json.dumps(labels, sort_keys=True) if labels else "")
+            histograms.setdefault(series, {})[float(sample.labels["le"])] = sample.value
+    return histograms
+
+
+def histogram_quantile(buckets, q):
+    """Estimates a quantile from cumulative buckets, interpolating inside a bucket like Prometheus does."""
+    bounds = sorted(buckets)
+    total = buckets[bounds[-1]]
+    if total <= 0:
+        return None
+    rank = q * total
+    lower, below = 0.0, 0.0
+    for bound in bounds:
+        if buckets[bound] >= rank:
+            if bound == float("inf"):
+                return lower
+            return lower + (bound - lower) * (rank - below) / max(buckets[bound] - below, 1e-9)
+        lower, below = bound, buckets[bound]
+    return lower
+
+
+def server_summary(before, after):
+    summary = {}
+    for series, buckets in after.items():
+        earlier = before.get(series, {})
+        delta = {bound: count - earlier.get(bound, 0) for bound, count in buckets.items()}
+        count = delta.get(float("inf"), 0)
+        if count <= 0:
+            continue
+        summary[series] = {"count": int(count)} | {
+            f"p{int(q * 100)}_ms": round(histogram_quantile(delta, q) * 1000, 2) for q in (0.5, 0.95, 0.99)
+        }
+    return summary
+
+
+def compare(report, baseline):
+    regressions = []
+    for operation, current in report["latency_ms"].items():
+        previous = baseline.get("latency_ms", {}).get(operation)
+        if not previous or current["p95"] is None or previous.get("p95") is None:
+            continue
+        # Ignore sub-millisecond noise on very fast operations
+        if current["p95"] > previous["p95"] * (1 + BENCH_TOLERANCE) and current["p95"] - previous["p95"] > 1:
+            regressions.append(f"{operation} p95 {previous['p95']}ms -> {current['p95']}ms")
+    for name, current in report["throughput"].items():
+        previous = baseline.get("throughput", {}).get(name)
+        if previous and current < previous * (1 - BENCH_TOLERANCE):
+            regressions.append(f"{name} {previous} -> {current}")
+    previous_rate = baseline.get("error_rate")
+    if previous_rate is not None and report["error_rate"] > previous_rate + 0.01:
+        regressions.append(f"error_rate {previous_rate} -> {report['error_rate']}")
+    return regressions
+
+
+async def main():
+    run_id = uuid.uuid4().hex[:8]
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=TIMEOUT_SECONDS,
+                                 limits=httpx.Limits(max_connections=CONCURRENCY + 10)) as http:
+        metrics_before = await scrape(http)
+
+        print(f"Registering {CANDIDATES} candidates...", file=sys.stderr)
+        tokens = await asyncio.gather(*[register(http, run_id, i) for i in range(CANDIDATES)], return_exceptions=True)
+        tokens = [token if isinstance(token, str) else None for token in tokens]
+        if not any(tokens):
+            print("Registration failed (is MongoDB connected?), measuring the interview socket only.", file=sys.stderr)
+
+        lags, stop = [], asyncio.Event()
+        lag_task = asyncio.create_task(measure_lag(lags, stop))
+        limit = asyncio.Semaphore(CONCURRENCY)
+        print(f"Running {CANDIDATES} candidates, {CONCURRENCY} at a time...", file=sys.stderr)
+        started_at = time.perf_counter()
+        await asyncio.gather(*[candidate(http, run_id, i, tokens[i], limit) for i in range(CANDIDATES)])
+        elapsed = time.perf_counter() - started_at
+        stop.set()
+        await lag_task
+
+        metrics_after = await scrape(http)
+        provider = None
+        if FAKE_LLM_URL:
+            provider = (await http.get(f"{FAKE_LLM_URL}/stats")).json()
+
+    operations = sorted(set(samples) | set(errors))
+    # Registration is setup, not part of the measured run
+    measured = [op for op in operations if op != "register"]
+    error_count = sum(sum(errors[op].values()) for op in measured)
+    attempts = sum(len(samples[op]) for op in measured) + error_count
+    requests = sum(len(samples[op]) for op in ("grade", "reports")) + counts["turns"]
+    report = {
+        "config": {
+            "base_url": BASE_URL, "candidates": CANDIDATES, "concurrency": CONCURRENCY, "turns": TURNS,
+            "stream": STREAM, "grade": GRADE, "grade_async": GRADE_ASYNC,
+            "ramp_seconds": RAMP_SECONDS, "think_seconds": THINK_SECONDS,
+        },
+        "duration_seconds": round(elapsed, 2),
+        "candidates": {"completed": counts["completed"], "failed": counts["failed"], "registered": sum(1 for t in tokens if t)},
+        # Retried turns count once in turn_first_token, waits included
+        "turns_shed": counts["turns_shed"],
+        "throughput": {
+            "turns_per_second": round(counts["turns"] / elapsed, 2),
+            "candidates_per_second": round(counts["completed"] / elapsed, 3),
+            "requests_per_second": round(requests / elapsed, 2),
+        },
+        "latency_ms": {op: summarize(samples[op]) for op in operations},
+        "errors": {op: dict(errors[op]) for op in operations if errors[op]},
+        "error_rate": round(error_count / attempts, 4) if attempts else 0.0,
+        "event_loop_lag_ms": {
+            "driver": summarize(lags),
+            "server": server_summary(metrics_before, metrics_after).get("event_loop_lag_seconds"),
+        },
+        "server_histograms": server_summary(metrics_before, metrics_after),
+    }
+    if provider:
+        report["provider"] = provider
+
+    exit_code = 0
+    if BENCH_BASELINE:
+        with open(BENCH_BASELINE) as f:
+            report["regressions"] = compare(report, json.load(f))
+        exit_code = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=2)
+    if BENCH_OUTPUT:
+        with open(BENCH_OUTPUT, "w") as f:
+            f.write(output)
+    print(output)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,88 @@
+"""
+Benchmarks get_recent_reports against a local mongod, with and without indexes.
+
+    BENCH_MONGO_URI=mongodb://localhost:27017 python bench_reports.py
+
+Seeds a throwaway database (dropped at the end), so never point it at production.
+"""
+import asyncio
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient
+from src.config.database import db
+from src.services.reportService import get_recent_reports
+
+BENCH_MONGO_URI = os.environ.get("BENCH_MONGO_URI", "mongodb://localhost:27017")
+BENCH_DB_NAME = "interview_flow_bench"
+USERS = int(os.environ.get("BENCH_USERS", "1000"))
+REPORTS_PER_USER = int(os.environ.get("BENCH_REPORTS_PER_USER", "100"))
+QUERIES = int(os.environ.get("BENCH_QUERIES", "500"))
+
+async def seed(database):
+    now = datetime.utcnow()
+    users = [f"bench_{i}@example.com" for i in range(USERS)]
+    await database["users"].insert_many(
+        [{"username": email.split("@")[0], "email": email, "hashed_password": "x"} for email in users]
+    )
+
+    batch = []
+    for email in users:
+        for j in range(REPORTS_PER_USER):
+            batch.append({
+                "user_email": email,
+                "timestamp": now - timedelta(minutes=random.randint(0, 60 * 24 * 365)),
+                "type": random.choice(["technical", "hr", "dsa_practice"]),
+                "scores": {"technical": 50, "communication": 50, "confidence": 50},
+                "feedback": "Seeded report",
+                "strengths": ["a", "b"],
+                "improvements": ["c", "d"],
+            })
+            if len(batch) >= 10000:
+                await database["reports"].insert_many(batch)
+                batch = []
+    if batch:
+        await database["reports"].insert_many(batch)
+    return users
+
+async def measure(users):
+    samples = []
+    for _ in range(QUERIES):
+        email = random.choice(users)
+        start = time.perf_counter()
+        await get_recent_reports(user_email=email)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+async def main():
+    db.client = AsyncIOMotorClient(BENCH_MONGO_URI)
+    db.name = BENCH_DB_NAME
+    database = db.get_db()
+    await db.client.drop_database(BENCH_DB_NAME)
+
+    try:
+        print(f"Seeding {USERS} users x {REPORTS_PER_USER} reports...")
+        users = await seed(database)
+
+        without = await measure(users)
+        print(f"Without indexes: {without}")
+
+        await db.ensure_indexes()
+        with_indexes = await measure(users)
+        print(f"With indexes:    {with_indexes}")
+
+        report = await db.check_indexes()
+        print(f"Query plans:     {report['query_plans']}")
+    finally:
+        await db.client.drop_database(BENCH_DB_NAME)
+        db.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+import asyncio
+import json
+from src.config.database import db
+
+async def main():
+    db.connect()
+    if not db.client:
+        return
+
+    report = await db.check_indexes()
+    print(json.dumps(report, indent=2, default=str))
+
+    problems = []
+    for collection_name, info in report.items():
+        if collection_name == "query_plans":
+            continue
+        for name in info["missing"]:
+            problems.append(f"{collection_name}: missing index {name}")
+        for name in info["unused"]:
+            problems.append(f"{collection_name}: index {name} has not been used since the server started")
+    for label, plan in report.get("query_plans", {}).items():
+        if not plan["uses_index"]:
+            problems.append(f"{label}: query does not use an index ({' <- '.join(plan['stages'])})")
+        elif plan["in_memory_sort"]:
+            problems.append(f"{label}: query sorts in memory")
+
+    print("\n".join(problems) if problems else "All indexes present and used.")
+    db.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
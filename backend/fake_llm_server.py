@@ -0,0 +1,195 @@
+"""
+Local stand-in for the Groq chat-completions API, for load runs and tests.
+
+    FAKE_LLM_PROFILE=groq uvicorn fake_llm_server:app --port 9911
+    GROQ_API_KEY=test LLM_BASE_URL=http://localhost:9911 uvicorn src.main:app --port 8000
+
+POST /openai/v1/chat/completions answers plain and streamed (SSE) requests.
+A reply starts after a first-token delay and is produced at a fixed token
+rate, so streamed and plain calls take as long as they would upstream.
+Replies are deterministic: the text depends only on the last message, and
+delays and injected failures come from a seeded generator. JSON-mode requests
+get a grading-shaped object that both the turn assessment and the final
+grading accept.
+
+Profiles set the defaults; each value can be overridden on its own:
+
+    fast   no delay to speak of, for measuring the server alone
+    groq   roughly what the hosted 70B model does
+    slow   an overloaded provider
+    flaky  groq timings with 5% 500s and 5% 429s
+
+FAKE_LLM_MAX_CONCURRENT caps requests in flight; beyond it requests get a
+429 with Retry-After, as a provider rate limit would. GET /stats reports
+what was served.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from fastapi import FastAPI, Body
+from fastapi.responses import JSONResponse, StreamingResponse
+
+PROFILES = {
+    "fast": {"first_token": 0.01, "tokens_per_second": 5000, "jitter": 0.0, "error_rate": 0.0, "rate_limit_rate": 0.0},
+    "groq": {"first_token": 0.25, "tokens_per_second": 250, "jitter": 0.2, "error_rate": 0.0, "rate_limit_rate": 0.0},
+    "slow": {"first_token": 1.5, "tokens_per_second": 40, "jitter": 0.3, "error_rate": 0.0, "rate_limit_rate": 0.0},
+    "flaky": {"first_token": 0.25, "tokens_per_second": 250, "jitter": 0.2, "error_rate": 0.05, "rate_limit_rate": 0.05},
+}
+PROFILE = PROFILES[os.environ.get("FAKE_LLM_PROFILE", "groq")]
+
+FIRST_TOKEN_SECONDS = float(os.environ.get("FAKE_LLM_FIRST_TOKEN_SECONDS", PROFILE["first_token"]))
+TOKENS_PER_SECOND = float(os.environ.get("FAKE_LLM_TOKENS_PER_SECOND", PROFILE["tokens_per_second"]))
+JITTER = float(os.environ.get("FAKE_LLM_JITTER", PROFILE["jitter"]))  # +/- share of each delay
+ERROR_RATE = float(os.environ.get("FAKE_LLM_ERROR_RATE", PROFILE["error_rate"]))
+RATE_LIMIT_RATE = float(os.environ.get("FAKE_LLM_RATE_LIMIT_RATE", PROFILE["rate_limit_rate"]))
+MAX_CONCURRENT = int(os.environ.get("FAKE_LLM_MAX_CONCURRENT", "0"))  # 0: unlimited
+RETRY_AFTER_SECONDS = float(os.environ.get("FAKE_LLM_RETRY_AFTER_SECONDS", "1"))
+SEED = int(os.environ.get("FAKE_LLM_SEED", "42"))
+# Streams send a chunk at most this often, however high the token rate
+CHUNK_SECONDS = 0.02
+
+REPLIES = [
+    "Good. How would you find a cycle in a linked list, and what does your approach cost in memory?",
+    "That makes sense. Walk me through how a hash map handles collisions, and what happens when it resizes.",
+    "Interesting. How would you design a rate limiter for an API used by thousands of clients?",
+    "Thanks. Tell me about a time a production incident taught you something about your own code.",
+    "Okay. What is the difference between a process and a thread, and when would you pick each one?",
+    "Right. How would you make that query fast if the table grew to a hundred million rows?",
+]
+KEYWORDS = ["hash map", "big o", "caching", "indexes", "concurrency", "recursion", "two pointers", "load balancing"]
+
+app = FastAPI()
+rng = random.Random(SEED)
+in_flight = 0
+stats = {
+    "requests": 0,
+    "streams": 0,
+    "completed": 0,
+    "errors_injected": 0,
+    "rate_limited": 0,
+    "tokens_generated": 0,
+    "peak_in_flight": 0,
+}
+
+
+def _digest(text):
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "big")
+
+
+def _delay(seconds):
+    return max(0.0, seconds * (1 + rng.uniform(-JITTER, JITTER)))
+
+
+def reply_text(body):
+    messages = body.get("messages") or [{"content": ""}]
+    seed = _digest(str(messages[-1].get("content", "")))
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        scores = {name: 40 + (seed >> shift) % 56 for name, shift in (("technical", 0), ("communication", 8), ("confidence", 16))}
+        return json.dumps({
+            **{f"{name}_score": score for name, score in scores.items()},
+            **scores,
+            "note": "Covers the main idea, light on trade-offs.",
+            "feedback": "Solid fundamentals. Explain the trade-offs of your choices more explicitly.",
+            "strengths": ["Clear structure", "Correct core approach"],
+            "improvements": ["Discuss edge cases", "Quantify complexity"],
+            "keywords_mentioned": [KEYWORDS[seed % len(KEYWORDS)]],
+            "keywords_missed": [KEYWORDS[(seed >> 4) % len(KEYWORDS)]],
+        })
+    return REPLIES[seed % len(REPLIES)]
+
+
+def tokens_of(text, max_tokens):
+    # One token per word is close enough for pacing
+    words = [word + " " for word in text.split(" ")]
+    words[-1] = words[-1].rstrip()
+    return words[:max_tokens] if max_tokens else words
+
+
+def error_response(status_code, message, headers=None):
+    return JSONResponse(status_code=status_code, headers=headers, content={"error": {"message": message, "type": "fake_llm_error"}})
+
+
+def chunk(body, content=None, finish_reason=None):
+    delta = {"content": content} if content is not None else {}
+    return "data: " + json.dumps({
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": body.get("model"),
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }) + "\n\n"
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(body: dict = Body(...)):
+    stats["requests"] += 1
+
+    if (MAX_CONCURRENT and in_flight >= MAX_CONCURRENT) or rng.random() < RATE_LIMIT_RATE:
+        stats["rate_limited"] += 1
+        return error_response(429, "Rate limit reached, please retry", headers={"retry-after": f"{RETRY_AFTER_SECONDS:g}"})
+    if rng.random() < ERROR_RATE:
+        stats["errors_injected"] += 1
+        return error_response(500, "Injected failure")
+
+    tokens = tokens_of(reply_text(body), body.get("max_tokens"))
+    first_token = _delay(FIRST_TOKEN_SECONDS)
+    per_token = 1 / TOKENS_PER_SECOND
+
+    def start():
+        global in_flight
+        in_flight += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], in_flight)
+
+    def finish():
+        global in_flight
+        in_flight -= 1
+        stats["tokens_generated"] += len(tokens)
+
+    if not body.get("stream"):
+        start()
+        try:
+            await asyncio.sleep(first_token + _delay(per_token * len(tokens)))
+        finally:
+            finish()
+        stats["completed"] += 1
+        prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in body.get("messages", []))
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens),
+            },
+        }
+
+    stats["streams"] += 1
+    per_chunk = max(1, round(CHUNK_SECONDS / per_token))
+
+    async def events():
+        # Counted from here: a generator that never starts never runs its finally
+        start()
+        try:
+            await asyncio.sleep(first_token)
+            for offset in range(0, len(tokens), per_chunk):
+                if offset:
+                    await asyncio.sleep(_delay(per_token * per_chunk))
+                yield chunk(body, "".join(tokens[offset:offset + per_chunk]))
+            yield chunk(body, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+            stats["completed"] += 1
+        finally:
+            finish()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+def read_stats():
+    return {**stats, "in_flight": in_flight}
@@ -0,0 +1,54 @@
+"""
+Local stand-in for the ElevenLabs streaming endpoint, for tests and load runs.
+
+    uvicorn fake_tts_server:app --port 8900
+    ELEVENLABS_BASE_URL=http://localhost:8900 ELEVENLABS_API_KEY=test uvicorn src.main:app --port 8000
+
+POST /v1/text-to-speech/{voice_id}/stream returns fake "MP3" bytes in chunks
+after a first-byte delay, paced like real synthesis. The audio is deterministic:
+BYTES_PER_CHAR bytes per character of text, so tests can check what arrived.
+Set FAKE_TTS_ERROR_RATE to make a share of requests fail with a 500.
+"""
+import asyncio
+import os
+import random
+from fastapi import FastAPI, Body, Header
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FIRST_BYTE_SECONDS = float(os.environ.get("FAKE_TTS_FIRST_BYTE_SECONDS", "0.15"))
+CHUNK_SECONDS = float(os.environ.get("FAKE_TTS_CHUNK_SECONDS", "0.02"))
+CHUNK_BYTES = int(os.environ.get("FAKE_TTS_CHUNK_BYTES", "4096"))
+BYTES_PER_CHAR = int(os.environ.get("FAKE_TTS_BYTES_PER_CHAR", "400"))
+ERROR_RATE = float(os.environ.get("FAKE_TTS_ERROR_RATE", "0"))
+
+app = FastAPI()
+requests_served = 0
+
+def fake_audio(text):
+    # An MP3 frame header followed by filler, so players at least recognize the type
+    body = b"\xff\xfb\x90\x64" + text.encode("utf-8")
+    size = max(len(text), 1) * BYTES_PER_CHAR
+    return (body * (size // len(body) + 1))[:size]
+
+@app.post("/v1/text-to-speech/{voice_id}/stream")
+async def stream(voice_id: str, data: dict = Body(...), xi_api_key: str = Header(None)):
+    global requests_served
+    if not xi_api_key:
+        return JSONResponse(status_code=401, content={"detail": "Missing xi-api-key"})
+    if random.random() < ERROR_RATE:
+        return JSONResponse(status_code=500, content={"detail": "Injected failure"})
+    requests_served += 1
+
+    audio = fake_audio(data.get("text", ""))
+
+    async def chunks():
+        await asyncio.sleep(FIRST_BYTE_SECONDS)
+        for start in range(0, len(audio), CHUNK_BYTES):
+            yield audio[start:start + CHUNK_BYTES]
+            await asyncio.sleep(CHUNK_SECONDS)
+
+    return StreamingResponse(chunks(), media_type="audio/mpeg")
+
+@app.get("/stats")
+def stats():
+    return {"requests_served": requests_served}
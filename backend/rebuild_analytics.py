@@ -0,0 +1,16 @@
+import asyncio
+import sys
+from src.config.database import db
+from src.services.analyticsService import rebuild_analytics
+
+async def main():
+    db.connect()
+    if not db.client:
+        return
+
+    user_email = sys.argv[1] if len(sys.argv) > 1 else None
+    await rebuild_analytics(user_email=user_email)
+    db.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,33 +1,181 @@
 import os
+import logging
 import certifi
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
 from dotenv import load_dotenv
+from src.services.metrics import mongo_listener
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 MONGO_URI = os.environ.get("MONGO_URI")
-DB_NAME = "interview_flow_db"
+DB_NAME = os.environ.get("MONGO_DB_NAME", "interview_flow_db")
+# How long interview session state is kept for resuming after the last activity
+SESSION_STATE_TTL_SECONDS = int(os.environ.get("SESSION_STATE_TTL_SECONDS", str(24 * 60 * 60)))
+
+# Indexes the app relies on, created at startup by ensure_indexes()
+INDEXES = {
+    "users": [
+        {"name": "email_unique", "keys": [("email", ASCENDING)], "unique": True},
+    ],
+    "reports": [
+        # get_recent_reports / get_reports_page: filter on user_email, newest first,
+        # with _id as the keyset tie-breaker so the sort never happens in memory
+        {"name": "user_email_timestamp_id", "keys": [("user_email", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]},
+    ],
+    "grading_jobs": [
+        # GradingQueue._claim: oldest queued (or lease-expired) job first
+        {"name": "status_created_at", "keys": [("status", ASCENDING), ("created_at", ASCENDING)]},
+    ],
+    "transcripts": [
+        # A user's transcripts, newest first
+        {"name": "user_email_started_at", "keys": [("user_email", ASCENDING), ("started_at", DESCENDING)]},
+    ],
+    "interview_sessions": [
+        {"name": "updated_at_ttl", "keys": [("updated_at", ASCENDING)], "expireAfterSeconds": SESSION_STATE_TTL_SECONDS},
+    ],
+    "session_turns": [
+        # MongoSessionStore.load reads a session's turns in order; unique so two
+        # workers can never both write the same turn of a session
+        {"name": "session_id_seq", "keys": [("session_id", ASCENDING), ("seq", ASCENDING)], "unique": True},
+        # Half a TTL longer than the session, see MongoSessionStore
+        {"name": "touched_at_ttl", "keys": [("touched_at", ASCENDING)], "expireAfterSeconds": SESSION_STATE_TTL_SECONDS * 3 // 2},
+    ],
+}
+
+# Indexes superseded by an entry in INDEXES, dropped by ensure_indexes()
+INDEX_NOT_FOUND = 27  # Server error code when the index to drop does not exist
+RETIRED_INDEXES = {
+    "reports": ["user_email_timestamp"],
+    "session_turns": ["created_at_ttl"],
+}
+
+# Representative hot-path queries, explained by check_indexes() to confirm they use an index
+QUERY_PLANS = {
+    "users.find_by_email": ("users", {"email": "probe@example.com"}, None),
+    "reports.recent_by_user": ("reports", {"user_email": "probe@example.com"}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+}
+
+def _plan_stages(plan):
+    """Flattens the stage names of an explain() winning plan."""
+    stages = []
+    while plan:
+        stages.append(plan.get("stage"))
+        if "inputStage" in plan:
+            plan = plan["inputStage"]
+        elif plan.get("inputStages"):
+            for child in plan["inputStages"]:
+                stages.extend(_plan_stages(child))
+            break
+        else:
+            break
+    return stages
 
 class Database:
     client: AsyncIOMotorClient = None
+    name: str = DB_NAME
 
     def connect(self):
         if not MONGO_URI:
-            print("Warning: MONGO_URI not found in environment variables.")
+            logger.warning("MONGO_URI not found in environment variables.")
             return
         
         # Use certifi to provide valid SSL certificates
-        self.client = AsyncIOMotorClient(MONGO_URI, tlsCAFile=certifi.where(), tlsAllowInvalidCertificates=True)
-        print("Connected to MongoDB.")
+        # The listener times every command for /metrics
+        self.client = AsyncIOMotorClient(
+            MONGO_URI, tlsCAFile=certifi.where(), tlsAllowInvalidCertificates=True, event_listeners=[mongo_listener]
+        )
+        logger.info("Connected to MongoDB.")
 
     def close(self):
         if self.client:
             self.client.close()
-            print("Disconnected from MongoDB.")
+            logger.info("Disconnected from MongoDB.")
 
     def get_db(self):
         if self.client:
-            return self.client[DB_NAME]
+            return self.client[self.name]
         return None
 
+    async def ensure_indexes(self):
+        """
+        Creates any missing indexes from INDEXES. create_index is a no-op for
+        indexes that already exist, so this is safe to run on every startup.
+        """
+        database = self.get_db()
+        if database is None:
+            return
+
+        for collection_name, specs in INDEXES.items():
+            for spec in specs:
+                options = {"expireAfterSeconds": spec["expireAfterSeconds"]} if "expireAfterSeconds" in spec else {}
+                try:
+                    await database[collection_name].create_index(
+                        spec["keys"],
+                        name=spec["name"],
+                        unique=spec.get("unique", False),
+                        **options,
+                    )
+                except Exception as e:
+                    # e.g. duplicate emails already stored block the unique index
+                    logger.error("Could not create index %s.%s: %s", collection_name, spec["name"], e)
+
+        for collection_name, names in RETIRED_INDEXES.items():
+            for name in names:
+                try:
+                    await database[collection_name].drop_index(name)
+                    logger.info("Dropped retired index %s.%s", collection_name, name)
+                except OperationFailure as e:
+                    # A fresh database never had it
+                    if e.code != INDEX_NOT_FOUND:
+                        logger.error("Could not drop index %s.%s: %s", collection_name, name, e)
+                except Exception as e:
+                    logger.error("Could not drop index %s.%s: %s", collection_name, name, e)
+        logger.info("MongoDB indexes ensured.")
+
+    async def check_indexes(self):
+        """
+        Reports, per collection, which expected indexes are missing, which existing
+        indexes have not been used since the server started, and which indexes the
+        hot-path queries actually pick.
+        """
+        database = self.get_db()
+        if database is None:
+            return {}
+
+        report = {}
+        for collection_name, specs in INDEXES.items():
+            collection = database[collection_name]
+            existing = await collection.index_information()
+            usage = {}
+            async for stat in collection.aggregate([{"$indexStats": {}}]):
+                usage[stat["name"]] = stat["accesses"]["ops"]
+
+            expected = {spec["name"] for spec in specs}
+            report[collection_name] = {
+                "missing": sorted(expected - set(existing)),
+                "unused": sorted(name for name, ops in usage.items() if ops == 0 and name != "_id_"),
+                "unexpected": sorted(set(existing) - expected - {"_id_"}),
+                "usage": usage,
+            }
+
+        plans = {}
+        for label, (collection_name, query, sort) in QUERY_PLANS.items():
+            cursor = database[collection_name].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            explain = await cursor.limit(5).explain()
+            winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+            # Newer servers nest the classic plan under queryPlan
+            stages = _plan_stages(winning_plan.get("queryPlan", winning_plan))
+            plans[label] = {
+                "stages": stages,
+                "uses_index": "IXSCAN" in stages or "EXPRESS_IXSCAN" in stages,
+                "in_memory_sort": "SORT" in stages,
+            }
+        report["query_plans"] = plans
+        return report
+
 db = Database()
@@ -1,19 +1,43 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Body, Depends, Request
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Body, Depends, Request, Query, HTTPException
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from src.services.ai.llmService import get_ai_response
-import src.services.ai.llmService as llm_module
-# from src.services.ai.transcriptionService import TranscriptionService
-# from src.services.ai.ttsService import TextToSpeechService
-from src.services.ai.gradingService import grade_interview
-from src.services.reportService import save_report_to_db, get_recent_reports
-from src.services.authService import get_current_user
+from src.services.ai.llmService import get_ai_response, stream_ai_response, summarize_turns, generate_dsa_problem, FALLBACK_RESPONSE, GREETING
+from src.services.ai.questionPool import question_pool
+from src.services.ai.responseCache import response_cache
+from src.services.ai.sessionEvaluator import register_evaluator, get_evaluator, resume_evaluator, release_evaluator
+from src.services.ai.contextManager import ConversationContext, count_tokens, count_message_tokens
+from src.services.ai.llmClient import llm_client
+from src.services.ai.admissionControl import LLMOverloaded, INTERACTIVE
+from src.services.ai.transcriptionService import TranscriptionService
+from src.services.ai.ttsService import tts_service, split_sentences, SentenceBuffer
+from src.services.ai.audioCache import audio_cache
+from src.services.ai.gradingService import grade_interview, GradingError
+from src.services.reportService import save_report_to_db, get_recent_reports, get_reports_page
+from src.services.analyticsService import get_user_analytics
+from src.services.gradingQueue import grading_queue
+from src.services.writeBehind import write_buffer
+from src.services.transcriptService import save_transcript
+from src.services.sessionStore import get_session_store, SessionTakenOver
+from src.services.sessionRuntime import SessionRuntime, SessionClosed, runtime_metrics, record_turn, turn_stats, clip_answer, SESSION_MAX_TURNS
+from src.services.authService import get_current_user, email_from_token, WS_ALLOW_ANONYMOUS
+from src.services.hashingService import password_hasher
+from src.services.userCache import user_cache
+from src.services.metrics import WS_ACCEPT_SECONDS, GRADING_SECONDS, ERRORS, observe, render, monitor_event_loop
 from src.config.database import db
+from src.config.logger import setup_logging, stop_logging
 from src.routes import auth
 import asyncio
 import json
-import base64
+import math
+import time
+import uuid
+import logging
+from functools import partial
+from datetime import datetime
+
+setup_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
@@ -25,7 +49,7 @@ async def websocket_ping(websocket: WebSocket):
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    print(f"Validation error: {exc.errors()}")
+    logger.warning("Validation error: %s", exc.errors())
     return JSONResponse(
         status_code=422,
         content={"detail": exc.errors(), "body": exc.body},
@@ -33,7 +57,8 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    print(f"Global exception: {exc}")
+    ERRORS.labels("http").inc()
+    logger.exception("Unhandled exception on %s %s", request.method, request.url.path, exc_info=exc)
     return JSONResponse(
         status_code=500,
         content={"detail": str(exc)},
@@ -46,22 +71,72 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # So the frontend can read how long to wait after a 503 from /grade
+    expose_headers=["Retry-After"],
 )
 
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 
+def index_task_done(task):
+    if not task.cancelled() and task.exception():
+        ERRORS.labels("mongo").inc()
+        logger.error("Ensuring indexes failed: %s", task.exception())
+
 @app.on_event("startup")
 async def startup_db_client():
     db.connect()
+    # Index builds can take a while on large collections, don't hold up startup
+    app.state.index_task = asyncio.create_task(db.ensure_indexes())
+    app.state.index_task.add_done_callback(index_task_done)
+    question_pool.prewarm()
+    grading_queue.start()
+    llm_client.connect()
+    # The fixed phrases are spoken in almost every session
+    tts_service.prewarm([GREETING, FALLBACK_RESPONSE])
+    app.state.loop_monitor = asyncio.create_task(monitor_event_loop())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.loop_monitor.cancel()
+    await grading_queue.stop()
+    # Buffered reports and transcripts must reach the database before it is closed
+    await write_buffer.close()
     db.close()
+    await question_pool.close()
+    await llm_client.close()
+    await tts_service.close()
+    password_hasher.shutdown()
+    stop_logging()
 
 @app.get("/")
 def read_root():
     return {"message": "InterviewFlow AI Backend is running! UPDATED"}
 
+@app.get("/stats")
+async def read_stats():
+    return {
+        "user_cache": user_cache.stats(),
+        "password_hasher": password_hasher.metrics(),
+        "dsa_question_pool": question_pool.metrics(),
+        "llm_response_cache": response_cache.metrics(),
+        "grading_queue": grading_queue.metrics(),
+        "tts_audio_cache": audio_cache.metrics(),
+        "sessions": runtime_metrics(),
+        "write_behind": write_buffer.metrics(),
+        "llm_admission": llm_client.admission.metrics(),
+    }
+
+@app.get("/stats/runtime")
+async def read_runtime_stats():
+    # Cheap enough to poll during soak tests
+    return runtime_metrics()
+
+@app.get("/metrics")
+def read_metrics():
+    # A plain def runs in the threadpool, so rendering never holds up the event loop
+    content, media_type = render()
+    return Response(content=content, media_type=media_type)
+
 @app.get("/users/me")
 async def read_users_me(current_user: dict = Depends(get_current_user)):
     return {
@@ -74,43 +149,410 @@ async def read_users_me(current_user: dict = Depends(get_current_user)):
 async def generate_report(data: dict = Body(...), current_user: dict = Depends(get_current_user)):
     history = data.get("history", [])
     interview_type = data.get("type", "technical")
+
+    if data.get("async"):
+        # Queue the job and return immediately; poll /grade/jobs/{job_id} or
+        # listen for grading_complete on the interview socket named by session_id
+        if not db.client:
+            raise HTTPException(status_code=503, detail="Database not connected")
+        job_id = await grading_queue.enqueue(
+            current_user["email"], history, interview_type, session_id=data.get("session_id")
+        )
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued"})
     
-    report = await grade_interview(history, interview_type)
-    
-    # Save the report to MongoDB with user email
-    await save_report_to_db(report, interview_type, user_email=current_user["email"])
+    with observe(GRADING_SECONDS, "request"):
+        # Reuse the per-turn state of the live session when the client names it
+        try:
+            report = await grade_interview(
+                history, interview_type,
+                evaluator=get_evaluator(data.get("session_id"), interview_type, user=current_user["email"]),
+                user=current_user["email"],
+            )
+        except LLMOverloaded as e:
+            raise HTTPException(
+                status_code=503,
+                detail="Grading is busy, please try again",
+                headers={"Retry-After": str(math.ceil(e.retry_after))},
+            )
+        except GradingError:
+            raise HTTPException(status_code=502, detail="Could not generate the report, please try again")
+
+        # Save the report to MongoDB with user email
+        try:
+            await save_report_to_db(report, interview_type, user_email=current_user["email"])
+        except Exception as e:
+            # The candidate still gets their report
+            ERRORS.labels("mongo").inc()
+            logger.error("Error saving report: %s", e)
     
     return report
 
+@app.get("/grade/jobs/{job_id}")
+async def get_grading_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    if not db.client:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    job = await grading_queue.get(job_id, current_user["email"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.get("/reports")
 async def get_reports(current_user: dict = Depends(get_current_user)):
     return await get_recent_reports(user_email=current_user["email"])
 
+@app.get("/analytics")
+async def get_analytics(current_user: dict = Depends(get_current_user)):
+    return await get_user_analytics(current_user["email"])
+
+@app.get("/reports/history")
+async def get_reports_history(
+    before: str = None,
+    page_size: int = Query(20, ge=1, le=100),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    current_user: dict = Depends(get_current_user),
+):
+    try:
+        return await get_reports_page(
+            user_email=current_user["email"],
+            page_size=page_size,
+            before=before,
+            summary=view == "summary",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/tts/audio/{key}")
+async def get_tts_audio(key: str):
+    # Content-addressed, so the file behind a key never changes. FileResponse
+    # hands the path to the server for a zero-copy send where it supports that.
+    path = audio_cache.path(key)
+    if not path:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    return FileResponse(path, media_type="audio/mpeg", headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
 @app.websocket("/ws/interview/{client_id}")
-async def websocket_endpoint(websocket: WebSocket, client_id: str, type: str = "technical", difficulty: str = "medium", topic: str = None):
-    print(f"WebSocket connection attempt: {client_id}, type: {type}, difficulty: {difficulty}, topic: {topic}")
+async def websocket_endpoint(websocket: WebSocket, client_id: str, type: str = "technical", difficulty: str = "medium", topic: str = None, stream: bool = False, tts: bool = False, resume: bool = False, last_seq: int = -1, retry_frames: bool = False):
+    """
+    Authentication: browsers can't set headers on a WebSocket, so the access
+    token is sent as the second of two subprotocols, ["bearer", token]. The
+    session belongs to that user.
+
+    Resume handshake: a client that lost its socket reconnects with the same
+    client_id, resume=true and the seq of the last turn it has (last_seq). If
+    the session is found in the session store, possibly written by another
+    worker, and belongs to the same user, the server answers with a
+    session_resumed frame listing the turns the client missed and the
+    interview carries on. The resuming socket takes the session over: a
+    socket still open on it is closed with code 4409 at its next write.
+    Otherwise a new session starts as usual. A new
+    session never replaces an existing one: if client_id is taken, the
+    session gets a fresh id, announced in a session_started frame, which the
+    client uses from then on (for /grade, and to resume).
+
+    When LLM admission control sheds a reply, a client that connected with
+    retry_frames=true gets a turn_failed frame (retryable, with retry_after in
+    seconds) instead of a reply, and sends {"type": "retry_turn"} once
+    retry_after has passed. Other clients get FALLBACK_RESPONSE as the reply.
+    """
+    accepting_at = time.perf_counter()
+    protocols = websocket.scope.get("subprotocols") or []
+    token = protocols[1] if len(protocols) == 2 and protocols[0] == "bearer" else None
+    user_email = email_from_token(token) if token else None
+    if user_email is None and not WS_ALLOW_ANONYMOUS:
+        # Rejects the handshake
+        await websocket.close(code=1008)
+        return
+    # Per-user LLM limits follow the account, not the session, so opening more sockets doesn't raise them
+    rate_limit_key = user_email or client_id
     try:
-        await websocket.accept()
-        print(f"WebSocket accepted: {client_id}")
+        await websocket.accept(subprotocol="bearer" if token else None)
     except Exception as e:
-        print(f"WebSocket accept failed: {e}")
+        ERRORS.labels("websocket").inc()
+        logger.warning("WebSocket accept failed: %s", e, extra={"session_id": client_id})
         return
+    logger.info("WebSocket accepted", extra={
+        "session_id": client_id, "type": type, "difficulty": difficulty, "topic": topic,
+        "stream": stream, "tts": tts, "resume": resume,
+    })
+
+    started_at = datetime.utcnow()
+    # Session state is written through to the store so any worker can resume it
+    store = get_session_store()
+    # Identifies this socket as the session's writer; a later resume takes it over
+    owner = uuid.uuid4().hex
+    state = None
+    if resume:
+        try:
+            # Someone else's session is treated as unknown
+            if await store.claim(client_id, owner, {"type": type, "user": user_email}):
+                state = await store.load(client_id)
+        except Exception as e:
+            logger.error("Could not load session: %s", e, extra={"session_id": client_id})
+
+    renamed = False
+    if not state:
+        meta = {"type": type, "difficulty": difficulty, "topic": topic, "user": user_email}
+        try:
+            if not await store.create(client_id, meta, owner):
+                # Never overwrite a stored session, whoever it belongs to
+                client_id = f"{client_id}-{uuid.uuid4().hex[:8]}"
+                renamed = True
+                await store.create(client_id, meta, owner)
+        except Exception as e:
+            ERRORS.labels("session_store").inc()
+            logger.error("Could not create session: %s", e, extra={"session_id": client_id})
+
+    # Store writes run detached, so they neither hold up the socket nor get cancelled with it
+    pending_writes = set()
+    taken_over = False
+
+    def persisted(task):
+        nonlocal taken_over
+        pending_writes.discard(task)
+        if task.cancelled() or not task.exception():
+            return
+        if isinstance(task.exception(), SessionTakenOver):
+            # Another socket resumed the session and carries on from here; this one is stale
+            if not taken_over:
+                taken_over = True
+                logger.info("Session resumed elsewhere, closing this socket", extra={"session_id": client_id})
+                # 4409: an application close code, "conflict"
+                session.close(4409, "Session resumed on another connection")
+            return
+        ERRORS.labels("session_store").inc()
+        logger.error("Could not persist session: %s", task.exception(), extra={"session_id": client_id})
+
+    def persist(coro):
+        task = asyncio.create_task(coro)
+        pending_writes.add(task)
+        task.add_done_callback(persisted)
+
+    def on_fold(ctx):
+        persist(store.update(client_id, {"summary": ctx.summary, "folded_turns": ctx.folded_turns}, owner))
+
+    # Full transcript lives in context.history; the model only sees context.messages()
+    context = ConversationContext(summarizer=summarize_turns, on_fold=on_fold)
+    next_seq = 0
+
+    def record(role, content, pinned=False, kind=None):
+        """Adds a turn to the context and appends it to the session store. Returns its seq."""
+        nonlocal next_seq
+        context.append(role, content, pinned=pinned)
+        turn = {"seq": next_seq, "role": role, "content": content, "pinned": pinned}
+        if kind:
+            turn["kind"] = kind
+        next_seq += 1
+        persist(store.append_turn(client_id, turn, owner))
+        return turn["seq"]
+
+    def on_assessed(seq, assessment):
+        persist(store.set_assessment(client_id, seq, assessment))
 
-    history = []
+    # Scores the session turn by turn so /grade only has to merge. A session
+    # resumed on this worker keeps its evaluator; elsewhere it is rebuilt from
+    # the stored turns and their assessments, without asking the model again.
+    evaluator = resume_evaluator(client_id, type, user_email) if state else None
+    if evaluator is None:
+        evaluator = register_evaluator(client_id, type, user_email, on_assessed)
+        if state:
+            question = ""
+            for turn in state["turns"]:
+                if turn["role"] == "assistant":
+                    question = turn["content"]
+                else:
+                    evaluator.replay_turn(question, turn["content"], turn.get("kind", "answer"), turn.get("assessment"))
+    else:
+        evaluator.on_assessed = on_assessed
+
+    def last_question():
+        for message in reversed(context.history):
+            if message["role"] == "assistant":
+                return message["content"]
+        return ""
     
-    # Queue for sending messages back to the client
-    response_queue = asyncio.Queue()
+    # Bounded outbound buffer and the tasks of this session
+    session = SessionRuntime(websocket)
+    # Reports graded in the background for this session are pushed here too
+    grading_queue.subscribe(client_id, session, user_email)
     
     # State to hold current user answer
     current_transcript = []
 
+    # Server-side STT, opened on the first binary audio frame
+    transcription = None
+    transcription_ready = False
+
+    def on_transcript(text):
+        current_transcript.append(text)
+        persist(store.update(client_id, {"pending_transcript": list(current_transcript)}, owner))
+        session.offer({"type": "transcript", "text": text})
+
+    async def handle_audio(audio_data):
+        nonlocal transcription, transcription_ready
+        if transcription is None:
+            transcription = TranscriptionService()
+            transcription_ready = await transcription.connect(on_transcript)
+            if not transcription_ready:
+                await session.send({"type": "system", "text": "Server-side transcription is unavailable."})
+        if transcription_ready:
+            transcription.send_audio(audio_data)
+
+    # Server-side TTS: sentences are synthesized one at a time, in order, and each
+    # sentence's audio goes out as binary frames between audio_start and audio_end
+    speech_queue = asyncio.Queue()
+
+    def speak(text):
+        if tts and text:
+            speech_queue.put_nowait(text)
+
+    async def tts_pipeline():
+        while True:
+            sentence = await speech_queue.get()
+            # key names the audio in the cache, see /tts/audio/{key}
+            await session.send({"type": "audio_start", "text": sentence, "key": tts_service.cache_key(sentence)})
+            async for chunk in tts_service.stream_audio(sentence):
+                await session.send(chunk)
+            await session.send({"type": "audio_end"})
+
+    tts_task = session.spawn(tts_pipeline()) if tts else None
+
+    async def reply(turn):
+        """
+        Generates the interviewer's next turn from history and queues it for the client.
+        In streaming mode the text goes out as ai_response_delta frames followed by one
+        ai_response_done frame carrying the full reply. turn tracks what was generated
+        and sent, in case the turn is interrupted. Raises LLMOverloaded if the turn was shed.
+        """
+        messages = context.messages()
+        turn["prompt_tokens"] = count_message_tokens(messages)
+
+        if not stream:
+            ai_reply = await get_ai_response(messages, type, difficulty, topic, user=rate_limit_key)
+            turn["generated_tokens"] = count_tokens(ai_reply)
+            await session.send({"type": "ai_response", "text": ai_reply})
+            turn["parts"].append(ai_reply)
+            turn["delivered_tokens"] = turn["generated_tokens"]
+            for sentence in split_sentences(ai_reply):
+                speak(sentence)
+            return ai_reply
+
+        sentences = SentenceBuffer()
+        async for delta in stream_ai_response(messages, type, difficulty, topic, user=rate_limit_key):
+            tokens = count_tokens(delta)
+            turn["generated_tokens"] += tokens
+            await session.send({"type": "ai_response_delta", "text": delta})
+            turn["parts"].append(delta)
+            turn["delivered_tokens"] += tokens
+            # Start synthesizing each sentence as soon as it is complete
+            for sentence in sentences.feed(delta):
+                speak(sentence)
+
+        speak(sentences.flush())
+        ai_reply = "".join(turn["parts"])
+        await session.send({"type": "ai_response_done", "text": ai_reply})
+        return ai_reply
+
+    # The turn being generated. A new answer, a barge_in frame or a disconnect
+    # cancels it, which also cancels the request to the model.
+    current_turn = None
+
+    async def run_turn(turn):
+        try:
+            ai_reply = await reply(turn)
+        except LLMOverloaded as e:
+            turn["shed"] = True
+            logger.warning("Interviewer turn shed: %s", e, extra={"session_id": client_id})
+            if retry_frames:
+                # Nothing was generated. The answer stays recorded; the client
+                # sends retry_turn after retry_after to ask for the reply again.
+                await session.send({"type": "turn_failed", "reason": e.reason, "retryable": True, "retry_after": round(e.retry_after, 1)})
+                return
+            # Clients that don't know turn_failed get the apology they always got
+            ai_reply = FALLBACK_RESPONSE
+            if stream:
+                await session.send({"type": "ai_response_delta", "text": ai_reply})
+            await session.send({"type": "ai_response_done" if stream else "ai_response", "text": ai_reply})
+            speak(ai_reply)
+        logger.debug("Interviewer replied: %s", ai_reply, extra={"session_id": client_id})
+        record("assistant", ai_reply)
+        context.schedule_fold()
+
+    def finish_turn(turn, task):
+        # A done callback, so turns cancelled before they even started are counted too
+        if task.cancelled():
+            interrupted_by = turn["interrupted_by"] or "disconnect"
+        elif turn.get("shed"):
+            turn_stats["shed"] += 1
+            return
+        elif task.exception() is None:
+            interrupted_by = None
+        else:
+            return
+        record_turn(turn["prompt_tokens"], turn["generated_tokens"], turn["delivered_tokens"], interrupted_by)
+
+    def start_turn():
+        nonlocal current_turn
+        current_turn = {
+            "prompt_tokens": 0,
+            "generated_tokens": 0,
+            "delivered_tokens": 0,
+            "parts": [],
+            "interrupted_by": None,
+        }
+        current_turn["task"] = session.spawn(run_turn(current_turn))
+        current_turn["task"].add_done_callback(partial(finish_turn, current_turn))
+
+    def interrupt(reason):
+        """Cancels the reply being generated and drops speech that hasn't been sent yet."""
+        nonlocal tts_task
+        interrupted = False
+        if current_turn and not current_turn["task"].done():
+            current_turn["interrupted_by"] = reason
+            current_turn["task"].cancel()
+            interrupted = True
+            if current_turn["parts"]:
+                # Keep what the candidate already saw, ahead of whatever they say next
+                record("assistant", "".join(current_turn["parts"]))
+
+        if tts:
+            dropped = 0
+            while not speech_queue.empty():
+                speech_queue.get_nowait()
+                dropped += 1
+            turn_stats["tts_sentences_dropped"] += dropped
+            # Restart the pipeline to abort the sentence being synthesized, if any
+            tts_task.cancel()
+            tts_task = session.spawn(tts_pipeline())
+            interrupted = interrupted or dropped > 0
+
+        if interrupted:
+            session.offer({"type": "turn_cancelled", "reason": reason})
+
+    async def turn_limit_reached():
+        if evaluator.candidate_turns < SESSION_MAX_TURNS:
+            return False
+        await session.send({"type": "system", "text": "This session has reached its turn limit. Please start a new one."})
+        session.close(1008, "Turn limit reached")
+        return True
+
     async def receive_audio():
         try:
             while True:
-                message = await websocket.receive()
-                # print(f"Received message type: {message.keys()}") # Debug
-                if "text" in message:
+                message = await session.receive()
+                if message.get("bytes"):
+                    await handle_audio(message["bytes"])
+                elif message.get("text"):
                     data = json.loads(message["text"])
+                    if data.get("type") in ("submit_answer", "submit_code"):
+                        if await turn_limit_reached():
+                            return
+                        # A new answer supersedes the reply still being generated
+                        interrupt(data["type"])
+
+                    if data.get("type") == "barge_in":
+                        # The candidate started talking over the interviewer
+                        interrupt("barge_in")
+
                     if data.get("type") == "submit_answer":
                         # User finished speaking, trigger AI
                         # Check if text was provided directly (Browser STT) or accumulated (Server STT)
@@ -118,73 +560,105 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str, type: str = "
                             full_answer = data.get("text")
                         else:
                             full_answer = " ".join(current_transcript)
+                        full_answer = clip_answer(full_answer)
                         
-                        current_transcript.clear() # Reset for next turn
+                        if current_transcript:
+                            current_transcript.clear() # Reset for next turn
+                            persist(store.update(client_id, {"pending_transcript": []}, owner))
                         
                         # Add to history
-                        history.append({"role": "user", "content": full_answer})
+                        evaluator.add_turn(last_question(), full_answer, seq=record("user", full_answer, kind="answer"))
                         
-                        # Get AI Response
-                        print(f"Calling AI Service from {llm_module.__file__}")
-                        ai_reply = await get_ai_response(history, type, difficulty, topic)
-                        print(f"AI Service returned: {ai_reply}")
-                        # ai_reply = "UPDATED MOCK"
-                        history.append({"role": "assistant", "content": ai_reply})
-                        
-                        # Send Text Response
-                        await response_queue.put({"type": "ai_response", "text": ai_reply})
+                        # Get AI Response without blocking the receive loop
+                        start_turn()
 
                     elif data.get("type") == "submit_code":
-                        code = data.get("text")
+                        code = clip_answer(data.get("text") or "")
                         language = data.get("language", "javascript")
                         
                         full_message = f"I have submitted the following code:\n```{language}\n{code}\n```"
                         
                         # Add to history
-                        history.append({"role": "user", "content": full_message})
+                        evaluator.add_turn(last_question(), full_message, kind="code", seq=record("user", full_message, kind="code"))
                         
                         # Get AI Response
-                        print(f"Processing Code Submission...")
-                        ai_reply = await get_ai_response(history, type, difficulty, topic)
-                        history.append({"role": "assistant", "content": ai_reply})
-                        
-                        # Send Text Response
-                        await response_queue.put({"type": "ai_response", "text": ai_reply})
+                        start_turn()
+
+                    elif data.get("type") == "retry_turn":
+                        # After a turn_failed frame: reply to the last answer again, unless that already happened
+                        turn_running = current_turn and not current_turn["task"].done()
+                        if not turn_running and context.history and context.history[-1]["role"] == "user":
+                            start_turn()
                         
-        except WebSocketDisconnect:
+        except (WebSocketDisconnect, SessionClosed):
             pass
         except Exception as e:
-            print(f"Error in receive_audio: {e}")
+            ERRORS.labels("websocket").inc()
+            logger.exception("Error in receive_audio", extra={"session_id": client_id})
+
+    async def send_greeting(greeting):
+        # The DSA problem statement must stay verbatim for the whole session
+        record("assistant", greeting, pinned=type == "dsa_practice")
+        await session.send({"type": "ai_response", "text": greeting})
+        for sentence in split_sentences(greeting):
+            speak(sentence)
 
-    async def send_responses():
+    async def generate_problem():
         try:
-            while True:
-                item = await response_queue.get()
-                
-                if item["type"] == "transcript":
-                    current_transcript.append(item["text"])
-                    await websocket.send_text(json.dumps(item))
-                else:
-                    await websocket.send_text(json.dumps(item))
-                
+            problem = await generate_dsa_problem(difficulty, topic, lane=INTERACTIVE, user=rate_limit_key)
         except Exception as e:
-            print(f"Error in send_responses: {e}")
-
-    # Initial greeting
-    if type == "dsa_practice":
-        # For DSA practice, generate a question immediately
-        print("Generating initial DSA question...")
-        # We simulate a user asking for a problem to trigger the AI
-        startup_history = [{"role": "user", "content": f"Generate a {difficulty} level DSA problem. Output ONLY the problem description. No greetings."}]
-        initial_greeting = await get_ai_response(startup_history, type, difficulty, topic)
+            logger.error("Error generating DSA problem: %s", e, extra={"session_id": client_id})
+            problem = FALLBACK_RESPONSE
+        await send_greeting(problem)
+
+    if state:
+        # Pick up where the session left off, on whichever worker it ran before
+        context.restore(state["turns"], state["meta"].get("summary", ""), state["meta"].get("folded_turns", 0))
+        next_seq = max((turn["seq"] for turn in state["turns"]), default=-1) + 1
+        current_transcript.extend(state["meta"].get("pending_transcript", []))
+        await session.send({
+            "type": "session_resumed",
+            "session_id": client_id,
+            "last_seq": next_seq - 1,
+            "missed": [
+                {"seq": turn["seq"], "role": turn["role"], "content": turn["content"]}
+                for turn in state["turns"] if turn["seq"] > last_seq
+            ],
+        })
     else:
-        initial_greeting = "Hello! I'm your interviewer today. Let's start with a simple question: Tell me about yourself."
+        if renamed:
+            await session.send({"type": "session_started", "session_id": client_id})
+        if resume:
+            await session.send({"type": "system", "text": "Could not resume the previous session, starting a new one."})
 
-    history.append({"role": "assistant", "content": initial_greeting})
-    await response_queue.put({"type": "ai_response", "text": initial_greeting})
+        # Initial greeting
+        if type == "dsa_practice":
+            # Take a pre-generated problem if one is ready, so the session starts instantly
+            problem = question_pool.pop(difficulty, topic)
+            if problem:
+                await send_greeting(problem)
+            else:
+                # Nothing pooled for this combination yet: acknowledge now, generate in the background
+                await session.send({"type": "system", "text": "Generating your problem..."})
+                session.spawn(generate_problem())
+        else:
+            await send_greeting(GREETING)
+    WS_ACCEPT_SECONDS.observe(time.perf_counter() - accepting_at)
 
     try:
-        await asyncio.gather(receive_audio(), send_responses())
-    except Exception as e:
-        print(f"Connection closed: {e}")
+        # Returns as soon as the client goes away or the session is closed; the
+        # sender and every spawned task (greeting, TTS) are cancelled by then
+        await session.run(receive_audio())
+    finally:
+        grading_queue.unsubscribe(client_id, session)
+        release_evaluator(client_id, evaluator)
+        context.cancel()
+        if transcription:
+            await transcription.close()
+        if pending_writes:
+            # Let the last turns reach the store before the worker forgets the session
+            await asyncio.wait(set(pending_writes), timeout=5)
+        # A stale socket's history is shorter than the one that took the session over
+        if evaluator.candidate_turns and not taken_over:
+            await save_transcript(client_id, type, context.history, started_at, difficulty=difficulty, topic=topic, user_email=user_email)
 
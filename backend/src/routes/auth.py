@@ -1,33 +1,43 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from src.models.user import UserCreate, UserLogin, Token
-from src.services.authService import get_password_hash, verify_password, create_access_token
+from src.services.authService import get_password_hash, verify_password, password_needs_rehash, create_access_token
+from src.services.hashingService import HashingQueueFull
 from src.config.database import db
+from src.services.userCache import user_cache
 from fastapi.security import OAuth2PasswordBearer
+import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def hashing_busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please try again",
+        headers={"Retry-After": "1"},
+    )
 
 @router.post("/register", response_model=Token)
 async def register(user: UserCreate):
     try:
         if not db.client:
-            print("Database client is None")
+            logger.error("Registration failed: database not connected")
             raise HTTPException(status_code=500, detail="Database not connected")
         
         users_collection = db.get_db()["users"]
         
         # Check if user exists
-        print(f"Checking for existing user: {user.email}")
         existing_user = await users_collection.find_one({"email": user.email})
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
         
         # Create new user
-        print("Hashing password...")
         try:
-            hashed_password = get_password_hash(user.password)
-            print(f"Password hashed: {hashed_password[:10]}...")
+            hashed_password = await get_password_hash(user.password)
+        except HashingQueueFull:
+            raise hashing_busy_exception()
         except Exception as e:
-            print(f"Hashing failed: {e}")
+            logger.error("Hashing failed: %s", e)
             raise e
 
         new_user = {
@@ -36,22 +46,23 @@ async def register(user: UserCreate):
             "hashed_password": hashed_password
         }
         
-        print(f"Inserting new user: {user.email}")
         result = await users_collection.insert_one(new_user)
-        print(f"User inserted with ID: {result.inserted_id}")
+        logger.info("User registered", extra={"user_id": str(result.inserted_id)})
+        user_cache.invalidate(user.email)
         
         # Create token
         access_token = create_access_token(data={"sub": user.email})
         return {"access_token": access_token, "token_type": "bearer"}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error during registration: {e}")
+        logger.exception("Error during registration")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/login", response_model=Token)
 async def login(user: UserLogin):
-    print(f"Login attempt for: {user.email}")
     if not db.client:
-        print("Database not connected during login")
+        logger.error("Login failed: database not connected")
         raise HTTPException(status_code=500, detail="Database not connected")
         
     users_collection = db.get_db()["users"]
@@ -59,20 +70,34 @@ async def login(user: UserLogin):
     # Find user
     db_user = await users_collection.find_one({"email": user.email})
     if not db_user:
-        print(f"User not found: {user.email}")
+        logger.debug("Login for unknown user")
         raise HTTPException(status_code=400, detail="Incorrect email or password")
         
     # Verify password
-    print("Verifying password...")
     try:
-        if not verify_password(user.password, db_user["hashed_password"]):
-            print("Password verification failed")
+        if not await verify_password(user.password, db_user["hashed_password"]):
+            logger.debug("Password verification failed")
             raise HTTPException(status_code=400, detail="Incorrect email or password")
+    except HashingQueueFull:
+        raise hashing_busy_exception()
     except Exception as e:
-        print(f"Error during password verification: {e}")
+        logger.debug("Error during password verification: %s", e)
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+
+    # Upgrade hashes made with an older cost factor while we have the plain password
+    if password_needs_rehash(db_user["hashed_password"]):
+        try:
+            new_hash = await get_password_hash(user.password)
+            await users_collection.update_one(
+                {"_id": db_user["_id"], "hashed_password": db_user["hashed_password"]},
+                {"$set": {"hashed_password": new_hash}}
+            )
+            user_cache.invalidate(user.email)
+            logger.info("Upgraded password hash", extra={"user_id": str(db_user["_id"])})
+        except Exception as e:
+            # Not fatal, the old hash still works and we retry on the next login
+            logger.warning("Password rehash skipped: %s", e)
         
     # Create token
-    print("Login successful, creating token")
     access_token = create_access_token(data={"sub": user.email})
     return {"access_token": access_token, "token_type": "bearer"}
@@ -0,0 +1,288 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque, OrderedDict
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from dotenv import load_dotenv
+from src.services.metrics import LLM_ADMISSIONS, QUEUE_WAIT_SECONDS
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+# Global request rate towards the provider; 0 disables the limit
+LLM_RATE_PER_SECOND = float(os.environ.get("LLM_RATE_PER_SECOND", "20"))
+LLM_BURST = int(os.environ.get("LLM_BURST", "40"))
+# Per-user request rate, for calls made on behalf of a user; 0 disables the limit
+LLM_USER_RATE_PER_SECOND = float(os.environ.get("LLM_USER_RATE_PER_SECOND", "0.5"))
+LLM_USER_BURST = int(os.environ.get("LLM_USER_BURST", "4"))
+LLM_USER_BUCKETS = int(os.environ.get("LLM_USER_BUCKETS", "10000"))
+# Share of the concurrency slots background work may hold, so live turns always find one
+LLM_BACKGROUND_SHARE = float(os.environ.get("LLM_BACKGROUND_SHARE", "0.75"))
+LLM_INTERACTIVE_WAIT_SECONDS = float(os.environ.get("LLM_INTERACTIVE_WAIT_SECONDS", "3"))
+# Kept well below GRADING_LEASE_SECONDS, so a waiting grading job never loses its lease
+LLM_BACKGROUND_WAIT_SECONDS = float(os.environ.get("LLM_BACKGROUND_WAIT_SECONDS", "30"))
+LLM_MAX_QUEUED = int(os.environ.get("LLM_MAX_QUEUED", "256"))  # per lane
+# Used when the provider rejects a request without saying how long to wait
+LLM_DEFAULT_BACKOFF_SECONDS = float(os.environ.get("LLM_DEFAULT_BACKOFF_SECONDS", "1"))
+LLM_MAX_BACKOFF_SECONDS = float(os.environ.get("LLM_MAX_BACKOFF_SECONDS", "60"))
+
+# A candidate is waiting on the answer: live interview turns, the DSA problem of a new session
+INTERACTIVE = "interactive"
+# Nobody is watching: grading, turn assessments, summaries, question pool refills
+BACKGROUND = "background"
+LANES = (INTERACTIVE, BACKGROUND)
+
+
+class LLMOverloaded(Exception):
+    """
+    Raised when a call is shed instead of sent, or the provider rejected it as
+    rate limited. retry_after is how many seconds the caller should wait.
+    """
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"LLM call rejected ({reason}), retry in {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Holds up to burst tokens and refills at rate tokens per second."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = now
+
+    def delay(self, now):
+        """Seconds until a token is available, 0 if one is available now."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        if self.delay(now) > 0:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def retry_after_seconds(headers):
+    """The wait a provider asked for in retry-after-ms or retry-after, or None."""
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            # An HTTP date
+            return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+class AdmissionController:
+    """
+    Decides when an LLM call may go out.
+
+    Every call takes a token from the global bucket and a concurrency slot,
+    and a call made for a user also takes one from that user's bucket. Calls
+    wait in one of two lanes; the interactive lane is always served first,
+    and background work never holds more than its share of the slots. A call
+    that cannot start within its lane's wait is shed with LLMOverloaded
+    rather than left hanging: interactive calls give up after a few seconds,
+    and a user over their rate is turned away at once. When the provider
+    answers 429, backoff() holds every lane for the retry-after it sent.
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, rate=LLM_RATE_PER_SECOND, burst=LLM_BURST,
+                 user_rate=LLM_USER_RATE_PER_SECOND, user_burst=LLM_USER_BURST, background_share=LLM_BACKGROUND_SHARE,
+                 max_queued=LLM_MAX_QUEUED):
+        self.max_concurrency = max_concurrency
+        self.background_limit = max(1, int(max_concurrency * background_share))
+        self.max_queued = max_queued
+        self.max_wait = {INTERACTIVE: LLM_INTERACTIVE_WAIT_SECONDS, BACKGROUND: LLM_BACKGROUND_WAIT_SECONDS}
+        self.bucket = TokenBucket(rate, burst, time.monotonic()) if rate > 0 else None
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.user_buckets = OrderedDict()
+        self.in_flight = {lane: 0 for lane in LANES}
+        # [future, deadline] per waiting call, oldest first
+        self.waiters = {lane: deque() for lane in LANES}
+        self.blocked_until = 0.0
+        self._wakeup: asyncio.TimerHandle = None
+        self.stats = {
+            "admitted": {lane: 0 for lane in LANES},
+            "shed": {"user_rate": 0, "queue_full": 0, "queue_timeout": 0, "provider_backoff": 0},
+            "provider_backoffs": 0,
+        }
+
+    def _user_bucket(self, user, now):
+        bucket = self.user_buckets.get(user)
+        if bucket is None:
+            bucket = self.user_buckets[user] = TokenBucket(self.user_rate, self.user_burst, now)
+            if len(self.user_buckets) > LLM_USER_BUCKETS:
+                self.user_buckets.popitem(last=False)
+        else:
+            self.user_buckets.move_to_end(user)
+        return bucket
+
+    def _reject(self, lane, reason, retry_after):
+        self.stats["shed"][reason] += 1
+        LLM_ADMISSIONS.labels(lane, reason).inc()
+        return LLMOverloaded(reason, max(retry_after, 0.1))
+
+    def _has_slot(self, lane):
+        if sum(self.in_flight.values()) >= self.max_concurrency:
+            return False
+        return lane == INTERACTIVE or self.in_flight[BACKGROUND] < self.background_limit
+
+    def _ready_in(self, now):
+        """Seconds until the provider backoff ends and the global bucket has a token."""
+        delay = max(0.0, self.blocked_until - now)
+        if self.bucket:
+            delay = max(delay, self.bucket.delay(now))
+        return delay
+
+    def _start(self, lane, now):
+        if self.bucket:
+            self.bucket.take(now)
+        self.in_flight[lane] += 1
+        self.stats["admitted"][lane] += 1
+        LLM_ADMISSIONS.labels(lane, "admitted").inc()
+
+    def _dispatch(self):
+        """Starts waiting calls, interactive first, for as long as slots and tokens last."""
+        if self._wakeup:
+            self._wakeup.cancel()
+            self._wakeup = None
+        now = time.monotonic()
+        for lane in LANES:
+            queue = self.waiters[lane]
+            while queue:
+                future, _ = queue[0]
+                if future.done():
+                    queue.popleft()
+                    continue
+                if not self._has_slot(lane):
+                    break
+                delay = self._ready_in(now)
+                if delay > 0:
+                    # Only time stands in the way; nothing else would wake the queue up
+                    self._wakeup = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                    return
+                queue.popleft()
+                self._start(lane, now)
+                future.set_result(None)
+            if queue:
+                # Background calls never overtake a waiting interactive one
+                return
+
+    async def acquire(self, lane=BACKGROUND, user=None):
+        """Waits for a slot in lane, or raises LLMOverloaded. Pair with release()."""
+        now = time.monotonic()
+        deadline = now + self.max_wait[lane]
+
+        if user is not None and self.user_rate > 0:
+            bucket = self._user_bucket(user, now)
+            while not bucket.take(now):
+                delay = bucket.delay(now)
+                # A live turn is refused at once; background work may wait its turn
+                if lane == INTERACTIVE or now + delay > deadline:
+                    raise self._reject(lane, "user_rate", delay)
+                await asyncio.sleep(delay)
+                now = time.monotonic()
+
+        if self.blocked_until > deadline:
+            raise self._reject(lane, "provider_backoff", self.blocked_until - now)
+
+        queue = self.waiters[lane]
+        waiting_ahead = any(self.waiters[other] for other in LANES[:LANES.index(lane) + 1])
+        if not waiting_ahead and self._has_slot(lane) and self._ready_in(now) == 0:
+            self._start(lane, now)
+            QUEUE_WAIT_SECONDS.labels(f"llm_{lane}").observe(0)
+            return
+        if len(queue) >= self.max_queued:
+            raise self._reject(lane, "queue_full", self._ready_in(now) or self.max_wait[lane])
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = [future, deadline]
+        queue.append(waiter)
+        self._dispatch()
+        try:
+            await asyncio.wait({future}, timeout=max(0.0, deadline - now))
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release(lane)
+            else:
+                future.cancel()
+                self._forget(queue, waiter)
+            raise
+        if not future.done():
+            future.cancel()
+            self._forget(queue, waiter)
+            raise self._reject(lane, "queue_timeout", self._ready_in(time.monotonic()) or self.max_wait[lane])
+        future.result()  # Raises if backoff() shed it
+        QUEUE_WAIT_SECONDS.labels(f"llm_{lane}").observe(time.monotonic() - now)
+
+    def _forget(self, queue, waiter):
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, lane):
+        self.in_flight[lane] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, lane=BACKGROUND, user=None):
+        await self.acquire(lane, user)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+    def backoff(self, retry_after=None):
+        """
+        Holds every lane until retry_after seconds from now, as the provider
+        asked. Waiting calls that would time out before then are shed now.
+        Returns the backoff applied.
+        """
+        if retry_after is None or retry_after <= 0:
+            retry_after = LLM_DEFAULT_BACKOFF_SECONDS
+        retry_after = min(retry_after, LLM_MAX_BACKOFF_SECONDS)
+        now = time.monotonic()
+        if now + retry_after <= self.blocked_until:
+            return self.blocked_until - now
+
+        self.blocked_until = now + retry_after
+        self.stats["provider_backoffs"] += 1
+        logger.warning("LLM provider rate limited, holding requests for %.1fs", retry_after)
+        for lane in LANES:
+            for future, deadline in self.waiters[lane]:
+                if deadline < self.blocked_until and not future.done():
+                    future.set_exception(self._reject(lane, "provider_backoff", retry_after))
+        self._dispatch()
+        return retry_after
+
+    def metrics(self):
+        return {
+            "in_flight": dict(self.in_flight),
+            "queued": {lane: sum(not future.done() for future, _ in self.waiters[lane]) for lane in LANES},
+            "admitted": dict(self.stats["admitted"]),
+            "shed": dict(self.stats["shed"]),
+            "provider_backoffs": self.stats["provider_backoffs"],
+            "backoff_remaining_seconds": round(max(0.0, self.blocked_until - time.monotonic()), 3),
+            "max_concurrency": self.max_concurrency,
+            "background_limit": self.background_limit,
+            "tracked_users": len(self.user_buckets),
+        }
@@ -0,0 +1,201 @@
+import os
+import re
+import json
+import asyncio
+import logging
+import hashlib
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+TTS_CACHE_MEMORY_BYTES = int(os.environ.get("TTS_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR")  # Optional on-disk tier
+TTS_CACHE_DISK_BYTES = int(os.environ.get("TTS_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def audio_key(voice_id, model_id, voice_settings, text):
+    """Content address of one synthesized utterance. Whitespace differences don't change the audio."""
+    payload = {
+        "voice_id": voice_id,
+        "model_id": model_id,
+        "voice_settings": voice_settings,
+        "text": re.sub(r"\s+", " ", text).strip(),
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def is_audio_key(key):
+    return bool(_KEY_PATTERN.match(key or ""))
+
+
+class AudioCache:
+    """
+    Content-addressed cache of synthesized audio.
+
+    The memory tier is an LRU bounded by total bytes. When a directory is
+    configured, every entry is also written to a disk tier, bounded by total
+    bytes as well, that survives restarts and can be served straight from
+    the file (see path()). Entries never expire: the same key always means
+    the same audio. Disk I/O runs in a thread so it never blocks the event loop.
+    """
+
+    def __init__(self, memory_bytes=TTS_CACHE_MEMORY_BYTES, directory=TTS_CACHE_DIR,
+                 disk_bytes=TTS_CACHE_DISK_BYTES):
+        self.memory_limit = memory_bytes
+        self.directory = directory
+        self.disk_limit = disk_bytes
+        self.entries = OrderedDict()  # key -> audio bytes
+        self.memory_bytes = 0
+        self.disk_entries = None  # key -> size in LRU order, loaded from the directory on first use
+        self.disk_bytes = 0
+        self.disk_lock = asyncio.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "saved_bytes": 0,
+        }
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.mp3")
+
+    def _scan_disk(self):
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                key = name[:-4]
+                if name.endswith(".mp3") and is_audio_key(key):
+                    stat = os.stat(os.path.join(root, name))
+                    found.append((stat.st_mtime, key, stat.st_size))
+        found.sort()  # Least recently used first
+        return found
+
+    async def _load_disk_index(self):
+        if self.disk_entries is not None:
+            return
+        self.disk_entries = OrderedDict()
+        try:
+            found = await asyncio.to_thread(self._scan_disk)
+        except OSError as e:
+            logger.warning("Audio cache could not scan %s: %s", self.directory, e)
+            return
+        for _, key, size in found:
+            self.disk_entries[key] = size
+            self.disk_bytes += size
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        with open(path, "rb") as f:
+            audio = f.read()
+        os.utime(path)  # Keeps the LRU order across restarts
+        return audio
+
+    def _write_disk(self, key, audio):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, path)  # Atomic, so readers never see a partial file
+
+    def _remove_disk(self, keys):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _remember(self, key, audio):
+        if len(audio) > self.memory_limit:
+            return
+        if key in self.entries:
+            self.memory_bytes -= len(self.entries.pop(key))
+        self.entries[key] = audio
+        self.memory_bytes += len(audio)
+        while self.memory_bytes > self.memory_limit:
+            _, evicted = self.entries.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+            self.stats["memory_evictions"] += 1
+
+    async def get(self, key):
+        audio = self.entries.get(key)
+        if audio is not None:
+            self.entries.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            self.stats["saved_bytes"] += len(audio)
+            return audio
+
+        if self.directory:
+            await self._load_disk_index()
+            if key in self.disk_entries:
+                try:
+                    audio = await asyncio.to_thread(self._read_disk, key)
+                except OSError:
+                    # Evicted by another worker sharing the directory
+                    self.disk_bytes -= self.disk_entries.pop(key, 0)
+                else:
+                    self.disk_entries.move_to_end(key)
+                    self._remember(key, audio)
+                    self.stats["disk_hits"] += 1
+                    self.stats["saved_bytes"] += len(audio)
+                    return audio
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key, audio):
+        self._remember(key, audio)
+        self.stats["stores"] += 1
+
+        if not self.directory or len(audio) > self.disk_limit:
+            return
+        async with self.disk_lock:
+            await self._load_disk_index()
+            try:
+                await asyncio.to_thread(self._write_disk, key, audio)
+            except OSError as e:
+                logger.warning("Audio cache disk write failed: %s", e)
+                return
+
+            self.disk_bytes += len(audio) - self.disk_entries.pop(key, 0)
+            self.disk_entries[key] = len(audio)
+            evicted = []
+            while self.disk_bytes > self.disk_limit:
+                old_key, size = self.disk_entries.popitem(last=False)
+                self.disk_bytes -= size
+                evicted.append(old_key)
+            if evicted:
+                self.stats["disk_evictions"] += len(evicted)
+                await asyncio.to_thread(self._remove_disk, evicted)
+
+    def path(self, key):
+        """Path of the entry in the disk tier, or None if it isn't there."""
+        if not self.directory or not is_audio_key(key):
+            return None
+        if self.disk_entries is not None and key not in self.disk_entries:
+            return None
+        path = self._path(key)
+        return path if os.path.isfile(path) else None
+
+    def metrics(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "memory_entries": len(self.entries),
+            "memory_bytes": self.memory_bytes,
+            "disk_entries": len(self.disk_entries or ()),
+            "disk_bytes": self.disk_bytes,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+audio_cache = AudioCache()
@@ -0,0 +1,157 @@
+import os
+import re
+import math
+import asyncio
+import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_KEEP_RECENT_TURNS = int(os.environ.get("CONTEXT_KEEP_RECENT_TURNS", "6"))
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators the chat template adds per message
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def count_tokens(text):
+    """
+    Cheap estimate of BPE token count: one token per punctuation mark and
+    roughly one per four characters of each word. Good enough for budgeting
+    without pulling in a tokenizer.
+    """
+    if not text:
+        return 0
+    total = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        total += math.ceil(len(piece) / 4) if piece[0].isalnum() or piece[0] == "_" else 1
+    return total
+
+def count_message_tokens(messages):
+    return sum(count_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+def extractive_summary(previous_summary, turns, max_chars=200, max_tokens=CONTEXT_TOKEN_BUDGET // 4):
+    """
+    Fallback summarizer: keeps the first sentence of each turn, dropping the
+    oldest lines once the summary exceeds max_tokens. Used when the model
+    summary fails, so the window still stays bounded.
+    """
+    lines = previous_summary.split("\n") if previous_summary else []
+    for turn in turns:
+        speaker = "Interviewer" if turn["role"] == "assistant" else "Candidate"
+        first_sentence = re.split(r"(?<=[.!?])\s", turn["content"].strip(), maxsplit=1)[0]
+        lines.append(f"{speaker}: {first_sentence[:max_chars]}")
+
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ConversationContext:
+    """
+    Keeps what the model sees within a token budget.
+
+    history holds every turn. The model gets the pinned turns (e.g. the DSA
+    problem statement), a rolling summary of older turns, and the most recent
+    turns verbatim. When the verbatim part grows past the budget, the oldest
+    turns are folded into the summary in one batch, down to half the budget,
+    so the summarizer runs every few turns rather than on every turn, and only
+    sees the previous summary plus the turns being folded.
+    """
+
+    def __init__(self, token_budget=CONTEXT_TOKEN_BUDGET, keep_recent=CONTEXT_KEEP_RECENT_TURNS, summarizer=None, on_fold=None):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.summarizer = summarizer
+        self.on_fold = on_fold  # Called with the context after each fold, e.g. to persist the summary
+        self.history = []
+        self.pinned = []
+        self.turns = []
+        self.summary = ""
+        self.folded_turns = 0
+        self.folds = 0
+        self._fold_task: asyncio.Task = None
+
+    def append(self, role, content, pinned=False):
+        message = {"role": role, "content": content}
+        self.history.append(message)
+        if pinned:
+            self.pinned.append(message)
+        else:
+            self.turns.append(message)
+
+    def restore(self, messages, summary="", folded_turns=0):
+        """
+        Rebuilds the context of a resumed session from its stored turns
+        (dicts with role, content and optionally pinned) and its last summary.
+        """
+        for message in messages:
+            self.append(message["role"], message["content"], pinned=message.get("pinned", False))
+        if summary:
+            del self.turns[:folded_turns]
+            self.summary = summary
+            self.folded_turns = folded_turns
+
+    def messages(self):
+        messages = list(self.pinned)
+        if self.summary:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier part of this interview:\n{self.summary}"
+            })
+        messages.extend(self.turns)
+        return messages
+
+    def prompt_tokens(self):
+        return count_message_tokens(self.messages())
+
+    def needs_fold(self):
+        return len(self.turns) > self.keep_recent and self.prompt_tokens() > self.token_budget
+
+    def _turns_to_fold(self):
+        """How many of the oldest turns to fold to get back under the low-water mark."""
+        low_water = self.token_budget // 2
+        tokens = self.prompt_tokens()
+        count = 0
+        while len(self.turns) - count > self.keep_recent and tokens > low_water:
+            tokens -= count_message_tokens([self.turns[count]])
+            count += 1
+        return count
+
+    async def fold(self):
+        count = self._turns_to_fold()
+        if count == 0:
+            return
+
+        folding = self.turns[:count]
+        try:
+            summary = await self.summarizer(self.summary, folding) if self.summarizer else None
+        except Exception as e:
+            logger.warning("Context summary failed, using extractive fallback: %s", e)
+            summary = None
+        if not summary:
+            summary = extractive_summary(self.summary, folding)
+
+        # New turns may have been appended meanwhile, but only at the end
+        del self.turns[:count]
+        self.summary = summary
+        self.folded_turns += count
+        self.folds += 1
+        if self.on_fold:
+            self.on_fold(self)
+
+    def schedule_fold(self):
+        """Starts a fold in the background if one is needed and none is running."""
+        if self._fold_task and not self._fold_task.done():
+            return
+        if self.needs_fold():
+            self._fold_task = asyncio.create_task(self.fold())
+
+    async def wait_for_fold(self):
+        """Waits for the background fold, if one is running."""
+        if self._fold_task and not self._fold_task.done():
+            await self._fold_task
+
+    def cancel(self):
+        if self._fold_task and not self._fold_task.done():
+            self._fold_task.cancel()
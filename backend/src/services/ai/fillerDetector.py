@@ -0,0 +1,71 @@
+import os
+import re
+import string
+import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+DEFAULT_FILLERS = ["um", "uh", "like", "you know", "basically", "actually", "literally"]
+# Comma-separated list, e.g. "um,uh,you know,sort of"
+FILLER_WORDS = os.environ.get("FILLER_WORDS")
+
+
+class FillerDetector:
+    """
+    Finds filler words and phrases in one pass over the text.
+
+    The lexicon is compiled into a single case-insensitive alternation with
+    word boundaries, so matching is one regex scan. Longer entries come first so "you know" wins over a
+    shorter entry that shares its prefix, and the words inside a phrase may be
+    separated by any whitespace. A hyphen counts as part of a word, so "like"
+    is not found in "like-minded". Punctuation around lexicon words is
+    stripped ("um," is "um"), and entries with punctuation inside a word are
+    skipped, since they could never match.
+    """
+
+    def __init__(self, lexicon=None):
+        if lexicon is None:
+            lexicon = [w.strip() for w in FILLER_WORDS.split(",")] if FILLER_WORDS else DEFAULT_FILLERS
+        entries = set()
+        for raw in lexicon:
+            words = [word.strip(string.punctuation) for word in raw.lower().split()]
+            words = [word for word in words if word]
+            if not words:
+                continue
+            if not all(re.fullmatch(r"\w+", word) for word in words):
+                logger.warning("Ignoring filler %r: only letters, digits and spaces can match.", raw)
+                continue
+            entries.add(" ".join(words))
+        self.lexicon = sorted(entries, key=len, reverse=True)
+
+        alternatives = [r"\s+".join(re.escape(word) for word in entry.split()) for entry in self.lexicon]
+        # The first-letter lookahead lets the scanner skip most word starts without trying every alternative
+        first_letters = "".join(sorted({re.escape(entry[0]) for entry in self.lexicon}))
+        self.pattern = re.compile(
+            r"(?<![\w-])(?=[" + first_letters + r"])(?:" + "|".join(alternatives) + r")(?![\w-])", re.IGNORECASE
+        ) if alternatives else None
+
+    def find(self, text):
+        """Returns a list of (filler, start, end) character spans, in order."""
+        if not self.pattern or not text:
+            return []
+        return [
+            (" ".join(match.group(0).lower().split()), match.start(), match.end())
+            for match in self.pattern.finditer(text)
+        ]
+
+    def count(self, text):
+        """Returns (total, {filler: count})."""
+        found = {}
+        total = 0
+        if self.pattern and text:
+            for match in self.pattern.finditer(text):
+                filler = " ".join(match.group(0).lower().split())
+                found[filler] = found.get(filler, 0) + 1
+                total += 1
+        return total, found
+
+
+filler_detector = FillerDetector()
@@ -1,57 +1,63 @@
-import os
 import json
-import re
-from groq import Groq
-from dotenv import load_dotenv
+import logging
+from src.services.ai.llmClient import llm_client
+from src.services.ai.admissionControl import LLMOverloaded
+from src.services.ai.fillerDetector import filler_detector
 
-load_dotenv()
-
-client = Groq(
-    api_key=os.environ.get("GROQ_API_KEY"),
-)
+logger = logging.getLogger(__name__)
 
 def count_filler_words(text):
     """
-    Counts common filler words in the text.
+    Counts common filler words and phrases in the text.
+    Returns (total, {filler: count}).
     """
-    fillers = ["um", "uh", "like", "you know", "basically", "actually", "literally"]
-    count = 0
-    found = {}
-    
-    # Normalize text
-    text = text.lower()
-    words = text.split()
-    
-    for word in words:
-        # Simple check, can be improved with regex for phrases
-        clean_word = re.sub(r'[^\w\s]', '', word)
-        if clean_word in fillers:
-            count += 1
-            found[clean_word] = found.get(clean_word, 0) + 1
-            
-    return count, found
+    return filler_detector.count(text)
+
+COMPACT_GRADING_NOTE = """
+        You are not given the raw transcript. Instead you get running statistics and one line per
+        candidate turn with a short excerpt, a per-turn assessment and keywords. Base the final
+        scores on the per-turn scores, weighing later turns and overall consistency.
+        """
+
+class GradingError(Exception):
+    """Raised when the grading model failed to produce a report."""
 
-async def grade_interview(history, interview_type):
+
+async def grade_interview(history, interview_type, evaluator=None, user=None):
     """
     Analyzes the interview transcript and returns a structured score.
     history: List of {"role": "...", "content": "..."}
+    evaluator: SessionEvaluator of the live session, if available. Its per-turn
+    state replaces the full transcript in the prompt, as long as its turns are
+    the candidate turns of history.
+    user: Whose report this is, counted against their rate limit.
+    Raises LLMOverloaded rather than returning an empty report when grading was shed,
+    and GradingError when the model call or its output failed.
     """
-    
-    # Convert history to a single string for the prompt
-    transcript_text = ""
-    candidate_text_only = ""
-    
-    for msg in history:
-        # Handle both 'content' (backend) and 'text' (frontend) keys
-        content = msg.get('content') or msg.get('text') or ""
-        role = "Interviewer" if msg.get("role") in ["assistant", "ai", "system"] else "Candidate"
+    use_evaluator = evaluator is not None and evaluator.candidate_turns > 0 and evaluator.matches(history)
+
+    if use_evaluator:
+        # Counted turn by turn while the session ran
+        transcript_text = None
+        filler_count, filler_details = evaluator.filler_count, dict(evaluator.filler_details)
+    else:
+        # Convert history to a single string for the prompt
+        transcript_parts = []
+        candidate_parts = []
         
-        transcript_text += f"{role}: {content}\n"
-        if role == "Candidate":
-            candidate_text_only += f"{content} "
+        for msg in history:
+            # Handle both 'content' (backend) and 'text' (frontend) keys
+            content = msg.get('content') or msg.get('text') or ""
+            role = "Interviewer" if msg.get("role") in ["assistant", "ai", "system"] else "Candidate"
+            
+            transcript_parts.append(f"{role}: {content}\n")
+            if role == "Candidate":
+                candidate_parts.append(content)
+
+        transcript_text = "".join(transcript_parts)
 
-    # Calculate filler words locally
-    filler_count, filler_details = count_filler_words(candidate_text_only)
+        # Calculate filler words locally
+        filler_count, filler_details = count_filler_words(" ".join(candidate_parts))
 
     # Check for minimal history
     if len(history) < 2:
@@ -103,18 +109,27 @@ async def grade_interview(history, interview_type):
         Do not include markdown formatting like ```json. Just the raw JSON string.
         """
 
+    if use_evaluator:
+        await evaluator.wait()
+        system_prompt += COMPACT_GRADING_NOTE
+        user_content = evaluator.digest()
+    else:
+        user_content = transcript_text
+
     try:
-        completion = client.chat.completions.create(
+        result = await llm_client.complete(
             messages=[
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": transcript_text}
+                {"role": "user", "content": user_content}
             ],
             model="llama-3.3-70b-versatile",
             temperature=0.2, # Low temp for consistent JSON output
-            response_format={"type": "json_object"} # Force JSON mode if supported, or rely on prompt
+            response_format={"type": "json_object"}, # Force JSON mode if supported, or rely on prompt
+            timeout=60.0, # Grading a full transcript on the 70B model takes longer than a turn
+            cache=True, # Identical transcripts get identical grades
+            user=user,
         )
         
-        result = completion.choices[0].message.content
         report = json.loads(result)
         
         # Ensure all fields exist
@@ -133,17 +148,8 @@ async def grade_interview(history, interview_type):
         report["filler_details"] = filler_details
         
         return report
+    except LLMOverloaded:
+        raise
     except Exception as e:
-        print(f"Error grading interview: {e}")
-        return {
-            "technical_score": 0,
-            "communication_score": 0,
-            "confidence_score": 0,
-            "feedback": "Error generating report.",
-            "strengths": [],
-            "improvements": [],
-            "keywords_mentioned": [],
-            "keywords_missed": [],
-            "filler_word_count": 0,
-            "filler_details": {}
-        }
+        logger.error("Error grading interview: %s", e)
+        raise GradingError(str(e)) from e
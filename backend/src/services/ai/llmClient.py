@@ -0,0 +1,188 @@
+import os
+import time
+import asyncio
+import logging
+import httpx
+from groq import AsyncGroq, APIStatusError
+from dotenv import load_dotenv
+from src.services.ai.responseCache import response_cache, cache_key
+from src.services.ai.contextManager import count_tokens, count_message_tokens
+from src.services.ai.admissionControl import AdmissionController, LLMOverloaded, retry_after_seconds, INTERACTIVE, BACKGROUND
+from src.services.metrics import LLM_FIRST_TOKEN_SECONDS, LLM_REQUEST_SECONDS, ERRORS
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+LLM_BASE_URL = os.environ.get("LLM_BASE_URL")  # Optional override, e.g. a local test server
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", "30"))
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "32"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "1"))
+
+
+class LLMClient:
+    """
+    Shared async client for chat completions.
+
+    One pooled HTTP connection set is reused by every request in the process,
+    and every completion is admitted by the admission controller first, so a
+    burst of sessions queues or is shed here instead of piling onto the provider.
+    Callers pick a lane: INTERACTIVE when a candidate is waiting, BACKGROUND
+    otherwise. A provider 429 or 503 is raised as LLMOverloaded.
+    """
+
+    def __init__(self, timeout=LLM_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self.admission = AdmissionController()
+        self.http_client: httpx.AsyncClient = None
+        self.client: AsyncGroq = None
+        # Live turns don't sit out a retry-after inside the SDK; they fail fast and are retried by the client
+        self.interactive_client: AsyncGroq = None
+
+    def connect(self):
+        if self.client:
+            return
+        if not GROQ_API_KEY:
+            logger.warning("GROQ_API_KEY not found in environment variables.")
+            return
+
+        self.http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_CONNECTIONS,
+            ),
+        )
+        kwargs = {
+            "api_key": GROQ_API_KEY,
+            "http_client": self.http_client,
+            "max_retries": LLM_MAX_RETRIES,
+        }
+        if LLM_BASE_URL:
+            kwargs["base_url"] = LLM_BASE_URL
+        self.client = AsyncGroq(**kwargs)
+        self.interactive_client = self.client.with_options(max_retries=0)
+
+    async def close(self):
+        if self.http_client:
+            await self.http_client.aclose()
+        self.http_client = None
+        self.client = None
+        self.interactive_client = None
+
+    def _get_client(self, lane):
+        self.connect()
+        if not self.client:
+            raise RuntimeError("LLM client is not configured")
+        return self.interactive_client if lane == INTERACTIVE else self.client
+
+    def _failed(self, error):
+        """Counts a failed call; returns the LLMOverloaded to raise instead if the provider is overloaded."""
+        ERRORS.labels("llm").inc()
+        if isinstance(error, APIStatusError) and error.status_code in (429, 503):
+            retry_after = self.admission.backoff(retry_after_seconds(error.response.headers))
+            reason = "provider_rate_limit" if error.status_code == 429 else "provider_unavailable"
+            return LLMOverloaded(reason, retry_after)
+        return None
+
+    async def complete(self, messages, model, timeout=None, cache=False, lane=BACKGROUND, user=None, **params):
+        """
+        Runs a single chat completion and returns the message content.
+        Raises on provider errors and on timeout; callers decide the fallback.
+        Raises LLMOverloaded when the call is shed or rate limited; it is worth retrying.
+        cache: allow answering from the response cache (only if the cache is enabled).
+        user: counts the call against this user's rate limit.
+        """
+        key = None
+        if cache and response_cache.enabled:
+            key = cache_key(messages, model, params)
+            cached = await response_cache.get(key)
+            if cached is not None:
+                return cached
+
+        client = self._get_client(lane)
+        timeout = timeout or self.timeout
+
+        async with self.admission.slot(lane, user):
+            started_at = time.perf_counter()
+            try:
+                completion = await asyncio.wait_for(
+                    client.chat.completions.create(
+                        messages=messages,
+                        model=model,
+                        timeout=timeout,
+                        **params
+                    ),
+                    timeout,
+                )
+            except Exception as e:
+                overloaded = self._failed(e)
+                if overloaded:
+                    raise overloaded from e
+                raise
+            LLM_REQUEST_SECONDS.labels(model, "complete").observe(time.perf_counter() - started_at)
+        content = completion.choices[0].message.content
+
+        if key:
+            tokens = completion.usage.total_tokens if completion.usage else count_tokens(content)
+            await response_cache.set(key, content, tokens)
+        return content
+
+    async def stream(self, messages, model, timeout=None, cache=False, lane=BACKGROUND, user=None, **params):
+        """
+        Streams a chat completion, yielding content deltas as they arrive.
+        The admission slot is held until the stream is exhausted or closed.
+        A cache hit is yielded as a single delta; a miss is stored once the stream completes.
+        """
+        key = None
+        if cache and response_cache.enabled:
+            key = cache_key(messages, model, params)
+            cached = await response_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        client = self._get_client(lane)
+        timeout = timeout or self.timeout
+
+        async with self.admission.slot(lane, user):
+            started_at = time.perf_counter()
+            parts = []
+            try:
+                response = await asyncio.wait_for(
+                    client.chat.completions.create(
+                        messages=messages,
+                        model=model,
+                        stream=True,
+                        timeout=timeout,
+                        **params
+                    ),
+                    timeout,
+                )
+                try:
+                    async for chunk in response:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            if not parts:
+                                LLM_FIRST_TOKEN_SECONDS.labels(model).observe(time.perf_counter() - started_at)
+                            parts.append(delta)
+                            yield delta
+                finally:
+                    await response.close()
+            except Exception as e:
+                # Not reached when the caller stops listening (an interrupted turn)
+                overloaded = self._failed(e)
+                if overloaded:
+                    raise overloaded from e
+                raise
+            LLM_REQUEST_SECONDS.labels(model, "stream").observe(time.perf_counter() - started_at)
+
+        if key:
+            content = "".join(parts)
+            # Streams don't reliably report usage, so estimate what a hit would save
+            await response_cache.set(key, content, count_message_tokens(messages) + count_tokens(content))
+
+
+llm_client = LLMClient()
@@ -1,45 +1,20 @@
-import os
-from groq import Groq
-from dotenv import load_dotenv
+import logging
+from src.services.ai.llmClient import llm_client
+from src.services.ai.admissionControl import LLMOverloaded, INTERACTIVE, BACKGROUND
+from src.services.ai.promptRegistry import prompt_registry
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# Initialize the client
-client = Groq(
-    api_key=os.environ.get("GROQ_API_KEY"),
-)
+FALLBACK_RESPONSE = "I apologize, but I am having trouble processing that right now."
+GREETING = "Hello! I'm your interviewer today. Let's start with a simple question: Tell me about yourself."
 
-async def get_ai_response(history, interview_type, difficulty="medium", topic=None):
+def build_messages(history, interview_type, difficulty="medium", topic=None):
     """
-    history: A list of dictionaries [{"role": "user", "content": "..."}, ...]
-    interview_type: "technical", "hr", etc.
-    difficulty: "easy", "medium", "hard"
-    topic: Specific topic for practice (e.g., "Python DSA", "React Hooks")
+    Builds the full message list (persona system prompt + conversation history).
     """
-    
-    # 1. Define the Persona based on selection
-    base_prompts = {
-        "technical": "You are a strict Senior Software Architect. Ask deep technical questions. Be concise. Do not be overly friendly.",
-        "hr": "You are a professional HR Manager. Focus on behavioral questions using the STAR method.",
-        "managerial": "You are a VP of Engineering. Focus on leadership and conflict resolution.",
-        "system_design": "You are a Lead Engineer focusing on scalability and architecture. Maintain a professional tone.",
-        "dsa_practice": "You are a coding problem generator. You are NOT an interviewer. Your ONLY job is to output a coding problem. Do not say 'Hello'. Do not say 'Let's start'. Do not ask 'Are you ready?'. IMMEDIATELY provide the problem title and description. The user is here to practice, not to chat."
-    }
-    
-    difficulty_modifiers = {
-        "easy": "Ask fundamental, beginner-friendly questions (e.g. Arrays, Strings).",
-        "medium": "Ask standard industry-level questions. Expect solid understanding but allow for some guidance.",
-        "hard": "Ask complex, edge-case heavy, and deep-dive questions. Be rigorous and challenge assumptions. Do not give hints."
-    }
-
-    base_prompt = base_prompts.get(interview_type, "You are a professional interviewer.")
-    difficulty_prompt = difficulty_modifiers.get(difficulty, difficulty_modifiers["medium"])
-    
-    topic_prompt = ""
-    if topic:
-        topic_prompt = f" The specific topic for this session is '{topic}'. Focus all your questions and evaluation on this topic."
-    
-    full_system_prompt = f"{base_prompt} The difficulty level is {difficulty.upper()}. {difficulty_prompt}{topic_prompt}"
+
+    # 1. Persona, difficulty and topic, composed once per combination
+    full_system_prompt = prompt_registry.system_prompt(interview_type, difficulty, topic)
 
     # 2. Construct the messages list
     messages = [
@@ -48,16 +23,103 @@ async def get_ai_response(history, interview_type, difficulty="medium", topic=No
     
     # Add the conversation history so the AI remembers context
     messages.extend(history)
+    return messages
+
+async def get_ai_response(history, interview_type, difficulty="medium", topic=None, user=None):
+    """
+    history: A list of dictionaries [{"role": "user", "content": "..."}, ...]
+    interview_type: "technical", "hr", etc.
+    difficulty: "easy", "medium", "hard"
+    topic: Specific topic for practice (e.g., "Python DSA", "React Hooks")
+    user: Who the turn is for, counted against their rate limit
+    Raises LLMOverloaded when the turn was shed, so the client can retry it.
+    """
+    messages = build_messages(history, interview_type, difficulty, topic)
 
     # 3. Call Groq
     try:
-        chat_completion = client.chat.completions.create(
+        return await llm_client.complete(
             messages=messages,
             model="llama-3.3-70b-versatile", # Updated to a supported model
             temperature=0.6,        # Lower temperature = more formal/focused
             max_tokens=150,         # Keep answers short for voice interaction
+            cache=True,             # Opening exchanges repeat across sessions
+            lane=INTERACTIVE,
+            user=user,
         )
-        return chat_completion.choices[0].message.content
+    except LLMOverloaded:
+        raise
+    except Exception as e:
+        logger.error("Error calling Groq: %s", e)
+        return FALLBACK_RESPONSE
+
+async def generate_dsa_problem(difficulty="medium", topic=None, lane=BACKGROUND, user=None):
+    """
+    Generates one DSA practice problem statement.
+    Unlike get_ai_response this raises on failure, so callers never store the fallback text as a problem.
+    lane: INTERACTIVE when a session is waiting for the problem, BACKGROUND for pool refills.
+    """
+    startup_history = [{"role": "user", "content": f"Generate a {difficulty} level DSA problem. Output ONLY the problem description. No greetings."}]
+    return await llm_client.complete(
+        messages=build_messages(startup_history, "dsa_practice", difficulty, topic),
+        model="llama-3.3-70b-versatile",
+        temperature=0.8, # Higher temperature so pooled problems differ from each other
+        max_tokens=150,
+        lane=lane,
+        user=user,
+    )
+
+async def summarize_turns(previous_summary, turns):
+    """
+    Folds a batch of older turns into the rolling interview summary.
+    Only the previous summary and the turns being folded are sent, never the whole history.
+    """
+    transcript = "\n".join(
+        f"{'Interviewer' if turn['role'] == 'assistant' else 'Candidate'}: {turn['content']}" for turn in turns
+    )
+    messages = [
+        {
+            "role": "system",
+            "content": "You maintain a running summary of a job interview. Update the summary with the new exchanges. "
+                       "Keep the questions asked, the key points of each answer, any code approaches discussed and any open issues. "
+                       "Be factual and concise. Output only the updated summary."
+        },
+        {
+            "role": "user",
+            "content": f"Current summary:\n{previous_summary or '(none yet)'}\n\nNew exchanges:\n{transcript}"
+        }
+    ]
+    return await llm_client.complete(
+        messages=messages,
+        model="llama-3.1-8b-instant",
+        temperature=0.2,
+        max_tokens=300,
+    )
+
+async def stream_ai_response(history, interview_type, difficulty="medium", topic=None, user=None):
+    """
+    Same as get_ai_response, but yields the reply as text deltas while it is generated.
+    If the call fails before anything was produced, the fallback message is yielded instead,
+    unless it was shed: LLMOverloaded is raised as with get_ai_response.
+    """
+    messages = build_messages(history, interview_type, difficulty, topic)
+
+    produced = False
+    try:
+        async for delta in llm_client.stream(
+            messages=messages,
+            model="llama-3.3-70b-versatile",
+            temperature=0.6,
+            max_tokens=150,
+            cache=True,
+            lane=INTERACTIVE,
+            user=user,
+        ):
+            produced = True
+            yield delta
+    except LLMOverloaded:
+        raise
     except Exception as e:
-        print(f"Error calling Groq: {e}")
-        return "I apologize, but I am having trouble processing that right now."
+        logger.error("Error streaming from Groq: %s", e)
+        if not produced:
+            yield FALLBACK_RESPONSE
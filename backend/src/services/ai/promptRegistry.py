@@ -0,0 +1,52 @@
+import os
+import json
+from functools import lru_cache
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_PROMPTS_FILE = os.path.join(os.path.dirname(__file__), "prompts.json")
+PROMPTS_FILE = os.environ.get("PROMPTS_FILE", DEFAULT_PROMPTS_FILE)
+PROMPT_MEMO_SIZE = int(os.environ.get("PROMPT_MEMO_SIZE", "512"))
+
+
+class PromptRegistry:
+    """
+    Interviewer personas and difficulty modifiers, loaded from a JSON data file
+    so new personas don't need code changes.
+
+    Composed system prompts depend only on (interview_type, difficulty, topic),
+    so they are memoized. Topics come from the client, which is why the memo is
+    bounded. Returning the same string for the same key also keeps the system
+    prefix byte-identical across turns for providers that cache prompt prefixes.
+    """
+
+    def __init__(self, path=PROMPTS_FILE, memo_size=PROMPT_MEMO_SIZE):
+        self.path = path
+        self.system_prompt = lru_cache(maxsize=memo_size)(self._compose)
+        self.load()
+
+    def load(self):
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.personas = data["personas"]
+        self.difficulty_modifiers = data["difficulty_modifiers"]
+        self.default_persona = data.get("default_persona", "You are a professional interviewer.")
+        self.default_difficulty = data.get("default_difficulty", "medium")
+        self.system_prompt.cache_clear()
+
+    def _compose(self, interview_type, difficulty="medium", topic=None):
+        base_prompt = self.personas.get(interview_type, self.default_persona)
+        difficulty_prompt = self.difficulty_modifiers.get(
+            difficulty, self.difficulty_modifiers[self.default_difficulty]
+        )
+
+        topic_prompt = ""
+        if topic:
+            topic_prompt = f" The specific topic for this session is '{topic}'. Focus all your questions and evaluation on this topic."
+
+        return f"{base_prompt} The difficulty level is {difficulty.upper()}. {difficulty_prompt}{topic_prompt}"
+
+
+prompt_registry = PromptRegistry()
@@ -0,0 +1,184 @@
+import os
+import re
+import time
+import asyncio
+import logging
+import hashlib
+from collections import deque, OrderedDict
+from dotenv import load_dotenv
+from src.services.ai.llmService import generate_dsa_problem
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+DSA_POOL_LOW_WATERMARK = int(os.environ.get("DSA_POOL_LOW_WATERMARK", "2"))
+DSA_POOL_HIGH_WATERMARK = int(os.environ.get("DSA_POOL_HIGH_WATERMARK", "5"))
+DSA_POOL_TTL_SECONDS = float(os.environ.get("DSA_POOL_TTL_SECONDS", str(6 * 60 * 60)))
+DSA_POOL_MAX_KEYS = int(os.environ.get("DSA_POOL_MAX_KEYS", "16"))
+# A combination that wasn't prewarmed gets a pool once it was asked for this many times
+DSA_POOL_MIN_REQUESTS = int(os.environ.get("DSA_POOL_MIN_REQUESTS", "3"))
+DSA_POOL_TRACKED_KEYS = int(os.environ.get("DSA_POOL_TRACKED_KEYS", "1000"))
+DSA_POOL_PREWARM = os.environ.get("DSA_POOL_PREWARM", "easy,medium,hard")
+SEEN_FINGERPRINTS_PER_KEY = 200
+MAX_CONSECUTIVE_DUPLICATES = 3
+
+
+def _fingerprint(text):
+    normalized = re.sub(r"\s+", " ", text.strip().lower())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class QuestionPool:
+    """
+    Pre-generated DSA problems keyed by (difficulty, topic).
+
+    Sessions pop a ready problem instantly. Whenever a pool drops below the low
+    watermark, a background task tops it back up to the high watermark. Problems
+    expire after a TTL, and recently pooled problems are fingerprinted so the
+    same problem is not handed out twice in a row.
+
+    Topics are free text from the client, and every pooled key costs up to high
+    background generations, so only prewarmed combinations and ones requested
+    at least min_requests times are pooled, and at most max_keys of them.
+    """
+
+    def __init__(self, generator, low=DSA_POOL_LOW_WATERMARK, high=DSA_POOL_HIGH_WATERMARK,
+                 ttl=DSA_POOL_TTL_SECONDS, max_keys=DSA_POOL_MAX_KEYS, min_requests=DSA_POOL_MIN_REQUESTS):
+        self.generator = generator
+        self.low = low
+        self.high = high
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.min_requests = min_requests
+        self.requests = OrderedDict()  # key -> times asked for while not pooled
+        self.prewarmed = set()
+        self.pools = OrderedDict()  # key -> deque of (created_at, problem)
+        self.seen = {}  # key -> OrderedDict of recent fingerprints
+        self.refills = {}  # key -> running refill task
+        self.stats = {"hits": 0, "misses": 0, "generated": 0, "duplicates": 0, "expired": 0, "failures": 0}
+
+    @staticmethod
+    def _key(difficulty, topic):
+        topic = (topic or "").strip().lower() or None
+        return (difficulty, topic)
+
+    def _pool(self, key):
+        if key not in self.pools:
+            while len(self.pools) >= self.max_keys:
+                # Least recently used, sparing prewarmed combinations while there are others
+                evicted = next((k for k in self.pools if k not in self.prewarmed), next(iter(self.pools)))
+                del self.pools[evicted]
+                self.seen.pop(evicted, None)
+            self.pools[key] = deque()
+            self.seen[key] = OrderedDict()
+        self.pools.move_to_end(key)
+        return self.pools[key]
+
+    def _purge_expired(self, pool):
+        cutoff = time.monotonic() - self.ttl
+        while pool and pool[0][0] < cutoff:
+            pool.popleft()
+            self.stats["expired"] += 1
+
+    def _in_demand(self, key):
+        """Counts a request for a combination that has no pool yet; True once it deserves one."""
+        if key in self.prewarmed:
+            return True
+        count = self.requests.pop(key, 0) + 1
+        if count >= self.min_requests:
+            return True
+        self.requests[key] = count
+        while len(self.requests) > DSA_POOL_TRACKED_KEYS:
+            self.requests.popitem(last=False)
+        return False
+
+    def pop(self, difficulty, topic=None):
+        """
+        Returns a ready problem, or None if the pool for this combination is empty.
+        Either way a refill is started if the combination is pooled and running low.
+        """
+        key = self._key(difficulty, topic)
+        pool = self.pools.get(key)
+        problem = None
+        if pool is not None:
+            self.pools.move_to_end(key)
+            self._purge_expired(pool)
+            if pool:
+                _, problem = pool.popleft()
+                self.stats["hits"] += 1
+        if problem is None:
+            self.stats["misses"] += 1
+
+        if pool is not None or self._in_demand(key):
+            self.ensure_refill(difficulty, topic)
+        return problem
+
+    def ensure_refill(self, difficulty, topic=None):
+        key = self._key(difficulty, topic)
+        task = self.refills.get(key)
+        if task and not task.done():
+            return
+        if len(self._pool(key)) < self.low:
+            self.refills[key] = asyncio.create_task(self._refill(key, difficulty, topic))
+
+    async def _refill(self, key, difficulty, topic):
+        attempts = 0
+        duplicates = 0
+        # Bounded so a provider that keeps failing or repeating itself can't spin forever
+        while attempts < self.high * 2:
+            pool = self.pools.get(key)
+            if pool is None or len(pool) >= self.high:
+                return
+            attempts += 1
+
+            try:
+                problem = await self.generator(difficulty, topic)
+            except Exception as e:
+                self.stats["failures"] += 1
+                logger.warning("DSA pool refill failed for %s: %s", key, e)
+                return
+            if not problem:
+                continue
+
+            fingerprint = _fingerprint(problem)
+            seen = self.seen.get(key)
+            if seen is None:
+                return
+            if fingerprint in seen:
+                self.stats["duplicates"] += 1
+                duplicates += 1
+                if duplicates >= MAX_CONSECUTIVE_DUPLICATES:
+                    return
+                continue
+            duplicates = 0
+            seen[fingerprint] = True
+            while len(seen) > SEEN_FINGERPRINTS_PER_KEY:
+                seen.popitem(last=False)
+
+            pool.append((time.monotonic(), problem))
+            self.stats["generated"] += 1
+
+    def prewarm(self, difficulties=None, topics=(None,)):
+        difficulties = difficulties or [d.strip() for d in DSA_POOL_PREWARM.split(",") if d.strip()]
+        for difficulty in difficulties:
+            for topic in topics:
+                self.prewarmed.add(self._key(difficulty, topic))
+                self.ensure_refill(difficulty, topic)
+
+    def metrics(self):
+        return {
+            **self.stats,
+            "keys": len(self.pools),
+            "pooled": sum(len(pool) for pool in self.pools.values()),
+            "refilling": sum(1 for task in self.refills.values() if not task.done()),
+        }
+
+    async def close(self):
+        tasks = [task for task in self.refills.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.refills.clear()
+
+
+question_pool = QuestionPool(generate_dsa_problem)
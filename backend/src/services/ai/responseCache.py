@@ -0,0 +1,213 @@
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import hashlib
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+LLM_RESPONSE_CACHE = os.environ.get("LLM_RESPONSE_CACHE", "").lower() in ("1", "true", "yes")
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "2048"))
+LLM_CACHE_TTL_SECONDS = float(os.environ.get("LLM_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+LLM_CACHE_DIR = os.environ.get("LLM_CACHE_DIR")  # Optional on-disk tier
+LLM_CACHE_DISK_BYTES = int(os.environ.get("LLM_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Per-call options that don't change what the model generates
+_IGNORED_PARAMS = {"timeout", "stream"}
+
+
+def normalize_messages(messages):
+    """Role and whitespace-normalized copy of the messages, so trivially different prompts share a key."""
+    return [
+        {
+            "role": message.get("role", "").strip().lower(),
+            "content": re.sub(r"\s+", " ", message.get("content") or "").strip(),
+        }
+        for message in messages
+    ]
+
+
+def cache_key(messages, model, params):
+    payload = {
+        "model": model,
+        "messages": normalize_messages(messages),
+        "params": {k: v for k, v in params.items() if k not in _IGNORED_PARAMS},
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Opt-in cache of completion text keyed by a hash of the normalized messages
+    plus model parameters.
+
+    Entries live in an in-memory LRU and, when a directory is configured, in a
+    disk tier that survives restarts and is shared by workers on the same host.
+    The disk tier is an LRU bounded by total bytes, like AudioCache's. Every
+    entry carries its own expiry, and expired entries are deleted when read.
+    Disk I/O runs in a thread so it never blocks the event loop.
+    """
+
+    def __init__(self, enabled=LLM_RESPONSE_CACHE, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 ttl=LLM_CACHE_TTL_SECONDS, directory=LLM_CACHE_DIR, disk_bytes=LLM_CACHE_DISK_BYTES):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory
+        self.disk_limit = disk_bytes
+        self.entries = OrderedDict()  # key -> (expires_at, content, tokens)
+        self.disk_entries = None  # key -> size in LRU order, loaded from the directory on first use
+        self.disk_bytes = 0
+        self.disk_lock = asyncio.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "disk_evictions": 0,
+            "disk_expired": 0,
+            "saved_tokens": 0,
+        }
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _scan_disk(self):
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                key = name[:-5]
+                if name.endswith(".json") and _KEY_PATTERN.match(key):
+                    stat = os.stat(os.path.join(root, name))
+                    found.append((stat.st_mtime, key, stat.st_size))
+        found.sort()  # Least recently used first
+        return found
+
+    async def _load_disk_index(self):
+        if self.disk_entries is not None:
+            return
+        self.disk_entries = OrderedDict()
+        try:
+            found = await asyncio.to_thread(self._scan_disk)
+        except OSError as e:
+            logger.warning("Response cache could not scan %s: %s", self.directory, e)
+            return
+        for _, key, size in found:
+            self.disk_entries[key] = size
+            self.disk_bytes += size
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                stored = json.load(f)
+            os.utime(path)  # Keeps the LRU order across restarts
+            return stored
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, entry):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)  # Atomic, so readers never see a partial file
+        return os.path.getsize(path)
+
+    def _remove_disk(self, keys):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _forget_disk(self, key):
+        self.disk_bytes -= self.disk_entries.pop(key, 0)
+
+    def _remember(self, key, expires_at, content, tokens):
+        self.entries[key] = (expires_at, content, tokens)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def get(self, key):
+        now = time.time()
+        entry = self.entries.get(key)
+        if entry and entry[0] > now:
+            self.entries.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            self.stats["saved_tokens"] += entry[2]
+            return entry[1]
+        if entry:
+            del self.entries[key]
+
+        if self.directory:
+            await self._load_disk_index()
+            if key in self.disk_entries:
+                stored = await asyncio.to_thread(self._read_disk, key)
+                if stored and stored["expires_at"] > now:
+                    self.disk_entries.move_to_end(key)
+                    self._remember(key, stored["expires_at"], stored["content"], stored["tokens"])
+                    self.stats["disk_hits"] += 1
+                    self.stats["saved_tokens"] += stored["tokens"]
+                    return stored["content"]
+                # Expired, unreadable, or already evicted by another worker sharing the directory
+                self._forget_disk(key)
+                if stored:
+                    self.stats["disk_expired"] += 1
+                    await asyncio.to_thread(self._remove_disk, [key])
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key, content, tokens=0, ttl=None):
+        expires_at = time.time() + (ttl or self.ttl)
+        self._remember(key, expires_at, content, tokens)
+        self.stats["stores"] += 1
+
+        if not self.directory:
+            return
+        entry = {"expires_at": expires_at, "content": content, "tokens": tokens}
+        async with self.disk_lock:
+            await self._load_disk_index()
+            try:
+                size = await asyncio.to_thread(self._write_disk, key, entry)
+            except OSError as e:
+                logger.warning("Response cache disk write failed: %s", e)
+                return
+
+            self._forget_disk(key)
+            self.disk_entries[key] = size
+            self.disk_bytes += size
+            evicted = []
+            while self.disk_bytes > self.disk_limit and self.disk_entries:
+                old_key, old_size = self.disk_entries.popitem(last=False)
+                self.disk_bytes -= old_size
+                evicted.append(old_key)
+            if evicted:
+                self.stats["disk_evictions"] += len(evicted)
+                await asyncio.to_thread(self._remove_disk, evicted)
+
+    def metrics(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "size": len(self.entries),
+            "disk_entries": len(self.disk_entries or ()),
+            "disk_bytes": self.disk_bytes,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+response_cache = ResponseCache()
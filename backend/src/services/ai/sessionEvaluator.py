@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from dotenv import load_dotenv
+from src.services.ai.llmClient import llm_client
+from src.services.ai.gradingService import count_filler_words
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+INCREMENTAL_GRADING = os.environ.get("INCREMENTAL_GRADING", "true").lower() in ("1", "true", "yes")
+EVALUATOR_RETENTION_SECONDS = float(os.environ.get("EVALUATOR_RETENTION_SECONDS", "600"))
+EXCERPT_CHARS = 160
+SCORE_FIELDS = ["technical", "communication", "confidence"]
+ASSESSMENT_FIELDS = SCORE_FIELDS + ["note", "keywords_mentioned", "keywords_missed"]
+
+TURN_PROMPT = """
+You are assessing a single exchange from a {interview_type} interview.
+Return ONLY a JSON object with the following fields:
+- technical (0-100): Accuracy and depth of this answer.
+- communication (0-100): Clarity and structure of this answer.
+- confidence (0-100): Assertiveness and tone of this answer (for code: efficiency of the solution).
+- note: One sentence on what was good or missing.
+- keywords_mentioned: Relevant technical concepts the candidate used.
+- keywords_missed: Important concepts the candidate should have mentioned.
+
+Do not include markdown formatting like ```json. Just the raw JSON string.
+"""
+
+
+def _excerpt(text, limit=EXCERPT_CHARS):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+class SessionEvaluator:
+    """
+    Grades an interview as it happens.
+
+    Each candidate turn updates the local counters right away (fillers, word
+    count), and a short per-turn assessment runs on the small model in the
+    background. At the end, grade_interview only has to wait for any
+    assessment still running and send the compact per-turn notes to the big
+    model, instead of the whole transcript.
+
+    on_assessed(seq, assessment) is called as each assessment finishes, so it
+    can be stored with the turn; a session resumed on another worker rebuilds
+    its evaluator with replay_turn() from the stored turns, without calling
+    the model again.
+    """
+
+    def __init__(self, interview_type, user=None, on_assessed=None):
+        self.interview_type = interview_type
+        self.user = user  # Email of the session's owner
+        self.on_assessed = on_assessed
+        self.candidate_turns = 0
+        self.candidate_words = 0
+        self.filler_count = 0
+        self.filler_details = {}
+        self.turns = []  # One entry per candidate turn, filled in as assessments finish
+        self.pending = set()
+        self.closed_at = None
+
+    def add_turn(self, question, answer, kind="answer", seq=None):
+        """
+        Records one candidate turn. kind is "answer" for spoken/typed answers and
+        "code" for code submissions, which don't count towards filler words.
+        seq is the turn's number in the session store, passed to on_assessed.
+        """
+        turn = self._count(question, answer, kind)
+        if INCREMENTAL_GRADING:
+            task = asyncio.create_task(self._assess(turn, question, answer, seq))
+            self.pending.add(task)
+            task.add_done_callback(self.pending.discard)
+
+    def replay_turn(self, question, answer, kind="answer", assessment=None):
+        """Records a stored turn: counts it and restores its stored assessment, if any."""
+        turn = self._count(question, answer, kind)
+        if assessment:
+            turn.update(assessment)
+
+    def _count(self, question, answer, kind):
+        self.candidate_turns += 1
+        self.candidate_words += len(answer.split())
+        if kind == "answer":
+            count, found = count_filler_words(answer)
+            self.filler_count += count
+            for word, n in found.items():
+                self.filler_details[word] = self.filler_details.get(word, 0) + n
+
+        turn = {
+            "question": _excerpt(question or ""),
+            "answer": _excerpt(answer),
+            "kind": kind,
+        }
+        self.turns.append(turn)
+        return turn
+
+    async def _assess(self, turn, question, answer, seq):
+        try:
+            result = await llm_client.complete(
+                messages=[
+                    {"role": "system", "content": TURN_PROMPT.format(interview_type=self.interview_type)},
+                    {"role": "user", "content": f"Interviewer: {question}\nCandidate: {answer}"}
+                ],
+                model="llama-3.1-8b-instant",
+                temperature=0.2,
+                max_tokens=200,
+                response_format={"type": "json_object"},
+            )
+            assessment = json.loads(result)
+        except Exception as e:
+            logger.warning("Turn assessment failed: %s", e)
+            return
+
+        for field in SCORE_FIELDS:
+            try:
+                turn[field] = max(0, min(100, int(assessment.get(field, 0))))
+            except (TypeError, ValueError):
+                turn[field] = 0
+        turn["note"] = str(assessment.get("note", ""))[:300]
+        turn["keywords_mentioned"] = list(assessment.get("keywords_mentioned", []))[:10]
+        turn["keywords_missed"] = list(assessment.get("keywords_missed", []))[:10]
+        if self.on_assessed and seq is not None:
+            self.on_assessed(seq, {field: turn[field] for field in ASSESSMENT_FIELDS})
+
+    def matches(self, history):
+        """
+        True if the candidate turns of history are the ones this evaluator saw,
+        so its digest can stand in for that transcript.
+        """
+        answers = [
+            _excerpt(msg.get("content") or msg.get("text") or "")
+            for msg in history if msg.get("role") not in ("assistant", "ai", "system")
+        ]
+        return answers == [turn["answer"] for turn in self.turns]
+
+    async def wait(self, timeout=10.0):
+        """Waits for per-turn assessments still running, up to timeout seconds."""
+        if self.pending:
+            await asyncio.wait(set(self.pending), timeout=timeout)
+
+    def partial_scores(self):
+        assessed = [turn for turn in self.turns if "technical" in turn]
+        if not assessed:
+            return {}
+        return {
+            field: round(sum(turn[field] for turn in assessed) / len(assessed))
+            for field in SCORE_FIELDS
+        }
+
+    def digest(self):
+        """
+        Compact text for the final grading prompt: running stats plus one line per turn.
+        """
+        lines = [
+            f"Candidate turns: {self.candidate_turns}, words spoken: {self.candidate_words}, filler words: {self.filler_count}",
+        ]
+        partial = self.partial_scores()
+        if partial:
+            lines.append("Average per-turn scores: " + ", ".join(f"{k} {v}" for k, v in partial.items()))
+
+        for i, turn in enumerate(self.turns, 1):
+            line = f"{i}. Q: {turn['question']} | A ({turn['kind']}): {turn['answer']}"
+            if "note" in turn:
+                line += f" | technical {turn['technical']}, communication {turn['communication']}, confidence {turn['confidence']}"
+                if turn["note"]:
+                    line += f" | {turn['note']}"
+                if turn["keywords_mentioned"]:
+                    line += f" | used: {', '.join(map(str, turn['keywords_mentioned']))}"
+                if turn["keywords_missed"]:
+                    line += f" | missed: {', '.join(map(str, turn['keywords_missed']))}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def close(self):
+        self.closed_at = time.monotonic()
+
+
+# Evaluators of live (and recently closed) sessions, so /grade can find them by session id.
+# Session ids come from clients, so a lookup only succeeds for the session's owner.
+_evaluators = {}
+
+def _purge_closed():
+    cutoff = time.monotonic() - EVALUATOR_RETENTION_SECONDS
+    for session_id in [sid for sid, ev in _evaluators.items() if ev.closed_at and ev.closed_at < cutoff]:
+        del _evaluators[session_id]
+
+def register_evaluator(session_id, interview_type, user=None, on_assessed=None):
+    _purge_closed()
+    evaluator = SessionEvaluator(interview_type, user, on_assessed)
+    _evaluators[str(session_id)] = evaluator
+    return evaluator
+
+def get_evaluator(session_id, interview_type=None, user=None):
+    """The evaluator of session_id if it belongs to user (None for anonymous sessions)."""
+    if not session_id:
+        return None
+    evaluator = _evaluators.get(str(session_id))
+    if evaluator is None or evaluator.user != user:
+        return None
+    # A mismatched type means the id was reused by a different session
+    if interview_type and evaluator.interview_type != interview_type:
+        return None
+    return evaluator
+
+def resume_evaluator(session_id, interview_type, user=None):
+    """The evaluator of a session resumed on this worker, kept from being purged again."""
+    evaluator = get_evaluator(session_id, interview_type, user)
+    if evaluator:
+        evaluator.closed_at = None
+    return evaluator
+
+def release_evaluator(session_id, evaluator):
+    """
+    Called when the socket closes. The evaluator is kept for a while because
+    the client usually calls /grade right after ending the session. One
+    without any candidate turns has nothing to offer and is dropped right away.
+    """
+    evaluator.close()
+    if evaluator.candidate_turns == 0 and _evaluators.get(str(session_id)) is evaluator:
+        del _evaluators[str(session_id)]
+    _purge_closed()
@@ -1,34 +1,63 @@
 import os
-from deepgram import DeepgramClient, LiveOptions, LiveTranscriptionEvents
+import asyncio
+import logging
+from abc import ABC, abstractmethod
 from dotenv import load_dotenv
+from src.services.metrics import ERRORS
 
 load_dotenv()
+logger = logging.getLogger(__name__)
+
+# "deepgram" (default), "offline" for the local stand-in recognizer, or "none"
+STT_BACKEND = os.environ.get("STT_BACKEND", "deepgram").lower()
+STT_AUDIO_QUEUE_FRAMES = int(os.environ.get("STT_AUDIO_QUEUE_FRAMES", "256"))
+
+
+class TranscriptionBackend(ABC):
+    """
+    A streaming recognizer. start() opens the stream and registers the callback
+    that receives final transcripts, send() forwards one audio chunk, finish()
+    flushes and closes the stream.
+    """
+
+    @abstractmethod
+    async def start(self, on_transcript):
+        ...
+
+    @abstractmethod
+    async def send(self, audio_data):
+        ...
+
+    async def finish(self):
+        pass
+
+
+class DeepgramBackend(TranscriptionBackend):
+    """Deepgram live transcription over the SDK's asyncio client, so no call leaves the event loop."""
 
-class TranscriptionService:
     def __init__(self):
         self.api_key = os.environ.get("DEEPGRAM_API_KEY")
-        if not self.api_key:
-            print("Warning: DEEPGRAM_API_KEY not found")
-            self.deepgram = None
-        else:
-            self.deepgram = DeepgramClient(self.api_key)
         self.connection = None
 
-    async def connect(self, on_message):
-        if not self.deepgram:
+    async def start(self, on_transcript):
+        if not self.api_key:
+            logger.warning("DEEPGRAM_API_KEY not found")
             return False
 
+        async def on_result(connection, result, **kwargs):
+            # Only final results are sent to avoid flooding the frontend
+            if result.is_final:
+                sentence = result.channel.alternatives[0].transcript
+                if len(sentence) > 0:
+                    on_transcript(sentence)
+
         try:
-            # Create a websocket connection to Deepgram
-            self.connection = self.deepgram.listen.live.v("1")
-            
-            def on_result(self, result, **kwargs):
-                # Only send final results to avoid flooding the frontend
-                if result.is_final:
-                    sentence = result.channel.alternatives[0].transcript
-                    if len(sentence) > 0:
-                        on_message(sentence)
+            # Imported lazily so the offline backend works without the SDK. A
+            # missing or incompatible SDK fails like any other backend error.
+            from deepgram import DeepgramClient, LiveOptions, LiveTranscriptionEvents
 
+            # Create a websocket connection to Deepgram
+            self.connection = DeepgramClient(self.api_key).listen.asynclive.v("1")
             self.connection.on(LiveTranscriptionEvents.Transcript, on_result)
 
             options = LiveOptions(
@@ -36,20 +65,136 @@ class TranscriptionService:
                 language="en-US",
                 smart_format=True,
             )
-            
-            if self.connection.start(options) is False:
-                print("Failed to start Deepgram connection")
+
+            started = await self.connection.start(options)
+            if started is False:
+                ERRORS.labels("stt").inc()
+                logger.error("Failed to start Deepgram connection")
                 return False
-                
+
             return True
         except Exception as e:
-            print(f"Error connecting to Deepgram: {e}")
+            ERRORS.labels("stt").inc()
+            logger.error("Error connecting to Deepgram: %s", e)
             return False
 
-    def send_audio(self, audio_data):
+    async def send(self, audio_data):
         if self.connection:
-            self.connection.send(audio_data)
+            await self.connection.send(audio_data)
 
-    def close(self):
+    async def finish(self):
         if self.connection:
-            self.connection.finish()
+            await self.connection.finish()
+            self.connection = None
+
+
+class OfflineBackend(TranscriptionBackend):
+    """
+    Deterministic stand-in recognizer for local runs and load tests.
+
+    Audio is treated as 16 kHz 16-bit mono PCM. Every utterance_seconds of
+    audio produces one final transcript after a simulated recognition
+    latency. A chunk starting with b"TEXT:" is "recognized" as the text that
+    follows, so test clients can script what the candidate says.
+    """
+
+    BYTES_PER_SECOND = 16000 * 2
+
+    def __init__(self, utterance_seconds=2.0, latency=0.05):
+        self.utterance_bytes = int(utterance_seconds * self.BYTES_PER_SECOND)
+        self.latency = latency
+        self.buffered = 0
+        self.utterances = 0
+        self.on_transcript = None
+
+    async def start(self, on_transcript):
+        self.on_transcript = on_transcript
+        return True
+
+    async def _emit(self, text):
+        await asyncio.sleep(self.latency)
+        self.utterances += 1
+        self.on_transcript(text)
+
+    async def send(self, audio_data):
+        if audio_data.startswith(b"TEXT:"):
+            await self._emit(audio_data[5:].decode("utf-8", errors="replace").strip())
+            return
+
+        self.buffered += len(audio_data)
+        while self.buffered >= self.utterance_bytes:
+            self.buffered -= self.utterance_bytes
+            await self._emit(f"offline utterance {self.utterances + 1}")
+
+    async def finish(self):
+        if self.buffered:
+            self.buffered = 0
+            await self._emit(f"offline utterance {self.utterances + 1}")
+
+
+def create_backend(name=STT_BACKEND):
+    if name == "deepgram":
+        return DeepgramBackend()
+    if name == "offline":
+        return OfflineBackend()
+    return None
+
+
+class TranscriptionService:
+    """
+    Per-session streaming transcription.
+
+    send_audio() never blocks: chunks go into a bounded queue that a sender
+    task drains into the backend. If the backend falls behind and the queue
+    fills up, the oldest chunk is dropped so memory stays bounded.
+    """
+
+    def __init__(self, backend=None, max_frames=STT_AUDIO_QUEUE_FRAMES):
+        self.backend = backend if backend is not None else create_backend()
+        self.audio_queue = asyncio.Queue(maxsize=max_frames)
+        self.sender_task: asyncio.Task = None
+        self.stats = {"frames": 0, "bytes": 0, "dropped": 0, "transcripts": 0}
+
+    async def connect(self, on_message):
+        if not self.backend:
+            return False
+
+        def on_transcript(text):
+            self.stats["transcripts"] += 1
+            on_message(text)
+
+        if not await self.backend.start(on_transcript):
+            return False
+
+        self.sender_task = asyncio.create_task(self._sender())
+        return True
+
+    async def _sender(self):
+        while True:
+            audio_data = await self.audio_queue.get()
+            try:
+                await self.backend.send(audio_data)
+            except Exception as e:
+                ERRORS.labels("stt").inc()
+                logger.error("Error sending audio to transcription backend: %s", e)
+
+    def send_audio(self, audio_data):
+        if not self.sender_task:
+            return
+        if self.audio_queue.full():
+            self.audio_queue.get_nowait()
+            self.stats["dropped"] += 1
+        self.audio_queue.put_nowait(audio_data)
+        self.stats["frames"] += 1
+        self.stats["bytes"] += len(audio_data)
+
+    async def close(self):
+        if self.sender_task:
+            self.sender_task.cancel()
+            await asyncio.gather(self.sender_task, return_exceptions=True)
+            self.sender_task = None
+        if self.backend:
+            try:
+                await self.backend.finish()
+            except Exception as e:
+                logger.warning("Error closing transcription backend: %s", e)
@@ -1,43 +1,175 @@
 import os
-import requests
+import re
+import asyncio
+import logging
+import httpx
 from dotenv import load_dotenv
+from src.services.ai.audioCache import audio_cache, audio_key
+from src.services.metrics import ERRORS
 
 load_dotenv()
+logger = logging.getLogger(__name__)
+
+ELEVENLABS_BASE_URL = os.environ.get("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io")
+TTS_TIMEOUT_SECONDS = float(os.environ.get("TTS_TIMEOUT_SECONDS", "20"))
+TTS_MAX_CONNECTIONS = int(os.environ.get("TTS_MAX_CONNECTIONS", "16"))
+TTS_CACHE_PREWARM = os.environ.get("TTS_CACHE_PREWARM", "true").lower() in ("1", "true", "yes")
+# Extra phrases to synthesize at startup, separated by "|"
+TTS_PREWARM_PHRASES = [p.strip() for p in os.environ.get("TTS_PREWARM_PHRASES", "").split("|") if p.strip()]
+CACHED_CHUNK_BYTES = 16 * 1024
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def split_sentences(text):
+    """Splits text into sentences on ., ! or ? followed by whitespace."""
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+class SentenceBuffer:
+    """
+    Collects streamed text deltas and releases each sentence as soon as it is
+    complete, so synthesis of the first sentence can start while the rest of
+    the reply is still being generated.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, delta):
+        self.buffer += delta
+        parts = _SENTENCE_END.split(self.buffer)
+        # The last part may still be growing
+        self.buffer = parts.pop()
+        return [sentence.strip() for sentence in parts if sentence.strip()]
+
+    def flush(self):
+        rest, self.buffer = self.buffer.strip(), ""
+        return rest or None
+
 
 class TextToSpeechService:
     def __init__(self):
         self.api_key = os.environ.get("ELEVENLABS_API_KEY")
         self.voice_id = "21m00Tcm4TlvDq8ikWAM" # Rachel Voice (Default)
-        
-    def generate_audio(self, text):
+        self.model_id = "eleven_monolingual_v1"
+        self.voice_settings = {
+            "stability": 0.5,
+            "similarity_boost": 0.5
+        }
+        self.http_client: httpx.AsyncClient = None
+        self.prewarm_task: asyncio.Task = None
+
+    def cache_key(self, text):
+        return audio_key(self.voice_id, self.model_id, self.voice_settings, text)
+
+    def _get_client(self):
+        # One pooled client per process, so requests reuse warm TLS connections
+        if self.http_client is None:
+            self.http_client = httpx.AsyncClient(
+                base_url=ELEVENLABS_BASE_URL,
+                timeout=httpx.Timeout(TTS_TIMEOUT_SECONDS, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=TTS_MAX_CONNECTIONS,
+                    max_keepalive_connections=TTS_MAX_CONNECTIONS,
+                ),
+            )
+        return self.http_client
+
+    async def stream_audio(self, text):
+        """
+        Yields MP3 chunks as ElevenLabs produces them. Yields nothing on error.
+        Audio already in the cache is replayed from there instead, and fully
+        received audio is stored for next time.
+        """
+        key = self.cache_key(text)
+        try:
+            cached = await audio_cache.get(key)
+        except Exception as e:
+            logger.warning("Could not read cached audio: %s", e)
+            cached = None
+        if cached is not None:
+            for start in range(0, len(cached), CACHED_CHUNK_BYTES):
+                yield cached[start:start + CACHED_CHUNK_BYTES]
+            return
+
+        async for chunk in self._synthesize(key, text):
+            yield chunk
+
+    async def _synthesize(self, key, text):
         if not self.api_key:
-            print("Warning: ELEVENLABS_API_KEY not found")
-            return None
-            
-        url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}"
-        
+            logger.warning("ELEVENLABS_API_KEY not found")
+            return
+
         headers = {
             "Accept": "audio/mpeg",
             "Content-Type": "application/json",
             "xi-api-key": self.api_key
         }
-        
+
         data = {
             "text": text,
-            "model_id": "eleven_monolingual_v1",
-            "voice_settings": {
-                "stability": 0.5,
-                "similarity_boost": 0.5
-            }
+            "model_id": self.model_id,
+            "voice_settings": self.voice_settings
         }
-        
+
         try:
-            response = requests.post(url, json=data, headers=headers)
-            if response.status_code == 200:
-                return response.content
-            else:
-                print(f"ElevenLabs Error: {response.text}")
-                return None
+            async with self._get_client().stream(
+                "POST", f"/v1/text-to-speech/{self.voice_id}/stream", json=data, headers=headers
+            ) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    ERRORS.labels("tts").inc()
+                    logger.error("ElevenLabs error %s: %s", response.status_code, body.decode("utf-8", errors="replace"))
+                    return
+                chunks = []
+                async for chunk in response.aiter_bytes():
+                    if chunk:
+                        chunks.append(chunk)
+                        yield chunk
         except Exception as e:
-            print(f"Error generating audio: {e}")
-            return None
+            # Anything, so one bad sentence costs its audio and not the session's TTS pipeline
+            ERRORS.labels("tts").inc()
+            logger.error("Error generating audio: %s", e)
+            return
+
+        if chunks:
+            try:
+                await audio_cache.set(key, b"".join(chunks))
+            except Exception as e:
+                logger.warning("Could not cache audio: %s", e)
+
+    async def generate_audio(self, text):
+        """Returns the whole MP3 for text, or None on error."""
+        chunks = [chunk async for chunk in self.stream_audio(text)]
+        return b"".join(chunks) if chunks else None
+
+    async def _prewarm(self, phrases):
+        sentences = [sentence for phrase in phrases for sentence in split_sentences(phrase)]
+        warmed = 0
+        for sentence in sentences:
+            key = self.cache_key(sentence)
+            if await audio_cache.get(key) is None:
+                async for _ in self._synthesize(key, sentence):
+                    pass
+                warmed += 1
+        logger.info("TTS cache pre-warmed %s of %s sentences.", warmed, len(sentences))
+
+    def prewarm(self, phrases):
+        """
+        Synthesizes fixed phrases (greeting, fallback) in the background, sentence
+        by sentence like the interview socket does, so their first use is a cache hit.
+        """
+        if not TTS_CACHE_PREWARM or not self.api_key or self.prewarm_task:
+            return
+        self.prewarm_task = asyncio.create_task(self._prewarm([*phrases, *TTS_PREWARM_PHRASES]))
+
+    async def close(self):
+        if self.prewarm_task and not self.prewarm_task.done():
+            self.prewarm_task.cancel()
+            await asyncio.gather(self.prewarm_task, return_exceptions=True)
+        if self.http_client:
+            await self.http_client.aclose()
+            self.http_client = None
+
+
+tts_service = TextToSpeechService()
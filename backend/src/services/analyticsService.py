@@ -0,0 +1,210 @@
+from src.config.database import db
+from datetime import datetime
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+import logging
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_COLLECTION = "user_analytics"
+TREND_LENGTH = 30  # Points kept for trend charts
+TOP_MISSED_KEYWORDS = 10
+# Ids of the newest reports folded into an aggregate, so a retried update is applied once
+APPLIED_REPORTS_KEPT = 100
+SCORE_FIELDS = ["technical", "communication", "confidence"]
+# Creates a user's aggregate if it is missing, before the first report is applied to it
+CREATE_AGGREGATE = {"$setOnInsert": {"applied_reports": []}}
+
+def _safe_key(value):
+    """
+    Keywords and types become field names in the aggregate document,
+    so strip the characters MongoDB does not allow there.
+    """
+    key = str(value).strip().lower().replace(".", "_").lstrip("$")
+    return key or "unknown"
+
+def _trend_points(report):
+    scores = report.get("scores", {})
+    score_point = {"timestamp": report["timestamp"], "type": report.get("type")}
+    for field in SCORE_FIELDS:
+        score_point[field] = scores.get(field, 0)
+    filler_point = {"timestamp": report["timestamp"], "count": report.get("filler_word_count", 0)}
+    return score_point, filler_point
+
+def analytics_filter(email, report):
+    """
+    Matches the user's aggregate only if the report is not folded into it yet,
+    so a repeated update matches nothing instead of counting the report twice.
+    """
+    return {"_id": email, "applied_reports": {"$ne": report["_id"]}}
+
+def analytics_update(report):
+    """
+    Builds the single update that folds one saved report into its user's aggregate.
+    Use it with analytics_filter.
+    """
+    interview_type = _safe_key(report.get("type"))
+    scores = report.get("scores", {})
+    score_point, filler_point = _trend_points(report)
+
+    inc = {
+        "report_count": 1,
+        "filler_total": report.get("filler_word_count", 0),
+        f"by_type.{interview_type}.count": 1,
+    }
+    for field in SCORE_FIELDS:
+        inc[f"by_type.{interview_type}.{field}_sum"] = scores.get(field, 0)
+    for keyword in report.get("keywords_missed", []):
+        inc[f"keywords_missed.{_safe_key(keyword)}"] = 1
+
+    return {
+        "$inc": inc,
+        "$push": {
+            "score_trend": {"$each": [score_point], "$slice": -TREND_LENGTH},
+            "filler_trend": {"$each": [filler_point], "$slice": -TREND_LENGTH},
+            "applied_reports": {"$each": [report["_id"]], "$slice": -APPLIED_REPORTS_KEPT},
+        },
+        "$set": {"updated_at": datetime.utcnow()},
+    }
+
+def analytics_writes(email, report):
+    """
+    The writes that fold one saved report into its user's aggregate, in order.
+    The first creates the aggregate if it is missing; it filters on _id alone,
+    so a duplicate key only ever means another write created it first. The
+    second applies the report without upsert, so it can't be mistaken for a
+    creation. Both are safe to repeat.
+    """
+    return [
+        UpdateOne({"_id": email}, CREATE_AGGREGATE, upsert=True),
+        UpdateOne(analytics_filter(email, report), analytics_update(report)),
+    ]
+
+def fold_report_counts(aggregate, report):
+    """
+    In-memory equivalent of the $inc part of analytics_update, used by the rebuild job.
+    Counts are order independent; trends are handled by the caller.
+    """
+    interview_type = _safe_key(report.get("type"))
+    scores = report.get("scores", {})
+
+    aggregate["report_count"] = aggregate.get("report_count", 0) + 1
+    aggregate["filler_total"] = aggregate.get("filler_total", 0) + report.get("filler_word_count", 0)
+
+    type_stats = aggregate.setdefault("by_type", {}).setdefault(interview_type, {"count": 0})
+    type_stats["count"] += 1
+    for field in SCORE_FIELDS:
+        type_stats[f"{field}_sum"] = type_stats.get(f"{field}_sum", 0) + scores.get(field, 0)
+
+    missed = aggregate.setdefault("keywords_missed", {})
+    for keyword in report.get("keywords_missed", []):
+        key = _safe_key(keyword)
+        missed[key] = missed.get(key, 0) + 1
+    return aggregate
+
+async def update_user_analytics(email, report):
+    """
+    Folds a newly saved report into the user's aggregate document, the same
+    way as analytics_writes. Does nothing if the report was already folded in.
+    """
+    collection = db.get_db()[ANALYTICS_COLLECTION]
+    try:
+        await collection.update_one({"_id": email}, CREATE_AGGREGATE, upsert=True)
+    except DuplicateKeyError:
+        pass  # A concurrent report for the same user created it
+    await collection.update_one(analytics_filter(email, report), analytics_update(report))
+
+async def get_user_analytics(email):
+    """
+    Reads the precomputed aggregate for a user and shapes it for the progress charts.
+    """
+    empty = {
+        "report_count": 0,
+        "averages_by_type": {},
+        "filler_total": 0,
+        "filler_trend": [],
+        "score_trend": [],
+        "most_missed_keywords": [],
+    }
+    if not db.client:
+        return empty
+
+    aggregate = await db.get_db()[ANALYTICS_COLLECTION].find_one({"_id": email})
+    if not aggregate:
+        return empty
+
+    averages = {}
+    for interview_type, stats in aggregate.get("by_type", {}).items():
+        count = stats.get("count", 0) or 1
+        averages[interview_type] = {
+            "count": stats.get("count", 0),
+            **{field: round(stats.get(f"{field}_sum", 0) / count, 1) for field in SCORE_FIELDS}
+        }
+
+    missed = sorted(aggregate.get("keywords_missed", {}).items(), key=lambda item: item[1], reverse=True)
+
+    return {
+        "report_count": aggregate.get("report_count", 0),
+        "averages_by_type": averages,
+        "filler_total": aggregate.get("filler_total", 0),
+        "filler_trend": aggregate.get("filler_trend", []),
+        "score_trend": aggregate.get("score_trend", []),
+        "most_missed_keywords": [
+            {"keyword": keyword, "count": count} for keyword, count in missed[:TOP_MISSED_KEYWORDS]
+        ],
+        "updated_at": aggregate.get("updated_at"),
+    }
+
+async def rebuild_analytics(user_email=None, batch_size=500):
+    """
+    Recomputes aggregates from the reports collection, one user at a time,
+    reading reports in batches and writing finished aggregates in bulk.
+    Pass user_email to rebuild a single user. Returns the number of users rebuilt.
+    """
+    if not db.client:
+        return 0
+
+    database = db.get_db()
+    query = {"user_email": user_email} if user_email else {"user_email": {"$ne": None}}
+    # Matches the (user_email, timestamp desc, _id desc) index, so this is an index walk
+    cursor = database["reports"].find(query).sort(
+        [("user_email", 1), ("timestamp", -1), ("_id", -1)]
+    ).batch_size(batch_size)
+
+    pending_writes = []
+    rebuilt = 0
+    current_email = None
+    aggregate = {}
+    newest_reports = []  # Only the newest reports are needed for trends and applied_reports
+
+    async def finish_user():
+        nonlocal rebuilt
+        if current_email is None:
+            return
+        points = [_trend_points(report) for report in reversed(newest_reports[:TREND_LENGTH])]  # oldest first
+        aggregate["score_trend"] = [score_point for score_point, _ in points]
+        aggregate["filler_trend"] = [filler_point for _, filler_point in points]
+        aggregate["applied_reports"] = [report["_id"] for report in reversed(newest_reports)]
+        aggregate["updated_at"] = datetime.utcnow()
+        pending_writes.append(ReplaceOne({"_id": current_email}, aggregate, upsert=True))
+        rebuilt += 1
+        if len(pending_writes) >= batch_size:
+            await database[ANALYTICS_COLLECTION].bulk_write(pending_writes, ordered=False)
+            pending_writes.clear()
+
+    async for report in cursor:
+        if report["user_email"] != current_email:
+            await finish_user()
+            current_email = report["user_email"]
+            aggregate = {}
+            newest_reports = []
+        fold_report_counts(aggregate, report)
+        if len(newest_reports) < max(TREND_LENGTH, APPLIED_REPORTS_KEPT):
+            newest_reports.append(report)
+    await finish_user()
+
+    if pending_writes:
+        await database[ANALYTICS_COLLECTION].bulk_write(pending_writes, ordered=False)
+
+    logger.info("Rebuilt analytics for %s users.", rebuilt)
+    return rebuilt
@@ -0,0 +1,224 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from dotenv import load_dotenv
+from src.config.database import db
+from src.services.ai.gradingService import grade_interview
+from src.services.ai.admissionControl import LLMOverloaded
+from src.services.ai.sessionEvaluator import get_evaluator
+from src.services.reportService import save_report_to_db, get_report, report_from_document
+from src.services.metrics import GRADING_SECONDS, QUEUE_WAIT_SECONDS, ERRORS, observe
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = "grading_jobs"
+GRADING_WORKERS = int(os.environ.get("GRADING_WORKERS", "4"))
+GRADING_LEASE_SECONDS = float(os.environ.get("GRADING_LEASE_SECONDS", "120"))
+GRADING_POLL_SECONDS = float(os.environ.get("GRADING_POLL_SECONDS", "2"))
+GRADING_MAX_ATTEMPTS = int(os.environ.get("GRADING_MAX_ATTEMPTS", "3"))
+
+
+class GradingQueue:
+    """
+    Mongo-backed queue of grading jobs worked by a fixed number of async workers.
+
+    A worker claims a job by atomically flipping it to "running" with a lease
+    and an owner token. If the process dies mid-job the lease runs out and any
+    worker, in this or another process, picks the job up again, so queued and
+    in-flight jobs survive restarts. A worker only updates a job while it still
+    holds the lease it claimed, so a slow worker can't overwrite the job's next
+    owner. Finished reports are also pushed to the interview socket
+    of the session that asked for them, if that socket is open in this process
+    and belongs to the job's user.
+    """
+
+    def __init__(self, workers=GRADING_WORKERS, lease=GRADING_LEASE_SECONDS,
+                 poll=GRADING_POLL_SECONDS, max_attempts=GRADING_MAX_ATTEMPTS):
+        self.workers = workers
+        self.lease = lease
+        self.poll = poll
+        self.max_attempts = max_attempts
+        self.tasks = []
+        self.wakeup = asyncio.Event()
+        self.subscribers = {}  # session_id -> (SessionRuntime of the open socket, its user's email)
+        self.active = 0
+
+    def _collection(self):
+        return db.get_db()[JOBS_COLLECTION]
+
+    async def enqueue(self, user_email, history, interview_type, session_id=None):
+        now = datetime.utcnow()
+        job = {
+            "_id": ObjectId(),
+            "status": "queued",
+            "user_email": user_email,
+            "type": interview_type,
+            "history": history,
+            "session_id": session_id,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self._collection().insert_one(job)
+        self.wakeup.set()
+        return str(job["_id"])
+
+    async def get(self, job_id, user_email):
+        """Returns the job (without its transcript) if it exists and belongs to user_email."""
+        try:
+            oid = ObjectId(job_id)
+        except (InvalidId, TypeError):
+            return None
+
+        job = await self._collection().find_one(
+            {"_id": oid, "user_email": user_email},
+            projection={"history": 0}
+        )
+        if job:
+            job["job_id"] = str(job.pop("_id"))
+        return job
+
+    async def depth(self):
+        return await self._collection().count_documents({"status": "queued"})
+
+    def subscribe(self, session_id, session, user_email):
+        self.subscribers[session_id] = (session, user_email)
+
+    def unsubscribe(self, session_id, session=None):
+        subscriber = self.subscribers.get(session_id)
+        if subscriber and (session is None or subscriber[0] is session):
+            self.subscribers.pop(session_id, None)
+
+    async def _claim(self):
+        now = datetime.utcnow()
+        return await self._collection().find_one_and_update(
+            {
+                "$or": [
+                    {"status": "queued"},
+                    # Lease ran out: the worker holding it died or hung
+                    {"status": "running", "lease_until": {"$lt": now}},
+                ]
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "lease_until": now + timedelta(seconds=self.lease),
+                    "lease_owner": ObjectId(),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _update_claimed(self, job, update):
+        """Applies update to job if this worker still holds its lease; returns whether it did."""
+        result = await self._collection().update_one({"_id": job["_id"], "lease_owner": job["lease_owner"]}, update)
+        if result.matched_count == 0:
+            logger.warning("Grading job %s lost its lease, dropping this attempt's result.", job["_id"])
+            return False
+        return True
+
+    async def _notify(self, job, frame):
+        subscriber = self.subscribers.get(job.get("session_id"))
+        # Session ids come from clients; only the job's owner gets its report
+        if subscriber is not None and subscriber[1] == job["user_email"]:
+            # Never wait on a slow socket; the job result stays available over HTTP
+            subscriber[0].offer(frame)
+
+    async def _process(self, job):
+        job_id = str(job["_id"])
+        if job["attempts"] == 1:
+            # Retries would count their earlier attempts as waiting
+            QUEUE_WAIT_SECONDS.labels("grading").observe((datetime.utcnow() - job["created_at"]).total_seconds())
+        self.active += 1
+        try:
+            with observe(GRADING_SECONDS, "queue"):
+                # Reports are saved under the job's id. An earlier attempt may have saved one
+                # before it died; finish its writes with that report instead of grading again.
+                saved = await get_report(job["_id"])
+                if saved:
+                    report = report_from_document(saved)
+                else:
+                    # Only found if the session ran in this process; otherwise grade the full transcript
+                    evaluator = get_evaluator(job.get("session_id"), job["type"], user=job["user_email"])
+                    report = await grade_interview(job["history"], job["type"], evaluator=evaluator, user=job["user_email"])
+                report_id = await save_report_to_db(
+                    report, job["type"], user_email=job["user_email"], report_id=job["_id"],
+                    timestamp=saved["timestamp"] if saved else None,
+                )
+        except LLMOverloaded as e:
+            # Not the job's fault: put it back without spending an attempt, and sit out the wait
+            logger.warning("Grading job %s deferred: %s", job_id, e)
+            await self._update_claimed(
+                job, {"$set": {"status": "queued", "updated_at": datetime.utcnow()}, "$inc": {"attempts": -1}}
+            )
+            await asyncio.sleep(e.retry_after)
+            return
+        except Exception as e:
+            ERRORS.labels("grading").inc()
+            logger.error("Grading job %s failed (attempt %s): %s", job_id, job["attempts"], e)
+            failed = job["attempts"] >= self.max_attempts
+            updated = await self._update_claimed(
+                job, {"$set": {"status": "failed" if failed else "queued", "error": str(e), "updated_at": datetime.utcnow()}}
+            )
+            if updated and failed:
+                await self._notify(job, {"type": "grading_failed", "job_id": job_id, "error": str(e)})
+            return
+        finally:
+            self.active -= 1
+
+        if not await self._update_claimed(job, {
+            "$set": {"status": "done", "result": report, "report_id": report_id, "updated_at": datetime.utcnow()},
+            # The transcript is only needed until the report exists
+            "$unset": {"history": "", "lease_until": "", "lease_owner": ""},
+        }):
+            return
+        await self._notify(job, {"type": "grading_complete", "job_id": job_id, "report": report})
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error("Grading worker could not claim a job: %s", e)
+                job = None
+
+            if job:
+                await self._process(job)
+                continue
+
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.poll)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if not db.client or self.tasks:
+            return
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info("Started %s grading workers.", self.workers)
+
+    async def stop(self):
+        # Jobs interrupted here keep their lease and are retried once it expires
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def metrics(self):
+        return {
+            "workers": len(self.tasks),
+            "active": self.active,
+            "subscribers": len(self.subscribers),
+        }
+
+
+grading_queue = GradingQueue()
@@ -0,0 +1,122 @@
+import os
+import time
+import asyncio
+import bcrypt
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from src.services.metrics import BCRYPT_SECONDS, QUEUE_WAIT_SECONDS, ERRORS
+
+load_dotenv()
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.environ.get("BCRYPT_WORKERS", "2"))
+BCRYPT_MAX_PENDING = int(os.environ.get("BCRYPT_MAX_PENDING", "64"))
+
+
+class HashingQueueFull(Exception):
+    """Raised when too many hash/verify calls are already waiting for a worker."""
+    pass
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool so hashing never blocks the event loop.
+
+    bcrypt releases the GIL while it works, so a couple of threads are enough to keep
+    the loop responsive. Calls beyond max_pending are rejected instead of queued, which
+    turns a login burst into fast 503s rather than a growing backlog.
+    """
+
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=BCRYPT_WORKERS, max_pending=BCRYPT_MAX_PENDING):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor: ThreadPoolExecutor = None
+        self.pending = 0
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "rejected": 0,
+            "failed": 0,
+            "queue_wait_seconds": 0.0,
+            "busy_seconds": 0.0,
+        }
+
+    def _get_executor(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self.executor
+
+    async def _run(self, operation, fn, *args):
+        if self.pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise HashingQueueFull(f"{self.pending} password operations already pending")
+
+        self.pending += 1
+        self.stats["submitted"] += 1
+        submitted_at = time.perf_counter()
+
+        def timed():
+            started_at = time.perf_counter()
+            result = fn(*args)
+            return result, started_at, time.perf_counter()
+
+        try:
+            loop = asyncio.get_running_loop()
+            result, started_at, finished_at = await loop.run_in_executor(self._get_executor(), timed)
+            # Stats are only touched from the event loop thread
+            self.stats["completed"] += 1
+            self.stats["queue_wait_seconds"] += started_at - submitted_at
+            self.stats["busy_seconds"] += finished_at - started_at
+            QUEUE_WAIT_SECONDS.labels("bcrypt").observe(started_at - submitted_at)
+            BCRYPT_SECONDS.labels(operation).observe(finished_at - started_at)
+            return result
+        except Exception:
+            self.stats["failed"] += 1
+            ERRORS.labels("bcrypt").inc()
+            raise
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        def work():
+            salt = bcrypt.gensalt(rounds=self.rounds)
+            return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+        return await self._run("hash", work)
+
+    async def verify(self, password: str, hashed_password) -> bool:
+        if isinstance(hashed_password, str):
+            hashed_password = hashed_password.encode('utf-8')
+
+        return await self._run("verify", bcrypt.checkpw, password.encode('utf-8'), hashed_password)
+
+    def needs_rehash(self, hashed_password) -> bool:
+        """
+        True if the stored hash was made with a lower cost factor than the current setting.
+        bcrypt hashes look like $2b$12$<salt+hash>, where 12 is the cost.
+        """
+        if isinstance(hashed_password, bytes):
+            hashed_password = hashed_password.decode('utf-8')
+        try:
+            cost = int(hashed_password.split("$")[2])
+        except (IndexError, ValueError):
+            return False
+        return cost < self.rounds
+
+    def metrics(self):
+        return {
+            **self.stats,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "workers": self.workers,
+            "rounds": self.rounds,
+        }
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,113 @@
+import os
+import time
+import asyncio
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from pymongo import monitoring
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Latency histograms for the hot path, exposed on /metrics. Observing one is a
+# lock and a few additions, cheap enough to do on every frame and every call.
+# With several uvicorn workers each process reports its own values.
+
+LOOP_LAG_INTERVAL_SECONDS = float(os.environ.get("LOOP_LAG_INTERVAL_SECONDS", "0.25"))
+
+# Most stages finish in milliseconds; model calls and grading take seconds
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, float("inf"))
+SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0, 30.0, 60.0, float("inf"))
+
+WS_ACCEPT_SECONDS = Histogram(
+    "ws_accept_seconds",
+    "Time from the WebSocket handshake until the session is ready and its first frame is queued",
+    buckets=FAST_BUCKETS,
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "llm_first_token_seconds",
+    "Time from sending a streamed completion until its first content delta",
+    ["model"],
+    buckets=SLOW_BUCKETS,
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_seconds",
+    "Total time of a chat completion, excluding the wait for admission",
+    ["model", "mode"],
+    buckets=SLOW_BUCKETS,
+)
+GRADING_SECONDS = Histogram(
+    "grading_seconds",
+    "Time to grade an interview and save its report",
+    ["path"],
+    buckets=SLOW_BUCKETS,
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongo_command_seconds",
+    "MongoDB command round trip as reported by the driver",
+    ["command"],
+    buckets=FAST_BUCKETS,
+)
+BCRYPT_SECONDS = Histogram(
+    "bcrypt_seconds",
+    "Time a bcrypt hash or verify spends on a worker thread",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, float("inf")),
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "queue_wait_seconds",
+    "Time work waits before it is picked up: outbound socket frames, LLM admission per lane, bcrypt workers, grading jobs",
+    ["queue"],
+    buckets=FAST_BUCKETS[:-1] + (5.0, 10.0, 30.0, 60.0, float("inf")),
+)
+
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "How late a timer on the event loop fires; anything blocking the loop shows up here",
+    buckets=FAST_BUCKETS,
+)
+
+ACTIVE_SESSIONS = Gauge("active_sessions", "Interview sockets currently open")
+ERRORS = Counter("errors", "Errors by component", ["component"])
+LLM_ADMISSIONS = Counter("llm_admissions", "LLM calls admitted, or shed and why, per admission lane", ["lane", "outcome"])
+LOG_RECORDS_DROPPED = Counter("log_records_dropped", "Log records dropped because the log queue was full")
+
+
+@contextmanager
+def observe(histogram, *labels):
+    """Times the block into histogram, whether it finishes or raises."""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histogram.labels(*labels) if labels else histogram).observe(time.perf_counter() - started_at)
+
+
+async def monitor_event_loop(interval=LOOP_LAG_INTERVAL_SECONDS):
+    """Samples event loop lag into EVENT_LOOP_LAG_SECONDS every interval seconds, until cancelled."""
+    loop = asyncio.get_running_loop()
+    while True:
+        due = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - due))
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Feeds MONGO_COMMAND_SECONDS from the driver's own command timings."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_SECONDS.labels(event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_COMMAND_SECONDS.labels(event.command_name).observe(event.duration_micros / 1e6)
+        ERRORS.labels("mongo").inc()
+
+
+mongo_listener = MongoCommandListener()
+
+
+def render():
+    """The Prometheus text exposition of every registered metric."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -1,58 +1,127 @@
 from src.config.database import db
+from src.services.userCache import user_cache
+from src.services.analyticsService import update_user_analytics, analytics_writes, ANALYTICS_COLLECTION
+from src.services.writeBehind import write_buffer
 from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument, InsertOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+import base64
+import logging
 
-async def update_streak(email):
+logger = logging.getLogger(__name__)
+
+# Fields returned by the summary view of the reports list
+REPORT_SUMMARY_PROJECTION = {"timestamp": 1, "type": 1, "scores": 1}
+
+def encode_cursor(timestamp, report_id):
     """
-    Updates the user's streak based on their last practice date.
+    Opaque keyset cursor for the position just after (timestamp, _id).
     """
-    users = db.get_db()["users"]
-    user = await users.find_one({"email": email})
-    
-    if not user:
-        return
+    raw = f"{timestamp.isoformat()}|{report_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
 
+def decode_cursor(cursor):
+    """
+    Inverse of encode_cursor. Raises ValueError on anything malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        timestamp, report_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), ObjectId(report_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def streak_update():
+    """
+    The pipeline update that moves a user's streak for a practice session now.
+    It runs server-side in one step, so concurrent reports for the same user
+    can't read a stale streak and lose an increment.
+    """
     now = datetime.utcnow()
-    today = now.date()
-    
-    last_practice = user.get("last_practice_date")
-    current_streak = user.get("streak", 0)
-    
-    if last_practice:
-        last_date = last_practice.date()
-        if last_date == today:
-            # Already practiced today, do nothing
-            pass
-        elif last_date == today - timedelta(days=1):
-            # Practiced yesterday, increment streak
-            current_streak += 1
-        else:
-            # Missed a day (or more), reset streak
-            current_streak = 1
-    else:
-        # First time practicing
-        current_streak = 1
-        
-    await users.update_one(
-        {"email": email},
+    today = datetime(now.year, now.month, now.day)
+    yesterday = today - timedelta(days=1)
+    current_streak = {"$ifNull": ["$streak", 0]}
+
+    return [
         {
             "$set": {
-                "last_practice_date": now,
-                "streak": current_streak
+                # Both fields are computed from the document as it was before this update
+                "streak": {
+                    "$switch": {
+                        "branches": [
+                            # Already practiced today, keep the streak
+                            {"case": {"$gte": ["$last_practice_date", today]}, "then": current_streak},
+                            # Practiced yesterday, increment streak
+                            {"case": {"$gte": ["$last_practice_date", yesterday]}, "then": {"$add": [current_streak, 1]}},
+                        ],
+                        # First time practicing, or missed a day (or more): reset streak
+                        "default": 1
+                    }
+                },
+                "last_practice_date": now
             }
         }
+    ]
+
+async def update_streak(email):
+    """
+    Updates the user's streak based on their last practice date.
+    Returns the new streak, or None if the user doesn't exist.
+    """
+    user = await db.get_db()["users"].find_one_and_update(
+        {"email": email},
+        streak_update(),
+        projection={"streak": 1},
+        return_document=ReturnDocument.AFTER
     )
+    user_cache.invalidate(email)
 
-async def save_report_to_db(report_data, interview_type, user_email=None):
+    if not user:
+        return None
+    return user["streak"]
+
+def report_from_document(document):
+    """Inverse of the document built by save_report_to_db: the report as grade_interview returned it."""
+    scores = document.get("scores", {})
+    return {
+        "technical_score": scores.get("technical", 0),
+        "communication_score": scores.get("communication", 0),
+        "confidence_score": scores.get("confidence", 0),
+        "feedback": document.get("feedback", ""),
+        "strengths": document.get("strengths", []),
+        "improvements": document.get("improvements", []),
+        "keywords_mentioned": document.get("keywords_mentioned", []),
+        "keywords_missed": document.get("keywords_missed", []),
+        "filler_word_count": document.get("filler_word_count", 0),
+        "filler_details": document.get("filler_details", {}),
+    }
+
+async def get_report(report_id):
+    """The saved report document with this id, or None."""
+    if not db.client:
+        return None
+    return await db.get_db()["reports"].find_one({"_id": report_id})
+
+async def save_report_to_db(report_data, interview_type, user_email=None, report_id=None, timestamp=None):
     """
-    Saves the generated interview report to MongoDB.
+    Saves the generated interview report to MongoDB and folds it into the
+    user's analytics and streak. The writes go through the write-behind buffer
+    and land within a flush window; if the buffer is full they are made here,
+    and any error is raised.
+    report_id: ObjectId to save the report under, so a retried job saves it once.
+    timestamp: When the report was first saved, when finishing an earlier save.
+    Returns the report id.
     """
     if not db.client:
-        print("Database not connected. Skipping save.")
+        logger.warning("Database not connected. Skipping save.")
         return None
 
     document = {
+        # Set here so the id is known before the write and a retried insert can't duplicate it
+        "_id": report_id or ObjectId(),
         "user_email": user_email,
-        "timestamp": datetime.utcnow(),
+        "timestamp": timestamp or datetime.utcnow(),
         "type": interview_type,
         "scores": {
             "technical": report_data.get("technical_score", 0),
@@ -68,17 +137,65 @@ async def save_report_to_db(report_data, interview_type, user_email=None):
         "filler_details": report_data.get("filler_details", {})
     }
     
+    writes = [("reports", InsertOne(document), None)]
+    if user_email:
+        writes.extend((ANALYTICS_COLLECTION, operation, None) for operation in analytics_writes(user_email, document))
+        writes.append(("users", UpdateOne({"email": user_email}, streak_update()), lambda: user_cache.invalidate(user_email)))
+    if write_buffer.add_all(writes):
+        return str(document["_id"])
+
     try:
-        result = await db.get_db()["reports"].insert_one(document)
-        print(f"Report saved with ID: {result.inserted_id}")
-        
-        if user_email:
-            await update_streak(user_email)
-            
-        return str(result.inserted_id)
-    except Exception as e:
-        print(f"Error saving report: {e}")
-        return None
+        await db.get_db()["reports"].insert_one(document)
+    except DuplicateKeyError:
+        # Saved by an earlier attempt that failed afterwards; finish its remaining writes
+        logger.info("Report %s already saved.", document["_id"])
+
+    if user_email:
+        await update_user_analytics(user_email, document)
+        await update_streak(user_email)
+
+    return str(document["_id"])
+
+async def get_reports_page(user_email=None, page_size=20, before=None, summary=False):
+    """
+    Fetches one page of reports, newest first, using keyset pagination on (timestamp, _id).
+    before: cursor returned as next_cursor by the previous page.
+    summary: only return timestamp, type and scores.
+    Returns {"items": [...], "next_cursor": str or None}.
+    """
+    if not db.client:
+        return {"items": [], "next_cursor": None}
+
+    match = {}
+    if user_email:
+        match["user_email"] = user_email
+    if before:
+        timestamp, report_id = decode_cursor(before)
+        match["$or"] = [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "_id": {"$lt": report_id}},
+        ]
+
+    # Fetch one extra document to know whether another page exists
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"timestamp": -1, "_id": -1}},
+        {"$limit": page_size + 1},
+    ]
+    if summary:
+        pipeline.append({"$project": REPORT_SUMMARY_PROJECTION})
+    # Convert ObjectId to string for JSON serialization on the server
+    pipeline.append({"$set": {"_id": {"$toString": "$_id"}}})
+
+    reports = await db.get_db()["reports"].aggregate(pipeline).to_list(length=page_size + 1)
+
+    next_cursor = None
+    if len(reports) > page_size:
+        reports = reports[:page_size]
+        last = reports[-1]
+        next_cursor = encode_cursor(last["timestamp"], last["_id"])
+
+    return {"items": reports, "next_cursor": next_cursor}
 
 async def get_recent_reports(user_email=None, limit=5):
     """
@@ -88,18 +205,8 @@ async def get_recent_reports(user_email=None, limit=5):
         return []
     
     try:
-        query = {}
-        if user_email:
-            query["user_email"] = user_email
-            
-        cursor = db.get_db()["reports"].find(query).sort("timestamp", -1).limit(limit)
-        reports = await cursor.to_list(length=limit)
-        
-        # Convert ObjectId to string for JSON serialization
-        for report in reports:
-            report["_id"] = str(report["_id"])
-            
-        return reports
+        page = await get_reports_page(user_email=user_email, page_size=limit)
+        return page["items"]
     except Exception as e:
-        print(f"Error fetching reports: {e}")
+        logger.error("Error fetching reports: %s", e)
         return []
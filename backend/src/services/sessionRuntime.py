@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+from dotenv import load_dotenv
+from src.services.metrics import ACTIVE_SESSIONS, QUEUE_WAIT_SECONDS, ERRORS
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+SESSION_QUEUE_FRAMES = int(os.environ.get("SESSION_QUEUE_FRAMES", "256"))
+SESSION_MAX_BUFFERED_BYTES = int(os.environ.get("SESSION_MAX_BUFFERED_BYTES", str(4 * 1024 * 1024)))
+SESSION_SEND_TIMEOUT_SECONDS = float(os.environ.get("SESSION_SEND_TIMEOUT_SECONDS", "10"))
+SESSION_MAX_MESSAGE_BYTES = int(os.environ.get("SESSION_MAX_MESSAGE_BYTES", str(1024 * 1024)))
+SESSION_MAX_TURNS = int(os.environ.get("SESSION_MAX_TURNS", "200"))
+# Longest candidate answer kept in the session history, so a session's history
+# stays below SESSION_MAX_TURNS * SESSION_MAX_ANSWER_BYTES plus the replies
+SESSION_MAX_ANSWER_BYTES = int(os.environ.get("SESSION_MAX_ANSWER_BYTES", str(32 * 1024)))
+
+# Process-wide counters across all sessions
+session_stats = {
+    "active": 0,
+    "opened": 0,
+    "closed": 0,
+    "slow_consumer_closes": 0,
+    "send_timeouts": 0,
+    "oversized_messages": 0,
+    "clipped_answers": 0,
+}
+# Read when /metrics is scraped, nothing to update per session
+ACTIVE_SESSIONS.set_function(lambda: session_stats["active"])
+
+# Interviewer turns across all sessions, with token counts estimated by count_tokens
+turn_stats = {
+    "completed": 0,
+    "interrupted": 0,
+    "interrupted_by": {"submit_answer": 0, "submit_code": 0, "barge_in": 0, "disconnect": 0},
+    # Turns turned away by LLM admission control before anything was generated
+    "shed": 0,
+    "delivered_tokens": 0,
+    "wasted_tokens": 0,
+    "tts_sentences_dropped": 0,
+}
+
+
+def record_turn(prompt_tokens, generated_tokens, delivered_tokens, interrupted_by=None):
+    """
+    Delivered tokens are reply tokens that were sent to the candidate. Wasted
+    tokens were paid for without reaching them: reply tokens generated but
+    not sent, plus the prompt of an interrupted turn that sent nothing.
+    """
+    turn_stats["delivered_tokens"] += delivered_tokens
+    turn_stats["wasted_tokens"] += generated_tokens - delivered_tokens
+    if interrupted_by is None:
+        turn_stats["completed"] += 1
+        return
+    turn_stats["interrupted"] += 1
+    turn_stats["interrupted_by"][interrupted_by] = turn_stats["interrupted_by"].get(interrupted_by, 0) + 1
+    if delivered_tokens == 0:
+        turn_stats["wasted_tokens"] += prompt_tokens
+
+
+def clip_answer(text, limit=SESSION_MAX_ANSWER_BYTES):
+    """text cut down to at most limit bytes of UTF-8, on a character boundary."""
+    data = text.encode("utf-8")
+    if len(data) <= limit:
+        return text
+    session_stats["clipped_answers"] += 1
+    return data[:limit].decode("utf-8", errors="ignore")
+
+
+class SessionClosed(Exception):
+    """Raised to code sending to or receiving from a session that has ended."""
+
+
+class SessionRuntime:
+    """
+    Owns the tasks and the outbound buffer of one interview socket.
+
+    Frames are serialized when queued and a single sender task writes them to
+    the socket. The buffer is bounded by frame count and by bytes: send()
+    waits for room, so producers inside the session (replies, TTS) slow down
+    to the client's pace, while offer() never waits and disconnects a client
+    that has let the buffer fill up. A send that takes longer than
+    send_timeout also ends the session.
+
+    run() returns as soon as the receiver or the sender finishes or close()
+    is called, and cancels every task the session started.
+    """
+
+    def __init__(self, websocket: WebSocket, max_frames=SESSION_QUEUE_FRAMES,
+                 max_bytes=SESSION_MAX_BUFFERED_BYTES, send_timeout=SESSION_SEND_TIMEOUT_SECONDS):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=max_frames)
+        self.max_bytes = max_bytes
+        self.send_timeout = send_timeout
+        self.buffered_bytes = 0
+        self.has_room = asyncio.Event()
+        self.has_room.set()
+        self.closed = asyncio.Event()
+        self.close_code = 1000
+        self.close_reason = None
+        self.tasks = set()
+
+    @staticmethod
+    def _encode(frame):
+        return frame if isinstance(frame, bytes) else json.dumps(frame)
+
+    def _fits(self, data):
+        # A frame larger than the whole budget is still let through on its own
+        return not self.queue.full() and (self.buffered_bytes == 0 or self.buffered_bytes + len(data) <= self.max_bytes)
+
+    def _put(self, data):
+        self.queue.put_nowait((data, time.perf_counter()))
+        self.buffered_bytes += len(data)
+
+    async def send(self, frame):
+        """Queues a frame (a dict, or bytes for a binary frame), waiting while the buffer is full."""
+        data = self._encode(frame)
+        while not self._fits(data):
+            if self.closed.is_set():
+                raise SessionClosed()
+            self.has_room.clear()
+            await self.has_room.wait()
+        if self.closed.is_set():
+            raise SessionClosed()
+        self._put(data)
+
+    def offer(self, frame):
+        """
+        Queues a frame without waiting, for producers outside the session such as
+        grading workers and STT callbacks. Returns False if the frame was not queued.
+        """
+        if self.closed.is_set():
+            return False
+        data = self._encode(frame)
+        if not self._fits(data):
+            session_stats["slow_consumer_closes"] += 1
+            self.close(1013, "Client is not keeping up")
+            return False
+        self._put(data)
+        return True
+
+    async def receive(self):
+        message = await self.websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        data = message.get("bytes") or (message.get("text") or "").encode("utf-8")
+        if len(data) > SESSION_MAX_MESSAGE_BYTES:
+            session_stats["oversized_messages"] += 1
+            self.close(1009, "Message too large")
+            raise SessionClosed()
+        return message
+
+    def spawn(self, coro):
+        """Starts a task that is cancelled when the session ends."""
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self._reap)
+        return task
+
+    def _reap(self, task):
+        self.tasks.discard(task)
+        error = None if task.cancelled() else task.exception()
+        if error and not isinstance(error, SessionClosed):
+            ERRORS.labels("session").inc()
+            logger.error("Session task failed: %r", error)
+
+    def close(self, code=1000, reason=None):
+        if self.closed.is_set():
+            return
+        self.close_code = code
+        self.close_reason = reason
+        self.closed.set()
+        self.has_room.set()  # Wake producers waiting in send()
+
+    async def _sender(self):
+        wait = QUEUE_WAIT_SECONDS.labels("session_send")
+        while True:
+            data, queued_at = await self.queue.get()
+            wait.observe(time.perf_counter() - queued_at)
+            self.buffered_bytes -= len(data)
+            self.has_room.set()
+            try:
+                if isinstance(data, bytes):
+                    await asyncio.wait_for(self.websocket.send_bytes(data), self.send_timeout)
+                else:
+                    await asyncio.wait_for(self.websocket.send_text(data), self.send_timeout)
+            except asyncio.TimeoutError:
+                session_stats["send_timeouts"] += 1
+                self.close(1013, "Client is not keeping up")
+                return
+            except Exception as e:
+                logger.info("Could not send to client: %s", e)
+                return
+
+    async def run(self, receiver):
+        session_stats["active"] += 1
+        session_stats["opened"] += 1
+        main_tasks = [
+            asyncio.create_task(receiver),
+            asyncio.create_task(self._sender()),
+            asyncio.create_task(self.closed.wait()),
+        ]
+        try:
+            done, _ = await asyncio.wait(main_tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = None if task.cancelled() else task.exception()
+                if error and not isinstance(error, (WebSocketDisconnect, SessionClosed)):
+                    ERRORS.labels("session").inc()
+                    logger.error("Connection closed: %s", error)
+        finally:
+            self.close(self.close_code, self.close_reason)
+            tasks = [*main_tasks, *self.tasks]
+            for task in tasks:
+                task.cancel()
+            # Nothing buffered can be delivered any more
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.buffered_bytes = 0
+
+            try:
+                await asyncio.gather(*tasks, return_exceptions=True)
+                if self.websocket.client_state == WebSocketState.CONNECTED and self.websocket.application_state == WebSocketState.CONNECTED:
+                    try:
+                        await self.websocket.close(self.close_code, self.close_reason)
+                    except Exception:
+                        pass
+            finally:
+                # Also when the endpoint itself is cancelled during cleanup
+                session_stats["active"] -= 1
+                session_stats["closed"] += 1
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def runtime_metrics():
+    return {
+        **session_stats,
+        "turns": {**turn_stats, "interrupted_by": dict(turn_stats["interrupted_by"])},
+        "tasks": len(asyncio.all_tasks()),
+        "rss_bytes": _rss_bytes(),
+    }
@@ -0,0 +1,228 @@
+import os
+import time
+import copy
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+from dotenv import load_dotenv
+from src.config.database import db, SESSION_STATE_TTL_SECONDS
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# "mongo", "memory", or "auto" (default): Mongo when the database is connected
+SESSION_STORE = os.environ.get("SESSION_STORE", "auto").lower()
+SESSIONS_COLLECTION = "interview_sessions"
+TURNS_COLLECTION = "session_turns"
+
+
+class SessionTakenOver(Exception):
+    """Raised on writes by a socket whose session has since been claimed by another socket."""
+
+
+class SessionStore(ABC):
+    """
+    Interview session state outside the process that runs the socket.
+
+    A session is a small meta document (type, difficulty, topic, owning
+    user, rolling summary, pending STT text) plus its turns. Turns are only ever appended,
+    each with a seq number, so a turn is one small insert rather than a
+    rewrite of the whole transcript. load() returns
+    {"meta": {...}, "turns": [{"seq", "role", "content", ...}, ...]} or None.
+
+    Only one socket at a time writes a session: the one holding the owner
+    token set by create() or, on resume, claim(). Writes with any other token
+    raise SessionTakenOver, so a stale socket can't carry on from the same seq
+    as the socket that resumed its session.
+    """
+
+    @abstractmethod
+    async def create(self, session_id, meta, owner):
+        """Starts a session. Returns False, changing nothing, if the id is already taken."""
+
+    @abstractmethod
+    async def claim(self, session_id, owner, match):
+        """
+        Makes owner the session's writer if its meta has the values in match.
+        Returns False if there is no such session.
+        """
+
+    @abstractmethod
+    async def load(self, session_id):
+        ...
+
+    @abstractmethod
+    async def append_turn(self, session_id, turn, owner):
+        ...
+
+    @abstractmethod
+    async def update(self, session_id, fields, owner):
+        """Sets meta fields."""
+
+    @abstractmethod
+    async def set_assessment(self, session_id, seq, assessment):
+        """Stores the evaluator's assessment of a turn with the turn."""
+
+
+class InMemorySessionStore(SessionStore):
+    """For a single worker: sessions survive reconnects but not restarts."""
+
+    def __init__(self, ttl=SESSION_STATE_TTL_SECONDS):
+        self.ttl = ttl
+        self.sessions = {}
+
+    def _purge(self):
+        cutoff = time.time() - self.ttl
+        for session_id in [sid for sid, s in self.sessions.items() if s["meta"]["updated_at"] < cutoff]:
+            del self.sessions[session_id]
+
+    async def create(self, session_id, meta, owner):
+        self._purge()
+        if session_id in self.sessions:
+            return False
+        self.sessions[session_id] = {"meta": {**meta, "owner": owner, "updated_at": time.time()}, "turns": []}
+        return True
+
+    async def claim(self, session_id, owner, match):
+        self._purge()
+        session = self.sessions.get(session_id)
+        if not session or any(session["meta"].get(key) != value for key, value in match.items()):
+            return False
+        session["meta"]["owner"] = owner
+        session["meta"]["updated_at"] = time.time()
+        return True
+
+    def _owned(self, session_id, owner):
+        session = self.sessions.get(session_id)
+        if session and session["meta"]["owner"] != owner:
+            raise SessionTakenOver(session_id)
+        return session
+
+    async def load(self, session_id):
+        self._purge()
+        session = self.sessions.get(session_id)
+        return copy.deepcopy(session) if session else None
+
+    async def append_turn(self, session_id, turn, owner):
+        session = self._owned(session_id, owner)
+        if session:
+            session["turns"].append(dict(turn))
+            session["meta"]["updated_at"] = time.time()
+
+    async def update(self, session_id, fields, owner):
+        session = self._owned(session_id, owner)
+        if session:
+            session["meta"].update(copy.deepcopy(fields))
+            session["meta"]["updated_at"] = time.time()
+
+    async def set_assessment(self, session_id, seq, assessment):
+        session = self.sessions.get(session_id)
+        for turn in session["turns"] if session else []:
+            if turn["seq"] == seq:
+                turn["assessment"] = copy.deepcopy(assessment)
+
+
+class MongoSessionStore(SessionStore):
+    """
+    Shared by every worker using the database. Meta documents live in
+    interview_sessions (_id = session id), turns in session_turns with a
+    unique (session_id, seq) index.
+
+    The meta document expires SESSION_STATE_TTL_SECONDS after the session's
+    last write, and a session without one is gone. Turns expire on touched_at,
+    half a TTL later than that, and every write to a session refreshes the
+    touched_at of its turns once it is half a TTL old. So no turn of a live
+    session expires before its meta document does, yet a write rarely has to
+    touch more than the one turn it appends.
+    """
+
+    def _sessions(self):
+        return db.get_db()[SESSIONS_COLLECTION]
+
+    def _turns(self):
+        return db.get_db()[TURNS_COLLECTION]
+
+    async def _touch_turns(self, session_id, now):
+        await self._turns().update_many(
+            # $not also matches turns written before touched_at existed
+            {"session_id": session_id, "touched_at": {"$not": {"$gte": now - timedelta(seconds=SESSION_STATE_TTL_SECONDS / 2)}}},
+            {"$set": {"touched_at": now}}
+        )
+
+    async def _write_meta(self, session_id, owner, update):
+        result = await self._sessions().update_one({"_id": session_id, "owner": owner}, update)
+        if result.matched_count == 0 and await self._sessions().count_documents({"_id": session_id}, limit=1):
+            raise SessionTakenOver(session_id)
+
+    async def create(self, session_id, meta, owner):
+        now = datetime.utcnow()
+        try:
+            await self._sessions().insert_one(
+                {"_id": session_id, **meta, "owner": owner, "created_at": now, "updated_at": now}
+            )
+        except DuplicateKeyError:
+            return False
+        # The id is ours now; turns still around belong to an expired session
+        await self._turns().delete_many({"session_id": session_id})
+        return True
+
+    async def claim(self, session_id, owner, match):
+        now = datetime.utcnow()
+        result = await self._sessions().update_one(
+            {"_id": session_id, **match},
+            {"$set": {"owner": owner, "updated_at": now}}
+        )
+        if result.matched_count == 0:
+            return False
+        # The session may have been idle for most of a TTL
+        await self._touch_turns(session_id, now)
+        return True
+
+    async def load(self, session_id):
+        meta = await self._sessions().find_one({"_id": session_id})
+        if not meta:
+            return None
+        meta.pop("_id")
+        turns = await self._turns().find(
+            {"session_id": session_id},
+            projection={"_id": 0, "session_id": 0, "created_at": 0, "touched_at": 0}
+        ).sort("seq", ASCENDING).to_list(length=None)
+        return {"meta": meta, "turns": turns}
+
+    async def append_turn(self, session_id, turn, owner):
+        now = datetime.utcnow()
+        # Checked first, so a stale socket's turn never takes the seq of the new owner's
+        # Also keeps the session from expiring while it is in use
+        await self._write_meta(session_id, owner, {"$set": {"updated_at": now}, "$max": {"last_seq": turn["seq"]}})
+        await self._turns().insert_one({"session_id": session_id, **turn, "created_at": now, "touched_at": now})
+        await self._touch_turns(session_id, now)
+
+    async def update(self, session_id, fields, owner):
+        now = datetime.utcnow()
+        await self._write_meta(session_id, owner, {"$set": {**fields, "updated_at": now}})
+        await self._touch_turns(session_id, now)
+
+    async def set_assessment(self, session_id, seq, assessment):
+        await self._turns().update_one({"session_id": session_id, "seq": seq}, {"$set": {"assessment": assessment}})
+
+
+def create_store(name=SESSION_STORE):
+    if name == "memory":
+        return InMemorySessionStore()
+    if db.client:
+        return MongoSessionStore()
+    if name == "mongo":
+        logger.warning("SESSION_STORE=mongo but MongoDB is not connected, keeping sessions in memory.")
+    return InMemorySessionStore()
+
+
+_store: SessionStore = None
+
+def get_session_store():
+    # Resolved on first use, after startup has connected the database
+    global _store
+    if _store is None:
+        _store = create_store()
+    return _store
@@ -0,0 +1,39 @@
+import logging
+from datetime import datetime
+from pymongo import UpdateOne
+from src.config.database import db
+from src.services.writeBehind import write_buffer
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPTS_COLLECTION = "transcripts"
+
+async def save_transcript(session_id, interview_type, history, started_at, difficulty=None, topic=None, user_email=None):
+    """
+    Persists the full transcript of an interview session when its socket closes.
+    Keyed by session id, so a resumed session replaces its earlier, shorter copy
+    but keeps the started_at of the first socket.
+    """
+    if not db.client:
+        return
+
+    document = {
+        "user_email": user_email,
+        "type": interview_type,
+        "difficulty": difficulty,
+        "topic": topic,
+        "turns": [{"role": message["role"], "content": message["content"]} for message in history],
+        "ended_at": datetime.utcnow(),
+    }
+    operation = UpdateOne(
+        {"_id": session_id},
+        {"$set": document, "$setOnInsert": {"started_at": started_at}},
+        upsert=True
+    )
+    if write_buffer.add(TRANSCRIPTS_COLLECTION, operation):
+        return
+
+    try:
+        await db.get_db()[TRANSCRIPTS_COLLECTION].bulk_write([operation])
+    except Exception as e:
+        logger.error("Error saving transcript: %s", e, extra={"session_id": session_id})
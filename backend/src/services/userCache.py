@@ -0,0 +1,98 @@
+import os
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get("USER_CACHE_MAX_ENTRIES", "10000"))
+
+
+class UserCache:
+    """
+    Small TTL + LRU cache of user documents keyed by email (the JWT subject).
+
+    Anything that writes to a user document must call invalidate(email) so the
+    next authenticated request reads the fresh copy. The TTL only bounds how
+    stale an entry can get if a write path forgets to do that.
+
+    A read that races an invalidate() must not put the old document back, so
+    callers take generation() before reading from the database and pass it to
+    set(); set() drops the document if the email was invalidated in between.
+    """
+
+    def __init__(self, ttl=USER_CACHE_TTL_SECONDS, max_entries=USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # email -> (expires_at, user)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_sets = 0
+        # Every invalidate() bumps tick; invalidated maps email -> tick of its last one
+        self.tick = 0
+        self.invalidated = OrderedDict()
+        # Tick of the newest marker pruned from invalidated; older reads are treated as stale
+        self.floor = 0
+
+    def get(self, email):
+        entry = self.entries.get(email)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self.entries[email]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(email)
+        self.hits += 1
+        return dict(user)
+
+    def generation(self):
+        return self.tick
+
+    def set(self, email, user, generation=None):
+        if self.max_entries <= 0:
+            return
+        if generation is not None and generation < max(self.floor, self.invalidated.get(email, 0)):
+            # Read before the last invalidate() of this email
+            self.stale_sets += 1
+            return
+        self.entries[email] = (time.monotonic() + self.ttl, dict(user))
+        self.entries.move_to_end(email)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, email):
+        self.tick += 1
+        self.invalidated[email] = self.tick
+        self.invalidated.move_to_end(email)
+        while len(self.invalidated) > max(self.max_entries, 1):
+            _, self.floor = self.invalidated.popitem(last=False)
+        if self.entries.pop(email, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_sets": self.stale_sets,
+        }
+
+
+user_cache = UserCache()
@@ -0,0 +1,192 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from pymongo.errors import BulkWriteError
+from dotenv import load_dotenv
+from src.config.database import db
+from src.services.metrics import ERRORS
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_ENABLED = os.environ.get("WRITE_BEHIND_ENABLED", "true").lower() in ("1", "true", "yes")
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", "200"))
+WRITE_BEHIND_FLUSH_SECONDS = float(os.environ.get("WRITE_BEHIND_FLUSH_SECONDS", "1.0"))
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get("WRITE_BEHIND_MAX_PENDING", "20000"))
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.environ.get("WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+
+DUPLICATE_KEY = 11000
+
+
+class WriteBehindBuffer:
+    """
+    Batches MongoDB writes off the request path.
+
+    add() queues a pymongo write (InsertOne, UpdateOne, ...) and returns
+    immediately. A flusher task sends what has queued up as one ordered
+    bulk_write per collection, as soon as batch_size writes are waiting or
+    after flush_seconds otherwise. A failed batch goes back to the front of
+    the queue and is retried with backoff; after max_attempts its writes are
+    dropped and logged. A retry after an ambiguous failure may repeat writes
+    that were applied, so writes must be safe to repeat or fail with a
+    duplicate key once applied: inserts carry their own _id, and updates that
+    are not idempotent filter out documents they were already applied to.
+    Upserts must filter on the unique key alone, so that a duplicate key
+    always means the document exists, whoever created it.
+
+    add() returns False once max_pending writes are waiting, so callers can
+    fall back to writing directly instead of growing the buffer further.
+    """
+
+    def __init__(self, batch_size=WRITE_BEHIND_BATCH_SIZE, flush_seconds=WRITE_BEHIND_FLUSH_SECONDS,
+                 max_pending=WRITE_BEHIND_MAX_PENDING, max_attempts=WRITE_BEHIND_MAX_ATTEMPTS,
+                 enabled=WRITE_BEHIND_ENABLED):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.enabled = enabled
+        self.pending = deque()  # [collection, operation, on_flushed, attempts, queued_at]
+        self.wakeup = asyncio.Event()
+        self.flush_lock = asyncio.Lock()
+        self.task: asyncio.Task = None
+        self.stats = {
+            "queued": 0,
+            "written": 0,
+            "batches": 0,
+            "retries": 0,
+            "dropped": 0,
+            "rejected": 0,
+        }
+
+    def add(self, collection, operation, on_flushed=None):
+        """
+        Queues one write to collection. on_flushed is called once it has been written.
+        Returns False, without queueing, if the buffer is disabled or full.
+        """
+        return self.add_all([(collection, operation, on_flushed)])
+
+    def add_all(self, writes):
+        """Queues (collection, operation, on_flushed) writes in order, all of them or none."""
+        if not self.enabled:
+            return False
+        if len(self.pending) + len(writes) > self.max_pending:
+            self.stats["rejected"] += 1
+            return False
+
+        queued_at = time.monotonic()
+        for collection, operation, on_flushed in writes:
+            self.pending.append([collection, operation, on_flushed, 0, queued_at])
+        self.stats["queued"] += len(writes)
+        if self.task is None:
+            self.task = asyncio.create_task(self._flusher())
+        if len(self.pending) >= self.batch_size:
+            self.wakeup.set()
+        return True
+
+    async def _write(self, batch):
+        """Writes a batch; returns the entries that still have to be retried."""
+        by_collection = {}
+        for entry in batch:
+            by_collection.setdefault(entry[0], []).append(entry)
+
+        database = db.get_db()
+        retry = []
+        for collection, entries in by_collection.items():
+            done = []
+            while entries:
+                try:
+                    await database[collection].bulk_write([entry[1] for entry in entries], ordered=True)
+                    done.extend(entries)
+                    entries = []
+                except BulkWriteError as e:
+                    # Ordered: everything before the first error was applied, nothing after it
+                    error = e.details["writeErrors"][0]
+                    index = error["index"]
+                    if error["code"] == DUPLICATE_KEY:
+                        # Already written, by an earlier attempt or a concurrent upsert; carry on with the rest
+                        done.extend(entries[:index + 1])
+                        entries = entries[index + 1:]
+                        continue
+                    logger.error("Write-behind batch for %s failed at write %s: %s", collection, index, error.get("errmsg"))
+                    done.extend(entries[:index])
+                    retry.extend(entries[index:])
+                    entries = []
+                except Exception as e:
+                    logger.error("Write-behind batch for %s failed: %s", collection, e)
+                    retry.extend(entries)
+                    entries = []
+
+            self.stats["written"] += len(done)
+            for entry in done:
+                if entry[2]:
+                    entry[2]()
+        return retry
+
+    async def flush(self):
+        """Writes everything queued so far, one attempt per batch. Returns True if nothing is left."""
+        async with self.flush_lock:
+            count = len(self.pending)
+            while count > 0 and self.pending and db.client:
+                size = min(count, self.batch_size)
+                batch = [self.pending.popleft() for _ in range(size)]
+                count -= size
+                self.stats["batches"] += 1
+
+                retry = await self._write(batch)
+                for entry in reversed(retry):
+                    entry[3] += 1
+                    if entry[3] >= self.max_attempts:
+                        self.stats["dropped"] += 1
+                        ERRORS.labels("write_behind").inc()
+                        logger.error("Write-behind gave up on a write to %s after %s attempts", entry[0], entry[3])
+                        continue
+                    # Back at the front, so the order of writes is kept
+                    self.pending.appendleft(entry)
+                if retry:
+                    self.stats["retries"] += 1
+                    return False
+            return not self.pending
+
+    async def _flusher(self):
+        backoff = self.flush_seconds
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            if not self.pending:
+                continue
+
+            if await self.flush():
+                backoff = self.flush_seconds
+            else:
+                # The database is struggling; give it room before the next attempt
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    async def close(self):
+        """Stops the flusher and writes whatever is still queued."""
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        for _ in range(self.max_attempts):
+            if await self.flush():
+                break
+        if self.pending:
+            logger.error("Write-behind buffer closed with %s unwritten writes", len(self.pending))
+
+    def metrics(self):
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "depth": len(self.pending),
+            "oldest_age_seconds": round(time.monotonic() - self.pending[0][4], 3) if self.pending else 0.0,
+        }
+
+
+write_buffer = WriteBehindBuffer()
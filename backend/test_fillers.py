@@ -0,0 +1,30 @@
+"""
+Checks FillerDetector on the cases the old token-based counter got right,
+plus multi-word fillers and lexicon entries written with punctuation.
+
+    python test_fillers.py
+"""
+from src.services.ai.fillerDetector import FillerDetector, DEFAULT_FILLERS
+
+CASES = [
+    # (label, lexicon, text, expected counts)
+    ("plain", DEFAULT_FILLERS, "Um, I like, basically use a map.", {"um": 1, "like": 1, "basically": 1}),
+    ("phrase", DEFAULT_FILLERS, "It is, you\n know, linear.", {"you know": 1}),
+    ("hyphenated words", DEFAULT_FILLERS, "A like-minded, so-called um-free team.", {}),
+    ("hyphen before", DEFAULT_FILLERS, "That was well-like.", {}),
+    ("case", DEFAULT_FILLERS, "LIKE Like like", {"like": 3}),
+    ("punctuated lexicon", ["um,", "so...", "(like)"], "um, so I like it", {"um": 1, "so": 1, "like": 1}),
+    ("unmatchable entry", ["uh", "kind-of"], "uh kind-of kind of", {"uh": 1}),
+]
+
+def test_fillers():
+    results = []
+    for label, lexicon, text, expected in CASES:
+        total, found = FillerDetector(lexicon).count(text)
+        ok = found == expected and total == sum(expected.values())
+        print(f"{'PASS' if ok else 'FAIL'} {label}: found={found} (expected {expected})")
+        results.append(ok)
+    print("--- SUCCESS ---" if all(results) else "--- FAILURE ---")
+
+if __name__ == "__main__":
+    test_fillers()
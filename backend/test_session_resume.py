@@ -0,0 +1,107 @@
+"""
+Multi-worker test for session resume.
+
+Starts two separate server processes sharing the same MongoDB, runs part of an
+interview on the first, kills it as a deploy would, and resumes the session
+on the second. Needs MONGO_URI; run it against a fake LLM so replies are fast:
+
+    MONGO_URI=mongodb://localhost:27017 MONGO_DB_NAME=resume_test \\
+    GROQ_API_KEY=x LLM_BASE_URL=http://localhost:9911 python test_session_resume.py
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+import requests
+import websockets
+
+PORTS = [int(os.environ.get("PORT_A", "8101")), int(os.environ.get("PORT_B", "8102"))]
+
+def start_worker(port):
+    env = {**os.environ, "SESSION_STORE": "mongo"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://localhost:{port}/", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Worker on port {port} did not start")
+
+async def next_frame(websocket, frame_type):
+    while True:
+        message = await asyncio.wait_for(websocket.recv(), timeout=30)
+        if isinstance(message, str):
+            frame = json.loads(message)
+            if frame["type"] == frame_type:
+                return frame
+
+def register(port, name):
+    response = requests.post(f"http://localhost:{port}/auth/register", json={
+        "username": name, "email": f"{name}@example.com", "password": "resume-password",
+    }, timeout=10)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+def connect(port, path, token):
+    return websockets.connect(f"ws://localhost:{port}{path}", subprotocols=["bearer", token])
+
+async def test_session_resume():
+    if not os.environ.get("MONGO_URI"):
+        print("MONGO_URI is not set, skipping")
+        return
+
+    session_id = f"resume-{uuid.uuid4().hex[:8]}"
+    worker_a = start_worker(PORTS[0])
+    worker_b = start_worker(PORTS[1])
+    try:
+        owner = register(PORTS[0], session_id)
+        intruder = register(PORTS[0], f"{session_id}-other")
+
+        # First half of the interview on worker A
+        async with connect(PORTS[0], f"/ws/interview/{session_id}", owner) as websocket:
+            greeting = await next_frame(websocket, "ai_response")
+            await websocket.send(json.dumps({"type": "submit_answer", "text": "I built a caching layer for our API."}))
+            first_reply = await next_frame(websocket, "ai_response")
+            # The client has seen turns 0-2; this answer and its reply will be missed
+            await websocket.send(json.dumps({"type": "submit_answer", "text": "It used Redis with a TTL per key."}))
+            missed_reply = await next_frame(websocket, "ai_response")
+
+        # Deploy: worker A goes away
+        worker_a.terminate()
+        worker_a.wait(timeout=10)
+
+        # Another user naming the session gets a new one of their own, not its transcript
+        async with connect(PORTS[1], f"/ws/interview/{session_id}?resume=true&last_seq=-1", intruder) as websocket:
+            started = await next_frame(websocket, "session_started")
+            assert started["session_id"] != session_id, started
+
+        async with connect(PORTS[1], f"/ws/interview/{session_id}?resume=true&last_seq=2", owner) as websocket:
+            resumed = await next_frame(websocket, "session_resumed")
+            assert resumed["last_seq"] == 4, resumed
+            assert [turn["seq"] for turn in resumed["missed"]] == [3, 4], resumed["missed"]
+            assert resumed["missed"][1]["content"] == missed_reply["text"]
+
+            await websocket.send(json.dumps({"type": "submit_answer", "text": "Invalidation was event driven."}))
+            await next_frame(websocket, "ai_response")
+
+        print(f"Greeting: {greeting['text'][:60]}")
+        print(f"Before restart: {first_reply['text'][:60]}")
+        print(f"Resumed on port {PORTS[1]} at seq {resumed['last_seq']} with {len(resumed['missed'])} missed turns")
+        print("OK: session resumed on a different worker, and only by its owner")
+    finally:
+        for worker in (worker_a, worker_b):
+            if worker.poll() is None:
+                worker.terminate()
+                worker.wait(timeout=10)
+
+if __name__ == "__main__":
+    asyncio.run(test_session_resume())
@@ -0,0 +1,108 @@
+"""
+Soak test for interview socket cleanup.
+
+Opens and drops thousands of interview sockets against a running server and
+checks that the server's task count and RSS come back to where they started.
+Sessions end in different ways: a clean close, a dropped TCP connection, a
+drop in the middle of a reply, and a client that never reads.
+
+    WS_ALLOW_ANONYMOUS=true GROQ_API_KEY=x LLM_BASE_URL=http://localhost:9911 uvicorn src.main:app --port 8000
+    SESSIONS=2000 CONCURRENCY=100 python test_session_soak.py
+
+Run it against a fake LLM (see LLM_BASE_URL) so replies are fast and free.
+Replies are generated off the receive loop, so a dropped socket ends its
+session, and cancels the reply in flight, as soon as the drop is noticed.
+"""
+import asyncio
+import json
+import os
+import time
+import requests
+import websockets
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8000")
+WS_BASE_URL = BASE_URL.replace("http", "ws", 1)
+SESSIONS = int(os.environ.get("SESSIONS", "2000"))
+CONCURRENCY = int(os.environ.get("CONCURRENCY", "100"))
+# Same size as the measured run, so the allocator has already grown to peak concurrency
+WARMUP_SESSIONS = int(os.environ.get("WARMUP_SESSIONS", str(SESSIONS)))
+TASK_SLACK = int(os.environ.get("TASK_SLACK", "10"))
+RSS_SLACK_MB = float(os.environ.get("RSS_SLACK_MB", "30"))
+SETTLE_SECONDS = float(os.environ.get("SETTLE_SECONDS", "90"))
+
+async def runtime_stats():
+    response = await asyncio.to_thread(requests.get, f"{BASE_URL}/stats/runtime", timeout=10)
+    return response.json()
+
+async def run_session(index):
+    uri = f"{WS_BASE_URL}/ws/interview/soak-{index}?type=technical"
+    websocket = await websockets.connect(uri)
+    mode = index % 4
+    try:
+        await websocket.recv()  # Greeting
+        if mode == 0:
+            # Clean close
+            await websocket.close()
+        elif mode == 1:
+            # Connection dropped without a close frame
+            websocket.transport.abort()
+        elif mode == 2:
+            # Dropped while the reply is being generated
+            await websocket.send(json.dumps({"type": "submit_answer", "text": "I would use a hash map."}))
+            websocket.transport.abort()
+        else:
+            # Sends answers but never reads the replies, then goes away
+            for _ in range(5):
+                await websocket.send(json.dumps({"type": "submit_answer", "text": "Still here."}))
+            await asyncio.sleep(0.2)
+            websocket.transport.abort()
+    finally:
+        if mode == 0:
+            await websocket.wait_closed()
+
+async def run_wave(count, offset):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def limited(index):
+        async with semaphore:
+            await run_session(index)
+
+    results = await asyncio.gather(*[limited(offset + i) for i in range(count)], return_exceptions=True)
+    return [r for r in results if isinstance(r, Exception)]
+
+async def settle(baseline_tasks):
+    deadline = time.monotonic() + SETTLE_SECONDS
+    while True:
+        stats = await runtime_stats()
+        if (stats["active"] == 0 and stats["tasks"] <= baseline_tasks + TASK_SLACK) or time.monotonic() > deadline:
+            return stats
+        await asyncio.sleep(0.5)
+
+async def test_session_soak():
+    # Warm up so lazily created pools and caches don't count as growth
+    await run_wave(WARMUP_SESSIONS, 0)
+    baseline = await settle(float("inf"))
+    print(f"Baseline: {baseline['tasks']} tasks, RSS {baseline['rss_bytes'] / 2**20:.1f} MB")
+
+    start = time.perf_counter()
+    failures = await run_wave(SESSIONS, WARMUP_SESSIONS)
+    elapsed = time.perf_counter() - start
+    peak = await runtime_stats()
+    final = await settle(baseline["tasks"])
+
+    rss_growth_mb = (final["rss_bytes"] - baseline["rss_bytes"]) / 2**20
+    print(f"Sessions: {SESSIONS} in {elapsed:.1f}s, client errors: {len(failures)}")
+    print(f"Right after the run: {peak['tasks']} tasks, {peak['active']} active sessions")
+    print(f"After settling: {final['tasks']} tasks, {final['active']} active sessions, "
+          f"RSS {final['rss_bytes'] / 2**20:.1f} MB ({rss_growth_mb:+.1f} MB)")
+    print(f"Slow consumer closes: {final['slow_consumer_closes']}, send timeouts: {final['send_timeouts']}")
+    for failure in failures[:5]:
+        print(f"Failure: {failure!r}")
+
+    assert final["active"] == 0, f"{final['active']} sessions never finished"
+    assert final["tasks"] <= baseline["tasks"] + TASK_SLACK, f"Task count grew from {baseline['tasks']} to {final['tasks']}"
+    assert rss_growth_mb <= RSS_SLACK_MB, f"RSS grew by {rss_growth_mb:.1f} MB"
+    print("OK: task count and RSS stayed flat")
+
+if __name__ == "__main__":
+    asyncio.run(test_session_soak())
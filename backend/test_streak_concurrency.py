@@ -0,0 +1,74 @@
+"""
+Fires parallel save_report_to_db calls for one user against a local mongod and
+checks that the streak moved exactly once and every report was counted.
+Every case runs twice: with the write-behind buffer off, so the saves race
+each other in the database, and through the buffer, flushed before checking.
+The first_reports case has no streak to move; it races the creation of a new
+user's analytics aggregate.
+
+    BENCH_MONGO_URI=mongodb://localhost:27017 python test_streak_concurrency.py
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient
+from src.config.database import db
+from src.services.reportService import save_report_to_db
+from src.services.writeBehind import write_buffer
+from src.services.analyticsService import ANALYTICS_COLLECTION
+
+BENCH_MONGO_URI = os.environ.get("BENCH_MONGO_URI", "mongodb://localhost:27017")
+TEST_DB_NAME = "interview_flow_streak_test"
+PARALLEL_REPORTS = int(os.environ.get("PARALLEL_REPORTS", "50"))
+
+async def run_case(label, seed_fields, expected_streak, buffered, parallel=PARALLEL_REPORTS):
+    database = db.get_db()
+    label = f"{label}_{'buffered' if buffered else 'direct'}"
+    email = f"streak_{label}@example.com"
+    await database["users"].insert_one({"username": label, "email": email, "hashed_password": "x", **seed_fields})
+
+    write_buffer.enabled = buffered
+    report = {"technical_score": 70, "communication_score": 80, "confidence_score": 60}
+    await asyncio.gather(*[
+        save_report_to_db(report, "technical", user_email=email) for _ in range(parallel)
+    ])
+    assert await write_buffer.flush(), "write-behind buffer could not flush"
+
+    user = await database["users"].find_one({"email": email})
+    report_count = await database["reports"].count_documents({"user_email": email})
+    analytics = await database[ANALYTICS_COLLECTION].find_one({"_id": email})
+
+    ok = (
+        user["streak"] == expected_streak
+        and report_count == parallel
+        and analytics["report_count"] == parallel
+    )
+    print(f"{'PASS' if ok else 'FAIL'} {label}: streak={user['streak']} (expected {expected_streak}), "
+          f"reports={report_count}, analytics={analytics['report_count']} (expected {parallel})")
+    return ok
+
+async def test_streak_concurrency():
+    db.client = AsyncIOMotorClient(BENCH_MONGO_URI)
+    db.name = TEST_DB_NAME
+    await db.client.drop_database(TEST_DB_NAME)
+
+    now = datetime.utcnow()
+    try:
+        results = []
+        for buffered in (False, True):
+            results += [
+                await run_case("first_time", {}, 1, buffered),
+                await run_case("yesterday", {"streak": 3, "last_practice_date": now - timedelta(days=1)}, 4, buffered),
+                await run_case("today", {"streak": 5, "last_practice_date": now}, 5, buffered),
+                await run_case("lapsed", {"streak": 9, "last_practice_date": now - timedelta(days=3)}, 1, buffered),
+                # Two first reports for a user without an aggregate: both must be counted
+                await run_case("first_reports", {}, 1, buffered, parallel=2),
+            ]
+    finally:
+        await db.client.drop_database(TEST_DB_NAME)
+        db.close()
+
+    print("--- SUCCESS ---" if all(results) else "--- FAILURE ---")
+
+if __name__ == "__main__":
+    asyncio.run(test_streak_concurrency())
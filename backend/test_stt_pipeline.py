@@ -0,0 +1,71 @@
+"""
+Load test for the server-side STT path using the offline recognizer.
+
+Start the server with the stand-in backend, then run this script:
+
+    WS_ALLOW_ANONYMOUS=true STT_BACKEND=offline uvicorn src.main:app --port 8000
+    SESSIONS=50 python test_stt_pipeline.py
+
+Each session streams silent 16 kHz PCM in 100 ms frames at real-time pace and
+measures how long each final transcript takes to come back.
+"""
+import asyncio
+import json
+import os
+import statistics
+import time
+import websockets
+
+BASE_URL = os.environ.get("WS_BASE_URL", "ws://localhost:8000")
+SESSIONS = int(os.environ.get("SESSIONS", "50"))
+SECONDS_OF_AUDIO = float(os.environ.get("SECONDS_OF_AUDIO", "10"))
+FRAME_SECONDS = 0.1
+FRAME = b"\x00" * int(16000 * 2 * FRAME_SECONDS)
+UTTERANCE_SECONDS = 2.0  # Must match OfflineBackend's default
+
+async def run_session(index, latencies):
+    uri = f"{BASE_URL}/ws/interview/stt_load_{index}?type=technical"
+    async with websockets.connect(uri) as websocket:
+        await websocket.recv()  # Greeting
+
+        utterance_ends = []
+        received = 0
+        expected = int(SECONDS_OF_AUDIO / UTTERANCE_SECONDS)
+
+        async def reader():
+            nonlocal received
+            while received < expected:
+                frame = json.loads(await websocket.recv())
+                if frame["type"] == "transcript":
+                    latencies.append(time.perf_counter() - utterance_ends[received])
+                    received += 1
+
+        reader_task = asyncio.create_task(reader())
+        frames_per_utterance = int(UTTERANCE_SECONDS / FRAME_SECONDS)
+        for i in range(int(SECONDS_OF_AUDIO / FRAME_SECONDS)):
+            await websocket.send(FRAME)
+            if (i + 1) % frames_per_utterance == 0:
+                utterance_ends.append(time.perf_counter())
+            await asyncio.sleep(FRAME_SECONDS)
+
+        await asyncio.wait_for(reader_task, timeout=30)
+        return received
+
+async def test_stt_pipeline():
+    latencies = []
+    start = time.perf_counter()
+    results = await asyncio.gather(*[run_session(i, latencies) for i in range(SESSIONS)], return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    failures = [r for r in results if isinstance(r, Exception)]
+    latencies.sort()
+    print(f"Sessions: {SESSIONS}, failed: {len(failures)}, transcripts: {len(latencies)}, wall time: {elapsed:.1f}s")
+    if latencies:
+        print(f"Transcript latency p50: {statistics.median(latencies) * 1000:.1f} ms, "
+              f"p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms, "
+              f"max: {latencies[-1] * 1000:.1f} ms")
+    for failure in failures[:5]:
+        print(f"Failure: {failure!r}")
+
+if __name__ == "__main__":
+    asyncio.run(test_stt_pipeline())
@@ -13,7 +13,7 @@ async def test_websocket():
     except Exception as e:
         print(f"Ping Connection failed: {e}")
 
-    # Test Interview
+    # Test Interview (sends no token: start the server with WS_ALLOW_ANONYMOUS=true)
     uri = "ws://localhost:8000/ws/interview/test_client?type=technical"
     print(f"Connecting to {uri}...")
     try:
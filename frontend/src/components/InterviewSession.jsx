@@ -5,6 +5,9 @@ import { useWebSocket } from '../hooks/useWebSocket';
 import AudioVisualizer from './AudioVisualizer';
 import { endpoints } from '../config';
 
+// Attempts at /grade while the server answers 503
+const GRADE_MAX_ATTEMPTS = 4;
+
 const InterviewSession = ({ type, difficulty, topic, onEndSession }) => {
     const [messages, setMessages] = useState([]);
     const [isAiSpeaking, setIsAiSpeaking] = useState(false);
@@ -32,10 +35,15 @@ const InterviewSession = ({ type, difficulty, topic, onEndSession }) => {
     const stopListeningRef = useRef(null);
     const messagesEndRef = useRef(null);
     const currentAudioRef = useRef(null);
+    const retryTimer = useRef(null);
     
     // Use a random client ID for now, persisted across renders
-    const [clientId] = useState(Math.floor(Math.random() * 1000));
-    const { isConnected, lastMessage, sendMessage } = useWebSocket(endpoints.wsInterview(clientId, type, difficulty, topic));
+    const [clientId] = useState(() => `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`);
+    // The server may start the session under a different id (session_started); /grade needs that one
+    const [sessionId, setSessionId] = useState(clientId);
+    // Browsers can't set headers on a WebSocket, so the token goes as a subprotocol
+    const [wsProtocols] = useState(() => ['bearer', localStorage.getItem('token')]);
+    const { isConnected, lastMessage, sendMessage } = useWebSocket(endpoints.wsInterview(clientId, type, difficulty, topic), wsProtocols);
     
     // Browser Speech Recognition
     const recognitionRef = useRef(null);
@@ -136,6 +144,15 @@ const InterviewSession = ({ type, difficulty, topic, onEndSession }) => {
                     playAudio(data.data);
                 } else if (data.type === 'system') {
                      setMessages((prev) => [...prev, { sender: 'System', text: data.text, role: 'system' }]);
+                } else if (data.type === 'session_started') {
+                    setSessionId(data.session_id);
+                } else if (data.type === 'turn_failed') {
+                    // The server is busy; our answer is kept, ask for the reply again once it says so
+                    if (retryTimer.current) clearTimeout(retryTimer.current);
+                    retryTimer.current = setTimeout(() => {
+                        retryTimer.current = null;
+                        sendMessage(JSON.stringify({ type: "retry_turn" }));
+                    }, (data.retry_after || 1) * 1000);
                 }
             } catch (e) {
                 setMessages((prev) => [...prev, { sender: 'System', text: lastMessage, role: 'system' }]);
@@ -143,6 +160,9 @@ const InterviewSession = ({ type, difficulty, topic, onEndSession }) => {
         }
     }, [lastMessage]);
 
+    // Drop a pending retry_turn when the session goes away
+    useEffect(() => () => clearTimeout(retryTimer.current), []);
+
     const speakText = (text) => {
         if (isMuted) return;
         if ('speechSynthesis' in window) {
@@ -270,14 +290,22 @@ const InterviewSession = ({ type, difficulty, topic, onEndSession }) => {
         // 2. Call backend to grade
         try {
             const token = localStorage.getItem('token');
-            const response = await fetch(endpoints.grade, {
+            const requestGrade = () => fetch(endpoints.grade, {
                 method: 'POST',
                 headers: { 
                     'Content-Type': 'application/json',
                     'Authorization': `Bearer ${token}`
                 },
-                body: JSON.stringify({ history, type })
+                body: JSON.stringify({ history, type, session_id: sessionId })
             });
+
+            // 503 means grading is busy; wait as long as Retry-After says and try again
+            let response = await requestGrade();
+            for (let attempt = 1; response.status === 503 && attempt < GRADE_MAX_ATTEMPTS; attempt++) {
+                const retryAfter = Number(response.headers.get('Retry-After')) || 2;
+                await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+                response = await requestGrade();
+            }
             
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
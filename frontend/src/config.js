@@ -10,5 +10,6 @@ export const endpoints = {
     register: `${API_BASE_URL}/auth/register`,
     reports: `${API_BASE_URL}/reports`,
     grade: `${API_BASE_URL}/grade`,
-    wsInterview: (clientId, type, difficulty, topic) => `${WS_BASE_URL}/ws/interview/${clientId}?type=${type}&difficulty=${difficulty || 'medium'}${topic ? `&topic=${encodeURIComponent(topic)}` : ''}`
+    // retry_frames: a reply the server had to shed comes back as turn_failed, which we retry
+    wsInterview: (clientId, type, difficulty, topic) => `${WS_BASE_URL}/ws/interview/${clientId}?type=${type}&difficulty=${difficulty || 'medium'}${topic ? `&topic=${encodeURIComponent(topic)}` : ''}&retry_frames=true`
 };
@@ -1,12 +1,13 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
 
-export const useWebSocket = (url) => {
+// protocols is read when the socket opens; a new url opens a new socket
+export const useWebSocket = (url, protocols) => {
     const [isConnected, setIsConnected] = useState(false);
     const [lastMessage, setLastMessage] = useState(null);
     const socketRef = useRef(null);
 
     useEffect(() => {
-        socketRef.current = new WebSocket(url);
+        socketRef.current = new WebSocket(url, protocols);
 
         socketRef.current.onopen = () => {
             console.log('WebSocket Connected');